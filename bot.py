@@ -8,12 +8,15 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import asyncio
+import logging
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from dotenv import load_dotenv
 
 from config import BOT_NAME, BOT_VERSION, BOT_DESCRIPTION, DB_PATH
-from database import ensure_db
+from database import ensure_db, connect, close_pool, close_db, optimize_loop
 from backup import backup_loop, create_backup
 from models import CurrencyDeleteConfirmView, RolePurchaseView, AutoRewardView
 from cogs.vc_creator import VCPanelView
@@ -33,8 +36,18 @@ intents.voice_states = True
 intents.guilds = True
 intents.emojis_and_stickers = True
 
+class Bot(commands.Bot):
+    """終了時にDB接続も閉じるBot"""
+    
+    async def close(self):
+        # Cogのアンロード（未書き込みデータの保存を含む）が済んでから接続を閉じる
+        await super().close()
+        await close_pool()
+        await close_db()
+
+
 # Botインスタンスを作成
-bot = commands.Bot(
+bot = Bot(
     command_prefix='!',
     intents=intents,
     description=BOT_DESCRIPTION
@@ -60,9 +73,8 @@ async def on_ready():
     print("[INIT] 永続的なViewを復元しています...")
     
     # AutoRewardViewを復元
-    import aiosqlite
     from database import fetch_all
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with connect() as db:
         # 設置済みの自動報酬を取得
         autorewards = await fetch_all(db, "SELECT DISTINCT id FROM autorewards WHERE enabled = 1")
         for (reward_id,) in autorewards:
@@ -79,25 +91,22 @@ async def on_ready():
             bot.add_view(RolePurchaseView(panel_id=panel_id))
         print(f"  ✓ RolePurchaseView: {len(panels)}件復元")
         
-        # 設置済みのVCパネルを取得
-        vc_panel_data = await fetch_all(db, """
-            SELECT vpd.message_id, vpd.guild_id
-            FROM vc_panel_deployments vpd
+        # 設置済みのVCパネルを取得（ボタンはcustom_idで識別されるためサーバー単位で1つ登録）
+        vc_plans = await fetch_all(db, """
+            SELECT vp.guild_id, vp.id, vp.plan_name, vp.price, vp.currency_symbol, vp.duration_hours, vp.permission_type
+            FROM vc_plans vp
+            WHERE vp.guild_id IN (SELECT DISTINCT guild_id FROM vc_panel_deployments)
+            ORDER BY vp.guild_id, vp.id
         """)
         
-        for (message_id, panel_guild_id) in vc_panel_data:
-            # パネルに紐づくプランを取得
-            plans = await fetch_all(db, """
-                SELECT vp.id, vp.plan_name, vp.price, vp.currency_symbol, vp.duration_hours, vp.permission_type
-                FROM vc_plans vp
-                WHERE vp.guild_id = ?
-                ORDER BY vp.id
-            """, (panel_guild_id,))
-            
-            if plans:
-                bot.add_view(VCPanelView(plans))
+        plans_by_guild = {}
+        for panel_guild_id, *plan in vc_plans:
+            plans_by_guild.setdefault(panel_guild_id, []).append(plan)
         
-        print(f"  ✓ VCPanelView: {len(vc_panel_data)}件復元")
+        for plans in plans_by_guild.values():
+            bot.add_view(VCPanelView(plans))
+        
+        print(f"  ✓ VCPanelView: {len(plans_by_guild)}件復元")
         
     
     # Cogsをロード
@@ -148,6 +157,9 @@ async def on_ready():
     print("[BACKUP] バックアップループを開始しています...")
     bot.loop.create_task(backup_loop())
     
+    # 統計情報の定期更新を開始
+    bot.loop.create_task(optimize_loop())
+    
     print(f"\n[READY] {BOT_NAME} の起動が完了しました！")
     print(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
 
@@ -332,14 +344,22 @@ def main():
         print(f"[ERROR] {env_path} を編集して、実際のトークンを設定してください。")
         return
     
+    # ログの書き出しは別スレッドで行い、イベントループを止めないようにする
+    log_queue = queue.SimpleQueue()
+    log_listener = QueueListener(log_queue, logging.StreamHandler())
+    log_listener.start()
+    
     try:
-        bot.run(token)
+        # root_logger=True でcogs・databaseのロガーも同じハンドラーで出力する
+        bot.run(token, log_handler=QueueHandler(log_queue), root_logger=True)
     except discord.LoginFailure:
         print("[ERROR] ログインに失敗しました。トークンを確認してください。")
     except KeyboardInterrupt:
         print("\n[INFO] Botを終了しています...")
     except Exception as e:
         print(f"[ERROR] 予期しないエラーが発生しました: {e}")
+    finally:
+        log_listener.stop()
 
 
 if __name__ == "__main__":
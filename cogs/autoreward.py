@@ -7,16 +7,16 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiosqlite
 from datetime import datetime
 from decimal import Decimal
 
-from config import DB_PATH, TZ
+from config import TZ
 from database import (
     fetch_one, fetch_all, get_asset, upsert_user,
     ensure_user_account, balance_of, account_id_by_name,
     auto_refill_treasury_if_needed, new_transaction, post_ledger,
-    get_asset_info_by_id
+    get_asset_info_by_id,
+    connect
 )
 from embeds import create_success_embed, create_error_embed, create_info_embed
 from utils import to_decimal
@@ -39,7 +39,7 @@ class AutoRewardCog(commands.Cog):
         
         try:
             from database import fetch_all
-            async with aiosqlite.connect(DB_PATH) as db:
+            async with connect() as db:
                 rows = await fetch_all(db, """
                     SELECT symbol, name FROM assets
                     WHERE guild_id = ?
@@ -107,7 +107,7 @@ class AutoRewardCog(commands.Cog):
             embed = create_error_embed("入力エラー", "金額は0より大きい有効な数値を入力してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 通貨の確認
             asset = await get_asset(db, symbol, interaction.guild.id)
             if not asset:
@@ -155,7 +155,7 @@ class AutoRewardCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             configs = await fetch_all(db, """
                 SELECT
                     arc.id,
@@ -218,7 +218,7 @@ class AutoRewardCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             config = await fetch_one(db, """
                 SELECT id, enabled FROM auto_reward_configs
                 WHERE guild_id = ? AND channel_id = ?
@@ -253,7 +253,7 @@ class AutoRewardCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             config = await fetch_one(db, """
                 SELECT id, enabled FROM auto_reward_configs
                 WHERE guild_id = ? AND channel_id = ?
@@ -288,7 +288,7 @@ class AutoRewardCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             config = await fetch_one(db, """
                 SELECT arc.id, arc.trigger_message, arc.reward_amount, a.symbol, COUNT(DISTINCT arct.user_id) as claim_count
                 FROM auto_reward_configs arc
@@ -330,7 +330,7 @@ class AutoRewardCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             if channel:
                 # 特定チャンネルの統計
                 config = await fetch_one(db, """
@@ -482,7 +482,7 @@ class AutoRewardCog(commands.Cog):
             embed = create_error_embed("入力エラー", "変更する項目を少なくとも1つ指定してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 既存設定の確認
             config = await fetch_one(db, """
                 SELECT id, trigger_message, reward_amount, asset_id FROM auto_reward_configs
@@ -571,7 +571,7 @@ class AutoRewardCog(commands.Cog):
             return
         
         # 自動報酬設定をチェック
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             config = await fetch_one(db, """
                 SELECT id, trigger_message, reward_amount, asset_id, enabled
                 FROM auto_reward_configs
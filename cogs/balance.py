@@ -7,14 +7,13 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiosqlite
 from decimal import Decimal, ROUND_DOWN
 
-from config import DB_PATH
 from database import (
     fetch_all, get_asset, upsert_user,
     ensure_user_account, balance_of,
-    new_transaction, post_ledger
+    new_transaction, post_ledger,
+    connect
 )
 from embeds import create_error_embed, create_info_embed, create_transaction_embed
 from utils import to_decimal
@@ -37,7 +36,7 @@ class BalanceCog(commands.Cog):
         
         try:
             from database import fetch_all
-            async with aiosqlite.connect(DB_PATH) as db:
+            async with connect() as db:
                 rows = await fetch_all(db, """
                     SELECT symbol, name FROM assets
                     WHERE guild_id = ?
@@ -61,18 +60,16 @@ class BalanceCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             uid = await upsert_user(db, interaction.user.id)
             acc_id = await ensure_user_account(db, interaction.user.id, interaction.guild.id)
             
             # サーバーで作成された通貨のみ表示
             rows = await fetch_all(db, """
-                SELECT a.symbol, a.name, a.decimals, COALESCE(SUM(CAST(le.amount AS TEXT)), '0') AS bal
-                FROM assets a
-                LEFT JOIN ledger_entries le ON le.asset_id = a.id AND le.account_id = ?
-                WHERE a.guild_id = ? AND a.symbol != 'COIN'
-                GROUP BY a.id
-                HAVING bal != '0'
+                SELECT a.symbol, a.name, a.decimals, ab.balance_int AS bal
+                FROM account_balances ab
+                JOIN assets a ON a.id = ab.asset_id
+                WHERE ab.account_id = ? AND a.guild_id = ? AND a.symbol != 'COIN' AND ab.balance_int != 0
                 ORDER BY a.symbol
             """, (acc_id, str(interaction.guild.id)))
             
@@ -89,7 +86,7 @@ class BalanceCog(commands.Cog):
             embed.set_thumbnail(url=interaction.user.display_avatar.url)
             
             for sym, name, decimals, bal in rows:
-                d = Decimal(bal).quantize(Decimal(10) ** -int(decimals))
+                d = Decimal(bal).scaleb(-int(decimals))
                 embed.add_field(name=f"{sym} ({name})", value=f"💰 {d:,} {sym}", inline=True)
             
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -127,7 +124,7 @@ class BalanceCog(commands.Cog):
             embed = create_error_embed("入力エラー", "金額は0より大きい数値を入力してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             async with db.execute("BEGIN"):
                 asset = await get_asset(db, symbol.upper(), interaction.guild.id)
                 if not asset:
@@ -7,12 +7,10 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiosqlite
 from decimal import Decimal
 from typing import Optional
 
-from config import DB_PATH
-from database import fetch_one, fetch_all, get_asset, upsert_user
+from database import fetch_one, fetch_all, get_asset, upsert_user, connect
 from embeds import create_success_embed, create_error_embed, create_info_embed
 from utils import to_decimal
 
@@ -33,7 +31,7 @@ class BankCog(commands.Cog):
             return []
         
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
+            async with connect() as db:
                 rows = await fetch_all(db, """
                     SELECT symbol, name FROM assets
                     WHERE guild_id = ?
@@ -80,7 +78,7 @@ class BankCog(commands.Cog):
             embed = create_error_embed("入力エラー", "金額は0より大きい数値を入力してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 通貨確認
             asset = await get_asset(db, symbol.upper(), interaction.guild.id)
             if not asset:
@@ -190,7 +188,7 @@ class BankCog(commands.Cog):
             embed = create_error_embed("入力エラー", "金額は0より大きい数値を入力してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 通貨確認
             asset = await get_asset(db, symbol.upper(), interaction.guild.id)
             if not asset:
@@ -286,7 +284,7 @@ class BankCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             user_id = await upsert_user(db, interaction.user.id)
             
             if symbol:
@@ -337,12 +335,14 @@ class BankCog(commands.Cog):
                 
                 embed = create_info_embed("💰 全通貨の残高", "通常残高と銀行残高の一覧", interaction.user)
                 
-                from database import ensure_user_account, balance_of
+                from database import ensure_user_account, balances_for_guild
                 account_id = await ensure_user_account(db, interaction.user.id, interaction.guild.id)
+                # 全通貨の通常残高を1回のクエリで取得
+                wallet_balances = await balances_for_guild(db, interaction.guild.id, account_id)
                 
                 for asset_id, sym, name, decimals in rows:
                     # 通常残高
-                    wallet_balance = await balance_of(db, account_id, asset_id)
+                    wallet_balance = wallet_balances.get((account_id, asset_id), Decimal("0"))
                     
                     # 銀行残高
                     bank_row = await fetch_one(db, """
@@ -380,7 +380,7 @@ class BankCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             user_id = await upsert_user(db, interaction.user.id)
             
             if symbol:
@@ -463,7 +463,7 @@ class BankCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             user_id = await upsert_user(db, user.id)
             
             if symbol:
@@ -518,12 +518,14 @@ class BankCog(commands.Cog):
                     interaction.user
                 )
                 
-                from database import ensure_user_account, balance_of
+                from database import ensure_user_account, balances_for_guild
                 account_id = await ensure_user_account(db, user.id, interaction.guild.id)
+                # 全通貨の通常残高を1回のクエリで取得
+                wallet_balances = await balances_for_guild(db, interaction.guild.id, account_id)
                 
                 for asset_id, sym, name, decimals in rows:
                     # 通常残高
-                    wallet_balance = await balance_of(db, account_id, asset_id)
+                    wallet_balance = wallet_balances.get((account_id, asset_id), Decimal("0"))
                     
                     # 銀行残高
                     bank_row = await fetch_one(db, """
@@ -564,7 +566,7 @@ class BankCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             user_id = await upsert_user(db, user.id)
             
             if symbol:
@@ -661,7 +663,7 @@ class BankCog(commands.Cog):
             conditions.append("bt.transaction_type = ?")
             params.append(transaction_type)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             if symbol:
                 asset = await get_asset(db, symbol.upper(), interaction.guild.id)
                 if not asset:
@@ -12,8 +12,7 @@ from datetime import datetime
 from typing import Optional, List, Tuple
 import math
 
-from config import DB_PATH
-from database import fetch_one, fetch_all, execute_query
+from database import fetch_one, fetch_all, execute_query, connect
 
 
 class BettingSystem(commands.Cog):
@@ -24,7 +23,7 @@ class BettingSystem(commands.Cog):
     
     async def cog_load(self):
         """Cog読み込み時にテーブルを作成"""
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 投票イベントテーブル
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS betting_events (
@@ -120,7 +119,7 @@ class BettingSystem(commands.Cog):
         """賭けイベントを作成"""
         await interaction.response.defer(ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 通貨の存在確認
             currency = await fetch_one(db, """
                 SELECT id FROM currencies 
@@ -182,7 +181,7 @@ class BettingSystem(commands.Cog):
             await interaction.followup.send("❌ Botは選手として登録できません。", ephemeral=True)
             return
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # アクティブなイベント取得
             event = await fetch_one(db, """
                 SELECT id, event_name FROM betting_events
@@ -240,7 +239,7 @@ class BettingSystem(commands.Cog):
         """選手を削除（既に賭けがある場合は削除不可）"""
         await interaction.response.defer(ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # アクティブなイベント取得
             event = await fetch_one(db, """
                 SELECT id, event_name FROM betting_events
@@ -304,7 +303,7 @@ class BettingSystem(commands.Cog):
         """選手一覧を表示"""
         await interaction.response.defer()
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # アクティブなイベント取得
             event = await fetch_one(db, """
                 SELECT id, event_name, currency_symbol, total_pool
@@ -390,7 +389,7 @@ class BettingSystem(commands.Cog):
             await interaction.followup.send("❌ Botには賭けられません。", ephemeral=True)
             return
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # アクティブなイベント取得
             event = await fetch_one(db, """
                 SELECT id, event_name, currency_symbol, total_pool
@@ -500,7 +499,7 @@ class BettingSystem(commands.Cog):
         """現在のオッズを表示"""
         await interaction.response.defer()
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # アクティブなイベント取得
             event = await fetch_one(db, """
                 SELECT id, event_name, currency_symbol, total_pool
@@ -567,7 +566,7 @@ class BettingSystem(commands.Cog):
             await interaction.followup.send("❌ Botを勝者に指定できません。")
             return
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # アクティブなイベント取得
             event = await fetch_one(db, """
                 SELECT id, event_name, currency_symbol, total_pool
@@ -669,7 +668,7 @@ class BettingSystem(commands.Cog):
         """賭けイベントをキャンセルし、全員に返金"""
         await interaction.response.defer()
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # アクティブなイベント取得
             event = await fetch_one(db, """
                 SELECT id, event_name, currency_symbol
@@ -739,7 +738,7 @@ class BettingSystem(commands.Cog):
         """過去の賭けイベント履歴"""
         await interaction.response.defer(ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             events = await fetch_all(db, """
                 SELECT event_name, currency_symbol, total_pool, winner_user_id, closed_at
                 FROM betting_events
@@ -777,7 +776,7 @@ class BettingSystem(commands.Cog):
         """自分の賭け状況を確認"""
         await interaction.response.defer(ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # アクティブなイベント取得
             event = await fetch_one(db, """
                 SELECT id, event_name, currency_symbol, total_pool
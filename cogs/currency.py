@@ -7,15 +7,15 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiosqlite
 from decimal import Decimal
 
-from config import DB_PATH, DEFAULT_DECIMALS
+from config import DEFAULT_DECIMALS
 from database import (
     fetch_one, fetch_all, get_asset, create_asset,
     ensure_system_accounts, ensure_guild_setup,
     account_id_by_name, balance_of, upsert_user,
-    ensure_user_account, new_transaction, post_ledger
+    ensure_user_account, new_transaction, post_ledger,
+    connect
 )
 from embeds import create_success_embed, create_error_embed, create_info_embed, create_transaction_embed
 from utils import to_decimal
@@ -38,7 +38,7 @@ class CurrencyCog(commands.Cog):
             return []
         
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
+            async with connect() as db:
                 rows = await fetch_all(db, """
                     SELECT symbol, name FROM assets
                     WHERE guild_id = ?
@@ -77,7 +77,7 @@ class CurrencyCog(commands.Cog):
         
         symbol = symbol.upper()
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 既存チェック
             existing = await get_asset(db, symbol, interaction.guild.id)
             if existing:
@@ -132,7 +132,7 @@ class CurrencyCog(commands.Cog):
         
         symbol = symbol.upper()
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 通貨の存在確認
             asset = await get_asset(db, symbol, interaction.guild.id)
             if not asset:
@@ -141,26 +141,20 @@ class CurrencyCog(commands.Cog):
             
             asset_id, sym, asset_name, decimals = asset
             
-            # 残高情報を取得
-            balance_info = await fetch_all(db, """
-                SELECT account_id, SUM(CAST(amount AS TEXT)) as balance
-                FROM ledger_entries
-                WHERE asset_id = ?
-                GROUP BY account_id
-                HAVING balance != '0'
-            """, (asset_id,))
-            
-            # 請求情報を取得
-            claim_count_row = await fetch_one(db, "SELECT COUNT(*) FROM claims WHERE asset_id = ?", (asset_id,))
-            claim_count = claim_count_row[0] if claim_count_row else 0
+            # 残高を持つアカウント数・請求数を取得（確認Viewには件数だけを渡す）
+            balance_count, claim_count = await fetch_one(db, """
+                SELECT
+                    (SELECT COUNT(*) FROM account_balances WHERE asset_id = ? AND balance_int != 0),
+                    (SELECT COUNT(*) FROM claims WHERE asset_id = ?)
+            """, (asset_id, asset_id))
         
         # 確認メッセージ
         warning_text = f"**⚠️ 警告: この操作は取り消せません**\n\n"
         warning_text += f"通貨 **{symbol}** ({asset_name}) を完全に削除します。\n\n"
         
-        if balance_info:
+        if balance_count > 0:
             warning_text += f"**影響を受けるデータ:**\n"
-            warning_text += f"• 残高を持つアカウント: {len(balance_info)}件\n"
+            warning_text += f"• 残高を持つアカウント: {balance_count}件\n"
         if claim_count > 0:
             warning_text += f"• 関連する請求: {claim_count}件\n"
         
@@ -173,7 +167,7 @@ class CurrencyCog(commands.Cog):
         )
         embed.set_footer(text=f"実行者: {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
         
-        view = CurrencyDeleteConfirmView(symbol, interaction.guild.id, interaction.user, asset, balance_info, claim_count)
+        view = CurrencyDeleteConfirmView(symbol, interaction.guild.id, interaction.user, asset_id, asset_name, balance_count, claim_count)
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
     
     @app_commands.command(name="treasury", description="Treasury残高を確認（管理者のみ）")
@@ -196,7 +190,7 @@ class CurrencyCog(commands.Cog):
         
         await ensure_guild_setup(interaction.guild.id)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             treasury_acc = await account_id_by_name(db, "treasury", interaction.guild.id)
             
             if symbol:
@@ -215,11 +209,10 @@ class CurrencyCog(commands.Cog):
             else:
                 # 全通貨のTreasury残高
                 rows = await fetch_all(db, """
-                    SELECT a.symbol, a.name, a.decimals, COALESCE(SUM(CAST(le.amount AS TEXT)), '0') AS bal
+                    SELECT a.symbol, a.name, a.decimals, COALESCE(ab.balance_int, 0) AS bal
                     FROM assets a
-                    LEFT JOIN ledger_entries le ON le.asset_id = a.id AND le.account_id = ?
+                    LEFT JOIN account_balances ab ON ab.asset_id = a.id AND ab.account_id = ?
                     WHERE a.guild_id = ?
-                    GROUP BY a.id, a.symbol, a.name
                     ORDER BY a.symbol
                 """, (treasury_acc, str(interaction.guild.id)))
                 
@@ -231,7 +224,7 @@ class CurrencyCog(commands.Cog):
                 
                 total_positive = 0
                 for sym, name, decimals, bal in rows:
-                    d = Decimal(bal).quantize(Decimal(10) ** -int(decimals))
+                    d = Decimal(bal).scaleb(-int(decimals))
                     status = "🟢" if d > 0 else "🔴" if d < 0 else "⚪"
                     embed.add_field(name=f"{status} {sym} ({name})", value=f"🏦 {d} {sym}", inline=True)
                     if d > 0:
@@ -270,7 +263,7 @@ class CurrencyCog(commands.Cog):
             embed = create_error_embed("入力エラー", "金額は0より大きい数値を入力してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             async with db.execute("BEGIN"):
                 asset = await get_asset(db, symbol.upper(), interaction.guild.id)
                 if not asset:
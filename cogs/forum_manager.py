@@ -8,11 +8,9 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiosqlite
 import asyncio
 
-from config import DB_PATH
-from database import fetch_one, fetch_all
+from database import fetch_one, fetch_all, connect
 from embeds import create_success_embed, create_error_embed, create_info_embed
 
 
@@ -50,7 +48,7 @@ class ForumManagerCog(commands.Cog):
         # 処理中メッセージを送信
         await interaction.response.defer(ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 既に設定されているかチェック
             existing = await fetch_one(db, """
                 SELECT id FROM forum_settings
@@ -112,7 +110,7 @@ class ForumManagerCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             rows = await fetch_all(db, """
                 SELECT forum_channel_id, role_id, delete_old_posts
                 FROM forum_settings
@@ -167,7 +165,7 @@ class ForumManagerCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 設定を削除
             cursor = await db.execute("""
                 DELETE FROM forum_settings
@@ -198,7 +196,7 @@ class ForumManagerCog(commands.Cog):
         if not added_roles:
             return
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 追加されたロールが設定されているフォーラムを取得
             for role in added_roles:
                 forums = await fetch_all(db, """
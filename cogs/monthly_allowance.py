@@ -7,16 +7,16 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-import aiosqlite
 from decimal import Decimal
 from datetime import datetime
 import logging
 
-from config import DB_PATH, TZ
+from config import TZ
 from database import (
     fetch_one, fetch_all, upsert_user, ensure_user_account,
     account_id_by_name, new_transaction, post_ledger,
-    get_asset, auto_refill_treasury_if_needed, balance_of
+    get_asset, auto_refill_treasury_if_needed, balance_of,
+    connect
 )
 from embeds import create_success_embed, create_error_embed, create_info_embed
 from utils import to_decimal
@@ -30,7 +30,7 @@ async def currency_autocomplete(interaction: discord.Interaction, current: str):
     if not interaction.guild:
         return []
     
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with connect() as db:
         rows = await fetch_all(
             db,
             "SELECT symbol FROM assets WHERE guild_id = ?",
@@ -81,7 +81,7 @@ class MonthlyAllowanceCog(commands.Cog):
     
     async def execute_monthly_allowances(self, year_month: str):
         """月次自動送金を実行"""
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 有効な設定を取得
             settings = await fetch_all(db, """
                 SELECT ma.id, ma.guild_id, ma.role_id, ma.asset_id, ma.amount
@@ -213,7 +213,7 @@ class MonthlyAllowanceCog(commands.Cog):
             embed = create_error_embed("入力エラー", f"無効な金額です: {e}", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 通貨が存在するか確認
             asset = await get_asset(db, symbol, interaction.guild.id)
             if not asset:
@@ -249,7 +249,7 @@ class MonthlyAllowanceCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             settings = await fetch_all(db, """
                 SELECT ma.role_id, a.symbol, ma.amount, ma.enabled
                 FROM monthly_allowances ma
@@ -303,7 +303,7 @@ class MonthlyAllowanceCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 通貨が存在するか確認
             asset = await get_asset(db, symbol, interaction.guild.id)
             if not asset:
@@ -353,7 +353,7 @@ class MonthlyAllowanceCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 通貨が存在するか確認
             asset = await get_asset(db, symbol, interaction.guild.id)
             if not asset:
@@ -404,7 +404,7 @@ class MonthlyAllowanceCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 通貨が存在するか確認
             asset = await get_asset(db, symbol, interaction.guild.id)
             if not asset:
@@ -450,7 +450,7 @@ class MonthlyAllowanceCog(commands.Cog):
         if not year_month:
             year_month = datetime.now(TZ).strftime('%Y-%m')
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             history_records = await fetch_all(db, """
                 SELECT h.role_id, h.user_id, a.symbol, h.amount, h.executed_at
                 FROM monthly_allowance_history h
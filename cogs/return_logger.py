@@ -7,12 +7,11 @@ Detects and notifies when users rejoin the server.
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiosqlite
 from datetime import datetime
 import logging
 
-from config import DB_PATH, TZ
-from database import fetch_one, fetch_all, upsert_user
+from config import TZ
+from database import fetch_one, fetch_all, upsert_user, connect
 from embeds import create_success_embed, create_error_embed, create_info_embed
 
 logger = logging.getLogger(__name__)
@@ -34,7 +33,7 @@ class ReturnLoggerCog(commands.Cog):
         guild_id = str(member.guild.id)
         
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
+            async with connect() as db:
                 # Get settings
                 settings = await fetch_one(db, """
                     SELECT log_channel_id, enabled, notify_threshold
@@ -168,7 +167,7 @@ class ReturnLoggerCog(commands.Cog):
         
         guild_id = str(interaction.guild.id)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # Save settings
             await db.execute("""
                 INSERT INTO return_logger_settings(guild_id, log_channel_id, notify_threshold)
@@ -198,7 +197,7 @@ class ReturnLoggerCog(commands.Cog):
         
         guild_id = str(interaction.guild.id)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # Total users
             total_users = await fetch_one(db, """
                 SELECT COUNT(*) FROM user_join_history WHERE guild_id = ?
@@ -273,7 +272,7 @@ class ReturnLoggerCog(commands.Cog):
         
         guild_id = str(interaction.guild.id)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # Get user ID
             user_row = await fetch_one(db, "SELECT id FROM users WHERE discord_user_id = ?", (str(user.id),))
             if not user_row:
@@ -346,7 +345,7 @@ class ReturnLoggerCog(commands.Cog):
         
         guild_id = str(interaction.guild.id)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # Check if settings exist
             settings = await fetch_one(db, """
                 SELECT log_channel_id FROM return_logger_settings WHERE guild_id = ?
@@ -383,7 +382,7 @@ class ReturnLoggerCog(commands.Cog):
         
         guild_id = str(interaction.guild.id)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             await db.execute("""
                 UPDATE return_logger_settings SET enabled = 0, updated_at = CURRENT_TIMESTAMP
                 WHERE guild_id = ?
@@ -412,7 +411,7 @@ class ReturnLoggerCog(commands.Cog):
         registered_count = 0
         skipped_count = 0
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             for member in interaction.guild.members:
                 # Ignore bots
                 if member.bot:
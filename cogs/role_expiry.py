@@ -6,11 +6,11 @@
 
 import discord
 from discord.ext import commands, tasks
-import aiosqlite
 from datetime import datetime
+import time
 
-from config import DB_PATH, TZ
-from database import fetch_all, fetch_one
+from config import TZ
+from database import fetch_all, fetch_one, connect
 
 
 class RoleExpiryCog(commands.Cog):
@@ -28,9 +28,9 @@ class RoleExpiryCog(commands.Cog):
     async def check_expired_roles(self):
         """期限切れのロールをチェックして剥奪"""
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
-                # 現在時刻を取得
-                now = datetime.now(TZ)
+            async with connect() as db:
+                # 現在時刻を取得（expires_atと同じUNIX時間）
+                now = int(time.time())
                 
                 # 期限切れのロール購入を取得
                 expired_purchases = await fetch_all(db, """
@@ -39,8 +39,8 @@ class RoleExpiryCog(commands.Cog):
                     FROM role_purchases rp
                     JOIN role_plans pl ON rp.plan_id = pl.id
                     JOIN users u ON rp.user_id = u.id
-                    WHERE datetime(rp.expires_at) <= datetime(?)
-                """, (now.isoformat(),))
+                    WHERE rp.expires_at <= ?
+                """, (now,))
                 
                 for purchase_id, user_id, plan_id, guild_id, expires_at, role_id, discord_user_id in expired_purchases:
                     try:
@@ -69,7 +69,7 @@ class RoleExpiryCog(commands.Cog):
                         # ロールを剥奪
                         if role in member.roles:
                             await member.remove_roles(role)
-                            print(f"[ROLE_EXPIRY] {member.display_name} から {role.name} を剥奪しました（期限切れ: {expires_at}）")
+                            print(f"[ROLE_EXPIRY] {member.display_name} から {role.name} を剥奪しました（期限切れ: {datetime.fromtimestamp(expires_at, TZ).isoformat()}）")
                         
                         # 購入記録を削除
                         await db.execute("DELETE FROM role_purchases WHERE id = ?", (purchase_id,))
@@ -7,14 +7,13 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiosqlite
 from decimal import Decimal
 from datetime import datetime, timedelta
 
-from config import DB_PATH, TZ
-from database import fetch_one, fetch_all, get_asset, upsert_user, ensure_user_account, balance_of, account_id_by_name, new_transaction, post_ledger
+from config import TZ
+from database import fetch_one, fetch_all, get_asset, upsert_user, ensure_user_account, balance_of, account_id_by_name, new_transaction, post_ledger, connect
 from embeds import create_success_embed, create_error_embed, create_info_embed
-from utils import to_decimal
+from utils import format_duration_hours, round_amount, to_decimal
 
 
 class RolePanelCog(commands.Cog):
@@ -33,7 +32,7 @@ class RolePanelCog(commands.Cog):
             return []
         
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
+            async with connect() as db:
                 rows = await fetch_all(db, """
                     SELECT DISTINCT panel_name FROM role_panels
                     WHERE guild_id = ?
@@ -60,7 +59,7 @@ class RolePanelCog(commands.Cog):
             return []
         
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
+            async with connect() as db:
                 rows = await fetch_all(db, """
                     SELECT symbol, name FROM assets
                     WHERE guild_id = ?
@@ -94,7 +93,7 @@ class RolePanelCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 既存チェック
             existing = await fetch_one(db, """
                 SELECT panel_id FROM role_panels
@@ -167,7 +166,7 @@ class RolePanelCog(commands.Cog):
             embed = create_error_embed("入力エラー", "価格は0より大きい数値を入力してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # パネルの存在確認
             panel = await fetch_one(db, """
                 SELECT panel_id FROM role_panels
@@ -187,6 +186,12 @@ class RolePanelCog(commands.Cog):
                 embed = create_error_embed("通貨エラー", f"通貨 **{symbol}** が存在しません。", interaction.user)
                 return await interaction.response.send_message(embed=embed, ephemeral=True)
             
+            # 価格は通貨の桁数に丸めて保存（購入時に記帳される金額と一致させる）
+            price_decimal = round_amount(price_decimal, asset[3])
+            if price_decimal <= 0:
+                embed = create_error_embed("入力エラー", f"価格は通貨 **{symbol.upper()}** の最小単位以上を入力してください。", interaction.user)
+                return await interaction.response.send_message(embed=embed, ephemeral=True)
+            
             # プランを追加
             await db.execute("""
                 INSERT INTO role_plans(panel_id, plan_name, role_id, price, currency_symbol, duration_hours, description, guild_id)
@@ -202,11 +207,7 @@ class RolePanelCog(commands.Cog):
             
             await db.commit()
         
-        hours_text = f"{duration_hours}時間"
-        if duration_hours >= 24:
-            days = duration_hours // 24
-            remaining_hours = duration_hours % 24
-            hours_text = f"{days}日" + (f"{remaining_hours}時間" if remaining_hours > 0 else "")
+        hours_text = format_duration_hours(duration_hours)
         
         embed = create_success_embed(
             "プラン追加完了",
@@ -231,7 +232,7 @@ class RolePanelCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # パネルの存在確認
             panel = await fetch_one(db, """
                 SELECT panel_id FROM role_panels
@@ -272,11 +273,7 @@ class RolePanelCog(commands.Cog):
             role = interaction.guild.get_role(int(role_id))
             role_text = role.mention if role else f"(削除済み: {role_id})"
             
-            hours_text = f"{duration_hours}時間"
-            if duration_hours >= 24:
-                days = duration_hours // 24
-                remaining_hours = duration_hours % 24
-                hours_text = f"{days}日" + (f"{remaining_hours}時間" if remaining_hours > 0 else "")
+            hours_text = format_duration_hours(duration_hours)
             
             embed.add_field(
                 name=f"#{plan_id}: {plan_name_db}",
@@ -294,7 +291,7 @@ class RolePanelCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             panels = await fetch_all(db, """
                 SELECT DISTINCT panel_id, panel_name
                 FROM role_panels
@@ -319,7 +316,7 @@ class RolePanelCog(commands.Cog):
         
         for panel_id, panel_name in panels:
             # プラン数を取得
-            async with aiosqlite.connect(DB_PATH) as db:
+            async with connect() as db:
                 plan_count_row = await fetch_one(db, """
                     SELECT COUNT(*) FROM role_plans WHERE panel_id = ?
                 """, (panel_id,))
@@ -343,7 +340,7 @@ class RolePanelCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # パネルの存在確認
             panel = await fetch_one(db, """
                 SELECT panel_id FROM role_panels
@@ -380,7 +377,7 @@ class RolePanelCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # パネルの存在確認
             panel = await fetch_one(db, """
                 SELECT panel_id, role_id, currency_symbol FROM role_panels
@@ -421,11 +418,7 @@ class RolePanelCog(commands.Cog):
         # プラン情報を1行ずつ追加
         plan_lines = []
         for plan_id, plan_name_db, plan_role_id, price, plan_currency, duration_hours, desc in plans:
-            hours_text = f"{duration_hours}時間"
-            if duration_hours >= 24:
-                days = duration_hours // 24
-                remaining_hours = duration_hours % 24
-                hours_text = f"{days}日" + (f"{remaining_hours}時間" if remaining_hours > 0 else "")
+            hours_text = format_duration_hours(duration_hours)
             
             plan_line = f"**{hours_text}**: {price} {plan_currency}"
             if desc:
@@ -448,7 +441,7 @@ class RolePanelCog(commands.Cog):
             message = await interaction.channel.send(embed=embed, view=view)
             
             # deployed_panelsテーブルに記録
-            async with aiosqlite.connect(DB_PATH) as db:
+            async with connect() as db:
                 # role_panelsテーブルのidを取得
                 panel_db_row = await fetch_one(db, """
                     SELECT id FROM role_panels 
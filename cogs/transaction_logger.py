@@ -7,13 +7,12 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import aiosqlite
 from decimal import Decimal
 from datetime import datetime
 import logging
 
-from config import DB_PATH, TZ
-from database import fetch_one
+from config import TZ
+from database import fetch_one, connect
 from embeds import create_success_embed, create_error_embed
 
 logger = logging.getLogger(__name__)
@@ -26,7 +25,7 @@ async def send_transaction_log(
 ):
     """送金ログを送信"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 設定を取得
             settings = await fetch_one(db, """
                 SELECT log_channel_id, enabled
@@ -121,7 +120,7 @@ class TransactionLoggerCog(commands.Cog):
         
         guild_id = str(interaction.guild.id)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 設定を保存
             await db.execute("""
                 INSERT INTO transaction_log_settings(guild_id, log_channel_id, enabled)
@@ -150,7 +149,7 @@ class TransactionLoggerCog(commands.Cog):
         
         guild_id = str(interaction.guild.id)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             # 設定が存在するか確認
             settings = await fetch_one(db, """
                 SELECT log_channel_id FROM transaction_log_settings WHERE guild_id = ?
@@ -187,7 +186,7 @@ class TransactionLoggerCog(commands.Cog):
         
         guild_id = str(interaction.guild.id)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             await db.execute("""
                 UPDATE transaction_log_settings SET enabled = 0, updated_at = CURRENT_TIMESTAMP
                 WHERE guild_id = ?
@@ -9,63 +9,238 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 import aiosqlite
+import asyncio
+from contextlib import asynccontextmanager
 from decimal import Decimal
 from datetime import datetime, timedelta
 import logging
 
-from config import DB_PATH, TZ
+from config import TZ
 from database import (
     fetch_one, fetch_all, upsert_user, ensure_user_account,
-    account_id_by_name, new_transaction, post_ledger,
-    get_asset, auto_refill_treasury_if_needed, balance_of
+    account_id_by_name, new_transaction, post_ledger_many,
+    get_asset, auto_refill_treasury_if_needed, balance_of,
+    migrate_integer_columns, open_db, close_connection
 )
 from embeds import create_success_embed, create_error_embed, create_info_embed
-from utils import to_decimal
+from utils import round_amount, to_decimal
 
 logger = logging.getLogger(__name__)
 
+# 読み取り専用接続の数
+READER_POOL_SIZE = 3
+
+# 権限タイプごとの表示
+PERMISSION_EMOJI = {
+    'basic': '🔒',
+    'secret': '🔐',
+    'freedom': '🌟'
+}
+PERMISSION_DESC = {
+    'basic': '基本権限（管理権限なし）',
+    'secret': '非表示 + ユーザー招待可能',
+    'freedom': '完全な権限管理が可能'
+}
+VALID_PERMISSION_TYPES = frozenset(PERMISSION_EMOJI)
+
+# テーブル定義（IDはDiscordのスノーフレーク、期限はUNIX秒をINTEGERで保持）
+VC_PLANS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        template_name TEXT NOT NULL,
+        plan_name TEXT NOT NULL,
+        vc_name_template TEXT NOT NULL,
+        price TEXT NOT NULL,
+        currency_symbol TEXT NOT NULL,
+        duration_hours INTEGER NOT NULL,
+        user_limit INTEGER DEFAULT 0,
+        free_role_id INTEGER,
+        category_id INTEGER,
+        permission_type TEXT NOT NULL DEFAULT 'basic',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(guild_id, plan_name)
+    )
+"""
+
+ACTIVE_VCS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        owner_user_id INTEGER NOT NULL,
+        plan_id INTEGER NOT NULL,
+        expires_at INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+VC_PANEL_DEPLOYMENTS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        message_id INTEGER NOT NULL,
+        title TEXT,
+        description TEXT,
+        deployed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# 頻繁に実行するSQL（モジュール読み込み時に一度だけ生成）
+SQL_HAS_EXPIRED_VC = "SELECT 1 FROM active_vcs WHERE expires_at <= ? LIMIT 1"
+SQL_EXPIRED_VCS = """
+    SELECT guild_id, channel_id, id
+    FROM active_vcs
+    WHERE expires_at <= ?
+"""
+SQL_DELETE_ACTIVE_VC = "DELETE FROM active_vcs WHERE id = ?"
+SQL_LIST_TEMPLATES = "SELECT DISTINCT template_name FROM vc_plans WHERE guild_id = ? ORDER BY template_name"
+SQL_LIST_CURRENCIES = "SELECT symbol, name FROM assets WHERE guild_id = ? ORDER BY symbol"
+SQL_LIST_PLAN_NAMES = "SELECT plan_name FROM vc_plans WHERE guild_id = ? ORDER BY plan_name"
+SQL_GET_PLAN = """
+    SELECT id, plan_name, vc_name_template, price, currency_symbol, duration_hours,
+           user_limit, free_role_id, category_id, permission_type
+    FROM vc_plans
+    WHERE id = ?
+"""
+SQL_UPSERT_USER_ACCOUNT = """
+    INSERT INTO accounts(user_id, guild_id, name, type) VALUES (?, ?, ?, 'user')
+    ON CONFLICT(name) DO UPDATE SET name = excluded.name
+    RETURNING id
+"""
+SQL_INSERT_ACTIVE_VC = """
+    INSERT INTO active_vcs(guild_id, channel_id, owner_user_id, plan_id, expires_at)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
 
 class VCCreatorCog(commands.Cog):
     """VC自動作成コマンド群"""
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.db: aiosqlite.Connection | None = None
+        # 読み取り専用接続のプール（WALなので書き込み中でも並行して読める）
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        # 共有接続での書き込みトランザクションを直列化するロック
+        self._write_lock = asyncio.Lock()
+        # plan_id -> SQL_GET_PLAN の行（ボタン押下時の再SELECTを省く）
+        self._plan_cache: dict[int, tuple] = {}
+    
+    async def cog_load(self):
+        """Cog読み込み時に共有接続を開き、テーブルを作成（TEXTで保存されていたID・期限はINTEGERに移行）"""
+        # WALモード＋mmapなどのPRAGMAはopen_db()で適用される
+        self.db = await open_db()
+        db = self.db
+        
+        await migrate_integer_columns(db, "vc_plans", VC_PLANS_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+            "free_role_id": "CAST(free_role_id AS INTEGER)",
+            "category_id": "CAST(category_id AS INTEGER)",
+        })
+        await migrate_integer_columns(db, "active_vcs", ACTIVE_VCS_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+            "channel_id": "CAST(channel_id AS INTEGER)",
+            "owner_user_id": "CAST(owner_user_id AS INTEGER)",
+            "expires_at": "CAST(strftime('%s', expires_at) AS INTEGER)",
+        })
+        await migrate_integer_columns(db, "vc_panel_deployments", VC_PANEL_DEPLOYMENTS_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+            "channel_id": "CAST(channel_id AS INTEGER)",
+            "message_id": "CAST(message_id AS INTEGER)",
+        })
+        
+        await db.execute(VC_PLANS_SQL.format(name="vc_plans"))
+        await db.execute(ACTIVE_VCS_SQL.format(name="active_vcs"))
+        await db.execute(VC_PANEL_DEPLOYMENTS_SQL.format(name="vc_panel_deployments"))
+        
+        # 期限切れVCの検索用（カバリングインデックス）
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_active_vcs_expires
+            ON active_vcs(expires_at, guild_id, channel_id, id)
+        """)
+        
+        # テンプレート一覧のGROUP BY用（インデックス順に集計してソートを省く）
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_vc_plans_guild_template
+            ON vc_plans(guild_id, template_name)
+        """)
+        await db.commit()
+        
+        # 読み取り用の接続を開く（書き込みはself.dbに集約）
+        for _ in range(READER_POOL_SIZE):
+            reader = await open_db()
+            await reader.execute("PRAGMA query_only=1")
+            self._readers.put_nowait(reader)
+        
+        # 接続とテーブルの準備が済んでから期限切れVCの定期削除を開始
         self.cleanup_expired_vcs.start()
     
-    def cog_unload(self):
-        """Cogアンロード時にタスクを停止"""
+    async def cog_unload(self):
+        """Cogアンロード時にタスクを停止し、共有接続と読み取り用接続を閉じる"""
         self.cleanup_expired_vcs.cancel()
+        while not self._readers.empty():
+            await close_connection(self._readers.get_nowait())
+        if self.db is not None:
+            await close_connection(self.db)
+            self.db = None
+    
+    @asynccontextmanager
+    async def _write(self):
+        """
+        共有接続で書き込みトランザクションを実行（BEGIN IMMEDIATE）
+        
+        ロック内で実行するため、他の処理の書き込みが同じトランザクションに混ざらない。
+        呼び出し側でコミットせずに抜けた場合（早期return・例外）はロールバックします。
+        """
+        async with self._write_lock:
+            await self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.db
+            finally:
+                if self.db.in_transaction:
+                    await self.db.rollback()
+    
+    @asynccontextmanager
+    async def _read(self):
+        """読み取り用接続をプールから借りる"""
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
     
     @tasks.loop(minutes=5)
     async def cleanup_expired_vcs(self):
         """期限切れのVCを削除"""
-        now = datetime.now(TZ)
+        now = int(datetime.now(TZ).timestamp())
         
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
-                expired_vcs = await fetch_all(db, """
-                    SELECT guild_id, channel_id, id
-                    FROM active_vcs
-                    WHERE expires_at <= ?
-                """, (now.isoformat(),))
-                
-                for guild_id, channel_id, vc_id in expired_vcs:
-                    guild = self.bot.get_guild(int(guild_id))
-                    if guild:
-                        channel = guild.get_channel(int(channel_id))
-                        if channel:
-                            try:
-                                await channel.delete(reason="有効期限切れ")
-                                logger.info(f"[VC_CREATOR] 期限切れVCを削除: {channel.name} (ID: {channel_id})")
-                            except Exception as e:
-                                logger.error(f"[VC_CREATOR] VC削除エラー: {e}")
-                    
-                    # DBから削除
-                    await db.execute("DELETE FROM active_vcs WHERE id = ?", (vc_id,))
+            async with self._read() as db:
+                # 期限切れが1件もなければ全件取得はしない（インデックスで即判定）
+                if not await fetch_one(db, SQL_HAS_EXPIRED_VC, (now,)):
+                    return
                 
-                if expired_vcs:
+                expired_vcs = await fetch_all(db, SQL_EXPIRED_VCS, (now,))
+            
+            for guild_id, channel_id, vc_id in expired_vcs:
+                guild = self.bot.get_guild(guild_id)
+                if guild:
+                    channel = guild.get_channel(channel_id)
+                    if channel:
+                        try:
+                            await channel.delete(reason="有効期限切れ")
+                            logger.info(f"[VC_CREATOR] 期限切れVCを削除: {channel.name} (ID: {channel_id})")
+                        except Exception as e:
+                            logger.error(f"[VC_CREATOR] VC削除エラー: {e}")
+            
+            # DBからまとめて削除
+            if expired_vcs:
+                async with self._write() as db:
+                    await db.executemany(SQL_DELETE_ACTIVE_VC, [(vc_id,) for _, _, vc_id in expired_vcs])
                     await db.commit()
-                    logger.info(f"[VC_CREATOR] {len(expired_vcs)}個の期限切れVCを削除しました")
+                logger.info(f"[VC_CREATOR] {len(expired_vcs)}個の期限切れVCを削除しました")
         except Exception as e:
             logger.error(f"[VC_CREATOR] VC自動削除エラー: {e}")
     
@@ -85,20 +260,16 @@ class VCCreatorCog(commands.Cog):
             return []
         
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
-                rows = await fetch_all(db, """
-                    SELECT DISTINCT template_name FROM vc_plans
-                    WHERE guild_id = ?
-                    ORDER BY template_name
-                """, (str(interaction.guild.id),))
-                
-                choices = [
-                    app_commands.Choice(name=template_name, value=template_name)
-                    for (template_name,) in rows
-                    if current.lower() in template_name.lower()
-                ]
-                
-                return choices[:25]
+            async with self._read() as db:
+                rows = await fetch_all(db, SQL_LIST_TEMPLATES, (interaction.guild.id,))
+            
+            choices = [
+                app_commands.Choice(name=template_name, value=template_name)
+                for (template_name,) in rows
+                if current.lower() in template_name.lower()
+            ]
+            
+            return choices[:25]
         except:
             return []
     
@@ -112,20 +283,16 @@ class VCCreatorCog(commands.Cog):
             return []
         
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
-                rows = await fetch_all(db, """
-                    SELECT symbol, name FROM assets
-                    WHERE guild_id = ?
-                    ORDER BY symbol
-                """, (str(interaction.guild.id),))
-                
-                choices = [
-                    app_commands.Choice(name=f"{symbol} - {name}", value=symbol)
-                    for symbol, name in rows
-                    if current.upper() in symbol.upper() or current in name
-                ]
-                
-                return choices[:25]
+            async with self._read() as db:
+                rows = await fetch_all(db, SQL_LIST_CURRENCIES, (interaction.guild.id,))
+            
+            choices = [
+                app_commands.Choice(name=f"{symbol} - {name}", value=symbol)
+                for symbol, name in rows
+                if current.upper() in symbol.upper() or current in name
+            ]
+            
+            return choices[:25]
         except:
             return []
     
@@ -139,20 +306,16 @@ class VCCreatorCog(commands.Cog):
             return []
         
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
-                rows = await fetch_all(db, """
-                    SELECT plan_name FROM vc_plans
-                    WHERE guild_id = ?
-                    ORDER BY plan_name
-                """, (str(interaction.guild.id),))
-                
-                choices = [
-                    app_commands.Choice(name=plan_name, value=plan_name)
-                    for (plan_name,) in rows
-                    if current.lower() in plan_name.lower()
-                ]
-                
-                return choices[:25]
+            async with self._read() as db:
+                rows = await fetch_all(db, SQL_LIST_PLAN_NAMES, (interaction.guild.id,))
+            
+            choices = [
+                app_commands.Choice(name=plan_name, value=plan_name)
+                for (plan_name,) in rows
+                if current.lower() in plan_name.lower()
+            ]
+            
+            return choices[:25]
         except:
             return []
     
@@ -182,37 +345,37 @@ class VCCreatorCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with self._read() as db:
             templates = await fetch_all(db, """
                 SELECT template_name, COUNT(*) as plan_count
                 FROM vc_plans
                 WHERE guild_id = ?
                 GROUP BY template_name
                 ORDER BY template_name
-            """, (str(interaction.guild.id),))
-            
-            if not templates:
-                embed = create_info_embed(
-                    "VCテンプレート一覧",
-                    "設定されているVCテンプレートはありません。",
-                    interaction.user
-                )
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            embed = discord.Embed(
-                title="📋 VCテンプレート一覧",
-                color=discord.Color.blue()
+            """, (interaction.guild.id,))
+        
+        if not templates:
+            embed = create_info_embed(
+                "VCテンプレート一覧",
+                "設定されているVCテンプレートはありません。",
+                interaction.user
             )
-            
-            for template_name, plan_count in templates:
-                embed.add_field(
-                    name=f"📁 {template_name}",
-                    value=f"プラン数: {plan_count}個",
-                    inline=True
-                )
-            
-            embed.set_footer(text=f"実行者: {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        embed = discord.Embed(
+            title="📋 VCテンプレート一覧",
+            color=discord.Color.blue()
+        )
+        
+        for template_name, plan_count in templates:
+            embed.add_field(
+                name=f"📁 {template_name}",
+                value=f"プラン数: {plan_count}個",
+                inline=True
+            )
+        
+        embed.set_footer(text=f"実行者: {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
     
     @vc_plan_group.command(name="create", description="VCプランを作成（管理者のみ）")
     @app_commands.describe(
@@ -251,7 +414,7 @@ class VCCreatorCog(commands.Cog):
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
         # 権限タイプの検証
-        if permission_type not in ['basic', 'secret', 'freedom']:
+        if permission_type not in VALID_PERMISSION_TYPES:
             embed = create_error_embed("入力エラー", "権限タイプは basic, secret, freedom のいずれかを指定してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
@@ -264,15 +427,28 @@ class VCCreatorCog(commands.Cog):
             embed = create_error_embed("入力エラー", f"無効な金額です: {e}", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # 通貨が存在するか確認
+        # 有効期限・人数制限の検証（VC作成時に失敗しないよう、DBに触れる前に弾く）
+        if duration_hours <= 0:
+            embed = create_error_embed("入力エラー", "有効期限は1時間以上を指定してください。", interaction.user)
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        if not 0 <= user_limit <= 99:
+            embed = create_error_embed("入力エラー", "ユーザー制限は0〜99の範囲で指定してください。", interaction.user)
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        # 通貨が存在するか確認
+        async with self._read() as db:
             asset = await get_asset(db, currency_symbol, interaction.guild.id)
-            if not asset:
-                embed = create_error_embed("通貨エラー", f"通貨 `{currency_symbol}` が見つかりません。", interaction.user)
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            # プランを追加
-            try:
+        if not asset:
+            embed = create_error_embed("通貨エラー", f"通貨 `{currency_symbol}` が見つかりません。", interaction.user)
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        # 料金は通貨の桁数に丸めて保存（VC作成時に記帳される金額と一致させる）
+        price_decimal = round_amount(price_decimal, asset[3])
+        
+        # プランを追加
+        try:
+            async with self._write() as db:
                 await db.execute("""
                     INSERT INTO vc_plans(
                         guild_id, template_name, plan_name, vc_name_template, price, currency_symbol,
@@ -280,23 +456,16 @@ class VCCreatorCog(commands.Cog):
                     )
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
-                    str(interaction.guild.id), template_name, plan_name, vc_name_template, str(price_decimal),
+                    interaction.guild.id, template_name, plan_name, vc_name_template, str(price_decimal),
                     currency_symbol, duration_hours, user_limit,
-                    str(free_role.id) if free_role else None,
-                    str(category.id) if category else None,
+                    free_role.id if free_role else None,
+                    category.id if category else None,
                     permission_type
                 ))
                 await db.commit()
-            except aiosqlite.IntegrityError:
-                embed = create_error_embed("作成エラー", f"プラン `{plan_name}` は既に存在します。", interaction.user)
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-        
-        # 権限タイプの説明
-        permission_desc = {
-            'basic': '基本権限（管理権限なし）',
-            'secret': '非表示 + ユーザー招待可能',
-            'freedom': '完全な権限管理が可能'
-        }
+        except aiosqlite.IntegrityError:
+            embed = create_error_embed("作成エラー", f"プラン `{plan_name}` は既に存在します。", interaction.user)
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
         
         embed = create_success_embed(
             "VCプラン作成完了",
@@ -305,7 +474,7 @@ class VCCreatorCog(commands.Cog):
             f"**VC名:** {vc_name_template}\n"
             f"**料金:** {price_decimal} {currency_symbol}\n"
             f"**有効期限:** {duration_hours}時間\n"
-            f"**権限タイプ:** {permission_type} ({permission_desc[permission_type]})\n"
+            f"**権限タイプ:** {permission_type} ({PERMISSION_DESC[permission_type]})\n"
             f"**ユーザー制限:** {user_limit if user_limit > 0 else '無制限'}\n"
             f"**無料ロール:** {free_role.mention if free_role else 'なし'}\n"
             f"**カテゴリ:** {category.name if category else 'なし'}",
@@ -322,7 +491,7 @@ class VCCreatorCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with self._read() as db:
             if template_name:
                 plans = await fetch_all(db, """
                     SELECT template_name, plan_name, vc_name_template, price, currency_symbol, duration_hours,
@@ -330,7 +499,7 @@ class VCCreatorCog(commands.Cog):
                     FROM vc_plans
                     WHERE guild_id = ? AND template_name = ?
                     ORDER BY permission_type, plan_name
-                """, (str(interaction.guild.id), template_name))
+                """, (interaction.guild.id, template_name))
             else:
                 plans = await fetch_all(db, """
                     SELECT template_name, plan_name, vc_name_template, price, currency_symbol, duration_hours,
@@ -338,44 +507,42 @@ class VCCreatorCog(commands.Cog):
                     FROM vc_plans
                     WHERE guild_id = ?
                     ORDER BY template_name, permission_type, plan_name
-                """, (str(interaction.guild.id),))
-            
-            if not plans:
-                embed = create_info_embed(
-                    "VCプラン一覧",
-                    "設定されているVCプランはありません。",
-                    interaction.user
-                )
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            embed = discord.Embed(
-                title=f"📋 VCプラン一覧{f' - {template_name}' if template_name else ''}",
-                color=discord.Color.blue()
+                """, (interaction.guild.id,))
+        
+        if not plans:
+            embed = create_info_embed(
+                "VCプラン一覧",
+                "設定されているVCプランはありません。",
+                interaction.user
             )
-            
-            for template, plan_name, vc_template, price, symbol, duration, limit, free_role_id, perm_type in plans:
-                free_role = interaction.guild.get_role(int(free_role_id)) if free_role_id else None
-                
-                perm_emoji = {
-                    'basic': '🔒',
-                    'secret': '🔐',
-                    'freedom': '🌟'
-                }
-                
-                embed.add_field(
-                    name=f"{perm_emoji.get(perm_type, '🔒')} {plan_name}",
-                    value=(
-                        f"**テンプレート:** {template}\n"
-                        f"**料金:** {duration}時間 {price} {symbol}\n"
-                        f"**制限:** {limit if limit > 0 else '無制限'}人\n"
-                        f"**無料:** {free_role.mention if free_role else 'なし'}\n"
-                        f"**権限:** {perm_type}"
-                    ),
-                    inline=True
-                )
-            
-            embed.set_footer(text=f"実行者: {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        embed = discord.Embed(
+            title=f"📋 VCプラン一覧{f' - {template_name}' if template_name else ''}",
+            color=discord.Color.blue()
+        )
+        
+        # 無料ロールは重複が多いので、ループ前に一度だけ解決しておく
+        guild = interaction.guild
+        roles = {role_id: guild.get_role(role_id) for role_id in {plan[7] for plan in plans if plan[7]}}
+        
+        for template, plan_name, vc_template, price, symbol, duration, limit, free_role_id, perm_type in plans:
+            free_role = roles.get(free_role_id) if free_role_id else None
+            
+            embed.add_field(
+                name=f"{PERMISSION_EMOJI.get(perm_type, '🔒')} {plan_name}",
+                value=(
+                    f"**テンプレート:** {template}\n"
+                    f"**料金:** {duration}時間 {price} {symbol}\n"
+                    f"**制限:** {limit if limit > 0 else '無制限'}人\n"
+                    f"**無料:** {free_role.mention if free_role else 'なし'}\n"
+                    f"**権限:** {perm_type}"
+                ),
+                inline=True
+            )
+        
+        embed.set_footer(text=f"実行者: {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
     
     @vc_plan_group.command(name="delete", description="VCプランを削除（管理者のみ）")
     @app_commands.describe(plan_name="削除するプラン名")
@@ -386,29 +553,33 @@ class VCCreatorCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute("""
+        async with self._write() as db:
+            deleted_rows = await fetch_all(db, """
                 DELETE FROM vc_plans
                 WHERE guild_id = ? AND plan_name = ?
-            """, (str(interaction.guild.id), plan_name))
-            
-            deleted = cursor.rowcount
+                RETURNING id
+            """, (interaction.guild.id, plan_name))
             await db.commit()
-            
-            if deleted > 0:
-                embed = create_success_embed(
-                    "VCプラン削除完了",
-                    f"プラン `{plan_name}` を削除しました。",
-                    interaction.user
-                )
-            else:
-                embed = create_error_embed(
-                    "削除エラー",
-                    f"プラン `{plan_name}` が見つかりませんでした。",
-                    interaction.user
-                )
-            
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        deleted = len(deleted_rows)
+        
+        for (deleted_id,) in deleted_rows:
+            self._plan_cache.pop(deleted_id, None)
+        
+        if deleted > 0:
+            embed = create_success_embed(
+                "VCプラン削除完了",
+                f"プラン `{plan_name}` を削除しました。",
+                interaction.user
+            )
+        else:
+            embed = create_error_embed(
+                "削除エラー",
+                f"プラン `{plan_name}` が見つかりませんでした。",
+                interaction.user
+            )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
     
     @vc_panel_group.command(name="deploy", description="VCパネルを設置（管理者のみ）")
     @app_commands.describe(
@@ -431,50 +602,60 @@ class VCCreatorCog(commands.Cog):
         
         await interaction.response.defer(ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # 指定したテンプレートのプランを取得
-            plans = await fetch_all(db, """
-                SELECT id, plan_name, price, currency_symbol, duration_hours, permission_type
+        # 指定したテンプレートのプランを取得
+        async with self._read() as db:
+            plan_rows = await fetch_all(db, """
+                SELECT id, plan_name, vc_name_template, price, currency_symbol, duration_hours,
+                       user_limit, free_role_id, category_id, permission_type
                 FROM vc_plans
                 WHERE guild_id = ? AND template_name = ?
                 ORDER BY permission_type, duration_hours
-            """, (str(interaction.guild.id), template_name))
-            
-            if not plans:
-                embed = create_error_embed(
-                    "設置エラー",
-                    f"テンプレート `{template_name}` にプランが1つも作成されていません。\n先に `/vc_plan create` でプランを作成してください。",
-                    interaction.user
-                )
-                return await interaction.followup.send(embed=embed, ephemeral=True)
-            
-            # プラン一覧を作成
-            plan_list = []
-            for plan_id, plan_name, price, symbol, duration, perm_type in plans:
-                plan_list.append(f"{plan_name}: {duration}時間 - {price} {symbol}")
-            
-            # Embedを作成
-            full_description = description + "\n\n" + "\n".join(plan_list)
-            
-            panel_embed = discord.Embed(
-                title=title,
-                description=full_description,
-                color=discord.Color.blue()
+            """, (interaction.guild.id, template_name))
+        
+        # ボタンから参照されるプランをキャッシュしておく
+        for row in plan_rows:
+            self._plan_cache[row[0]] = row
+        
+        plans = [
+            (plan_id, plan_name, price, symbol, duration, perm_type)
+            for plan_id, plan_name, _, price, symbol, duration, _, _, _, perm_type in plan_rows
+        ]
+        
+        if not plans:
+            embed = create_error_embed(
+                "設置エラー",
+                f"テンプレート `{template_name}` にプランが1つも作成されていません。\n先に `/vc_plan create` でプランを作成してください。",
+                interaction.user
             )
-            panel_embed.set_footer(text="ボタンを押してVCを作成")
-            
-            # ボタンを作成
-            view = VCPanelView(plans)
-            
-            # パネルを送信
-            message = await interaction.channel.send(embed=panel_embed, view=view)
-            
-            # DBに記録
+            return await interaction.followup.send(embed=embed, ephemeral=True)
+        
+        # プラン一覧を作成
+        plan_list = []
+        for plan_id, plan_name, price, symbol, duration, perm_type in plans:
+            plan_list.append(f"{plan_name}: {duration}時間 - {price} {symbol}")
+        
+        # Embedを作成
+        full_description = description + "\n\n" + "\n".join(plan_list)
+        
+        panel_embed = discord.Embed(
+            title=title,
+            description=full_description,
+            color=discord.Color.blue()
+        )
+        panel_embed.set_footer(text="ボタンを押してVCを作成")
+        
+        # ボタンを作成
+        view = VCPanelView(plans)
+        
+        # パネルを送信
+        message = await interaction.channel.send(embed=panel_embed, view=view)
+        
+        # DBに記録（Discordへの送信を待つ間は接続を使わず、送信後にまとめて書き込む）
+        async with self._write() as db:
             await db.execute("""
                 INSERT INTO vc_panel_deployments(guild_id, channel_id, message_id, title, description)
                 VALUES (?, ?, ?, ?, ?)
-            """, (str(interaction.guild.id), str(interaction.channel.id), str(message.id), title, description))
-            
+            """, (interaction.guild.id, interaction.channel.id, message.id, title, description))
             await db.commit()
         
         embed = create_success_embed(
@@ -484,144 +665,148 @@ class VCCreatorCog(commands.Cog):
         )
         await interaction.followup.send(embed=embed, ephemeral=True)
     
+    async def _charge(self, db, uid: int, user, guild, plan_name: str, symbol: str, price_decimal: Decimal) -> discord.Embed | None:
+        """
+        VC作成料金をユーザーからTreasuryへ引き落とす（_write() のトランザクション内で呼び出す）
+        
+        Returns:
+            引き落とせなかった場合はエラーのEmbed、成功した場合None
+        """
+        asset = await get_asset(db, symbol, guild.id)
+        if not asset:
+            return create_error_embed("通貨エラー", f"通貨 `{symbol}` が見つかりません。", user)
+        
+        asset_id = asset[0]
+        
+        # ユーザーアカウントを取得/作成（UPSERT + RETURNINGで1往復）
+        user_account_name = f"user:{user.id}:{guild.id}"
+        user_account_row = await fetch_one(db, SQL_UPSERT_USER_ACCOUNT, (uid, guild.id, user_account_name))
+        user_account_id = int(user_account_row[0])
+        
+        # 残高をチェック
+        user_balance = await balance_of(db, user_account_id, asset_id)
+        if user_balance < price_decimal:
+            return create_error_embed(
+                "残高不足",
+                f"残高が不足しています。\n\n**必要:** {price_decimal} {symbol}\n**残高:** {user_balance} {symbol}",
+                user
+            )
+        
+        # Treasuryアカウントを取得
+        treasury_account_id = await account_id_by_name(db, 'treasury', guild.id)
+        
+        # 送金を実行
+        tx_id = await new_transaction(
+            db,
+            kind='vc_creation',
+            created_by_user_id=uid,
+            unique_hash=None,
+            reference=f'VC作成: {plan_name}'
+        )
+        
+        # ユーザーから引き出し（マイナス）、Treasuryに送金（プラス）
+        await post_ledger_many(db, tx_id, [
+            (user_account_id, asset_id, -price_decimal),
+            (treasury_account_id, asset_id, price_decimal),
+        ])
+        return None
+    
     async def create_vc_from_plan(self, interaction: discord.Interaction, plan_id: int):
         """プランからVCを作成"""
         guild = interaction.guild
         user = interaction.user
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # プラン情報を取得
-            plan = await fetch_one(db, """
-                SELECT id, plan_name, vc_name_template, price, currency_symbol, duration_hours,
-                       user_limit, free_role_id, category_id, permission_type
-                FROM vc_plans
-                WHERE id = ?
-            """, (plan_id,))
+        # プラン情報を取得（キャッシュになければDBから）
+        plan = self._plan_cache.get(plan_id)
+        if plan is None:
+            async with self._read() as db:
+                plan = await fetch_one(db, SQL_GET_PLAN, (plan_id,))
             
             if not plan:
                 embed = create_error_embed("エラー", "プランが見つかりませんでした。", user)
                 return await interaction.followup.send(embed=embed, ephemeral=True)
             
-            (plan_id, plan_name, vc_template, price, symbol, duration, limit,
-             free_role_id, category_id, perm_type) = plan
-            
-            price_decimal = Decimal(price)
-            
+            self._plan_cache[plan_id] = plan
+        
+        (plan_id, plan_name, vc_template, price, symbol, duration, limit,
+         free_role_id, category_id, perm_type) = plan
+        
+        # 無料ロールをチェック（DBへの書き込みより先に判定）
+        is_free = False
+        if free_role_id:
+            free_role = guild.get_role(free_role_id)
+            if free_role and free_role in user.roles:
+                is_free = True
+        
+        price_decimal = Decimal(price)
+        
+        # 残高確認から引き落としまでを1つのトランザクションで行う（同時に押されても残高を超えて引き落とさない）
+        async with self._write() as db:
             # ユーザーIDを取得（無料・有料問わず必要）
             uid = await upsert_user(db, user.id)
             
-            # 無料ロールをチェック
-            is_free = False
-            if free_role_id:
-                free_role = guild.get_role(int(free_role_id))
-                if free_role and free_role in user.roles:
-                    is_free = True
-            
-            # 通貨を引き落とし
-            if not is_free:
-                asset = await get_asset(db, symbol, guild.id)
-                if not asset:
-                    embed = create_error_embed("通貨エラー", f"通貨 `{symbol}` が見つかりません。", user)
-                    return await interaction.followup.send(embed=embed, ephemeral=True)
-                
-                asset_id = asset[0]
-                
-                # ユーザーアカウントを取得/作成
-                user_account_name = f"user:{user.id}:{guild.id}"
-                await db.execute(
-                    "INSERT OR IGNORE INTO accounts(user_id, guild_id, name, type) VALUES (?,?,?, 'user')",
-                    (uid, str(guild.id), user_account_name),
-                )
-                user_account_row = await fetch_one(db, "SELECT id FROM accounts WHERE name=?", (user_account_name,))
-                user_account_id = int(user_account_row[0])
-                
-                # 残高をチェック
-                user_balance = await balance_of(db, user_account_id, asset_id)
-                if user_balance < price_decimal:
-                    embed = create_error_embed(
-                        "残高不足",
-                        f"残高が不足しています。\n\n**必要:** {price_decimal} {symbol}\n**残高:** {user_balance} {symbol}",
-                        user
-                    )
-                    return await interaction.followup.send(embed=embed, ephemeral=True)
-                
-                # Treasuryアカウントを取得
-                treasury_account_id = await account_id_by_name(db, 'treasury', guild.id)
-                
-                # 送金を実行
-                tx_id = await new_transaction(
-                    db,
-                    kind='vc_creation',
-                    created_by_user_id=uid,
-                    unique_hash=None,
-                    reference=f'VC作成: {plan_name}'
-                )
-                
-                # ユーザーから引き出し（マイナス）
-                await post_ledger(db, tx_id, user_account_id, asset_id, -price_decimal)
-                
-                # Treasuryに送金（プラス）
-                await post_ledger(db, tx_id, treasury_account_id, asset_id, price_decimal)
-                
+            # 通貨を引き落とし（無料の場合はユーザー登録のみ）
+            error_embed = None if is_free else await self._charge(db, uid, user, guild, plan_name, symbol, price_decimal)
+            if error_embed is None:
                 await db.commit()
-            
-            # VCを作成
-            vc_name = vc_template.replace('{user}', user.display_name)
-            category = guild.get_channel(int(category_id)) if category_id else None
-            
-            # 権限設定（secretのみ独自設定）
-            if perm_type == 'secret':
-                overwrites = {
-                    guild.default_role: discord.PermissionOverwrite(view_channel=False),
-                    user: discord.PermissionOverwrite(
-                        view_channel=True,
-                        connect=True,
-                        speak=True,
-                        manage_permissions=True,
-                        manage_channels=False
-                    )
-                }
-            else:
-                # basic と freedom はカテゴリー同期を使用
-                overwrites = None
-            
-            # VCを作成
-            try:
-                # VCチャンネル作成のパラメータ
-                create_params = {
-                    'name': vc_name,
-                    'category': category,
-                    'user_limit': limit if limit > 0 else None
-                }
-                
-                # secretの場合のみoverwritesを設定
-                if overwrites is not None:
-                    create_params['overwrites'] = overwrites
-                
-                vc = await guild.create_voice_channel(**create_params)
-                
-                # カテゴリーの権限に同期（basic と freedom）
-                if category and perm_type in ['basic', 'freedom']:
-                    await vc.edit(sync_permissions=True)
-                
-                # ユーザー固有の権限を設定
-                if perm_type == 'basic':
-                    await vc.set_permissions(user, view_channel=True, connect=True, speak=True, manage_channels=False)
-                elif perm_type == 'freedom':
-                    await vc.set_permissions(user, view_channel=True, connect=True, speak=True, manage_channels=True, manage_permissions=True)
-            except Exception as e:
-                embed = create_error_embed("作成エラー", f"VCの作成に失敗しました:\n```\n{str(e)}\n```", user)
-                return await interaction.followup.send(embed=embed, ephemeral=True)
-            
-            # 有効期限を計算
-            expires_at = datetime.now(TZ) + timedelta(hours=duration)
-            
-            # DBに記録
-            await db.execute("""
-                INSERT INTO active_vcs(guild_id, channel_id, owner_user_id, plan_id, expires_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (str(guild.id), str(vc.id), uid, plan_id, expires_at.isoformat()))
-            
+        
+        if error_embed is not None:
+            return await interaction.followup.send(embed=error_embed, ephemeral=True)
+        
+        # VCを作成
+        vc_name = vc_template.replace('{user}', user.display_name)
+        category = guild.get_channel(category_id) if category_id else None
+        
+        # 権限設定（secretのみ独自設定）
+        if perm_type == 'secret':
+            overwrites = {
+                guild.default_role: discord.PermissionOverwrite(view_channel=False),
+                user: discord.PermissionOverwrite(
+                    view_channel=True,
+                    connect=True,
+                    speak=True,
+                    manage_permissions=True,
+                    manage_channels=False
+                )
+            }
+        else:
+            # basic と freedom はカテゴリー同期を使用
+            overwrites = None
+        
+        # VCを作成
+        try:
+            # VCチャンネル作成のパラメータ
+            create_params = {
+                'name': vc_name,
+                'category': category,
+                'user_limit': limit if limit > 0 else None
+            }
+            
+            # secretの場合のみoverwritesを設定
+            if overwrites is not None:
+                create_params['overwrites'] = overwrites
+            
+            vc = await guild.create_voice_channel(**create_params)
+            
+            # カテゴリーの権限に同期（basic と freedom）
+            if category and perm_type in ['basic', 'freedom']:
+                await vc.edit(sync_permissions=True)
+            
+            # ユーザー固有の権限を設定
+            if perm_type == 'basic':
+                await vc.set_permissions(user, view_channel=True, connect=True, speak=True, manage_channels=False)
+            elif perm_type == 'freedom':
+                await vc.set_permissions(user, view_channel=True, connect=True, speak=True, manage_channels=True, manage_permissions=True)
+        except Exception as e:
+            embed = create_error_embed("作成エラー", f"VCの作成に失敗しました:\n```\n{str(e)}\n```", user)
+            return await interaction.followup.send(embed=embed, ephemeral=True)
+        
+        # 有効期限を計算
+        expires_at = datetime.now(TZ) + timedelta(hours=duration)
+        
+        # DBに記録
+        async with self._write() as db:
+            await db.execute(SQL_INSERT_ACTIVE_VC, (guild.id, vc.id, uid, plan_id, int(expires_at.timestamp())))
             await db.commit()
         
         # 完了メッセージ
@@ -643,6 +828,9 @@ class VCPanelView(discord.ui.View):
         super().__init__(timeout=None)
         
         if plans:
+            # 全ボタンで共通のハンドラを使用（plan_idはcustom_idから取得）
+            callback = self._on_button
+            
             # プラン毎にボタンを追加
             for plan_id, plan_name, price, symbol, duration, perm_type in plans:
                 # ボタンラベル: プラン名のみ
@@ -651,18 +839,17 @@ class VCPanelView(discord.ui.View):
                     style=discord.ButtonStyle.primary,
                     custom_id=f"vc_create:{plan_id}"
                 )
-                button.callback = self.create_button_callback(plan_id)
+                button.callback = callback
                 self.add_item(button)
     
-    def create_button_callback(self, plan_id: int):
-        async def button_callback(interaction: discord.Interaction):
-            await interaction.response.defer(ephemeral=True)
-            
-            cog = interaction.client.get_cog('VCCreatorCog')
-            if cog:
-                await cog.create_vc_from_plan(interaction, plan_id)
+    async def _on_button(self, interaction: discord.Interaction):
+        """プランボタンのコールバック"""
+        plan_id = int(interaction.data['custom_id'].split(':')[1])
+        await interaction.response.defer(ephemeral=True)
         
-        return button_callback
+        cog = interaction.client.get_cog('VCCreatorCog')
+        if cog:
+            await cog.create_vc_from_plan(interaction, plan_id)
 
 
 async def setup(bot: commands.Bot):
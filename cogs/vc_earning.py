@@ -9,38 +9,130 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 import aiosqlite
-from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import datetime, time as dt_time, timedelta
 import logging
 import asyncio
+import time
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+from contextlib import asynccontextmanager
+from decimal import Decimal
 
-from config import DB_PATH, TZ
-from database import fetch_one, fetch_all, get_asset, ensure_user_account, upsert_user, new_transaction, post_ledger
-from utils import has_bank_permission
+from config import TZ
+from database import (
+    fetch_one, fetch_all, get_asset, ensure_user_account, upsert_user, upsert_users, new_transaction,
+    open_db, close_connection
+)
+from utils import has_bank_permission, format_minor_units, to_minor_units
 
 logger = logging.getLogger(__name__)
 
+# Seconds before the in-memory rate table is reloaded from the DB
+RATE_CACHE_TTL = 300
+
+# Minutes between flushes of accumulated earnings to the ledger
+FLUSH_INTERVAL_MINUTES = 5
+
+# Seconds a /vc_earning debug_sessions embed is reused for an unchanged session set
+DEBUG_CACHE_TTL = 30
+
+# Days of vc_earning_daily rows kept by the daily reset
+DAILY_RETENTION_DAYS = 7
+
 
 class VCEarningCog(commands.Cog):
     """VC earning functionality"""
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Long-lived connection shared by every task and handler in this cog
+        self.db: aiosqlite.Connection | None = None
+        self._db_lock = asyncio.Lock()
+        # (guild_id, category_id) -> (asset_id, rate_per_minute in minor units, symbol, decimals)
+        self._rate_cache: dict[tuple[int, int], tuple[int, int, str, int]] = {}
+        self._rate_cache_loaded_at = 0.0
+        # (guild_id, internal user id) of every open session, mirrors vc_earning_sessions
+        self._active_sessions: set[tuple[int, int]] = set()
+        # Discord user ID -> internal user ID (never changes once assigned)
+        self._uid_cache: dict[int, int] = {}
+        # guild_id -> (built at, session fingerprint, embed) for debug_sessions
+        self._debug_cache: dict[int, tuple[float, int, discord.Embed]] = {}
+        # Earnings not yet written to the DB:
+        # (guild_id, internal user id, discord user id, asset_id, symbol, decimals, date) -> [amount, minutes]
+        self._pending: defaultdict[tuple[int, int, int, int, str, int, str], list] = defaultdict(lambda: [0, 0])
+        # (monotonic time the value expires, value) for _today() and _now_iso()
+        self._today_cache: tuple[float, str] = (0.0, "")
+        self._now_iso_cache: tuple[float, str] = (0.0, "")
         self.payout_task.start()
+        self.flush_task.start()
         self.daily_reset_task.start()
     
-    def cog_unload(self):
-        """Stop tasks when cog unloads"""
+    async def cog_load(self):
+        """Open the shared connection (open_db applies the tuning PRAGMAs once)"""
+        self.db = await open_db()
+    
+    async def cog_unload(self):
+        """Stop tasks, write out pending earnings and close the connection when cog unloads"""
         self.payout_task.cancel()
+        self.flush_task.cancel()
         self.daily_reset_task.cancel()
+        await self._flush_pending()
+        if self.db is not None:
+            await close_connection(self.db)
+            self.db = None
+    
+    @asynccontextmanager
+    async def _locked_db(self):
+        """Use the shared connection exclusively; commit on success, roll back on error"""
+        async with self._db_lock:
+            try:
+                yield self.db
+            except BaseException:
+                await self.db.rollback()
+                raise
+            if self.db.in_transaction:
+                await self.db.commit()
     
-    @tasks.loop(hours=24)
+    def _today(self) -> str:
+        """Today's date in JST as YYYY-MM-DD, recomputed only when the day changes"""
+        mono = time.monotonic()
+        expires_at, today = self._today_cache
+        if mono >= expires_at:
+            now = datetime.now(TZ)
+            midnight = datetime.combine(now.date() + timedelta(days=1), dt_time(), TZ)
+            today = now.date().isoformat()
+            self._today_cache = (mono + (midnight - now).total_seconds(), today)
+        return today
+    
+    def _now_iso(self) -> str:
+        """Current JST timestamp at one-second resolution"""
+        mono = time.monotonic()
+        expires_at, now_iso = self._now_iso_cache
+        if mono >= expires_at:
+            now_iso = datetime.now(TZ).isoformat(timespec="seconds")
+            self._now_iso_cache = (mono + 1.0, now_iso)
+        return now_iso
+    
+    async def _get_uid(self, db: aiosqlite.Connection, discord_user_id: int) -> int:
+        """Get the internal user ID, creating the user on first sight"""
+        uid = self._uid_cache.get(discord_user_id)
+        if uid is None:
+            uid = await upsert_user(db, discord_user_id)
+            self._uid_cache[discord_user_id] = uid
+        return uid
+    
+    # Scheduled against the wall clock every day, so it stays on midnight (JST)
+    @tasks.loop(time=dt_time(hour=0, tzinfo=TZ))
     async def daily_reset_task(self):
         """Reset daily earnings at midnight"""
         try:
-            async with aiosqlite.connect(DB_PATH) as db:
-                # Reset all daily earnings
-                await db.execute("DELETE FROM vc_earning_daily WHERE date < date('now', '-7 days')")
+            # Dates are written in JST, so compute the cutoff the same way
+            cutoff = (datetime.now(TZ).date() - timedelta(days=DAILY_RETENTION_DAYS)).isoformat()
+            
+            async with self._locked_db() as db:
+                # Range delete over idx_vc_earning_daily_date: only stale rows are visited
+                await db.execute("DELETE FROM vc_earning_daily WHERE date < ?", (cutoff,))
                 await db.commit()
                 logger.info("[VC_EARNING] Daily reset completed - old records cleaned")
         except Exception as e:
@@ -48,132 +140,239 @@ class VCEarningCog(commands.Cog):
     
     @daily_reset_task.before_loop
     async def before_daily_reset_task(self):
-        """Wait for bot ready and next midnight"""
+        """Wait for bot ready before starting daily reset task"""
         await self.bot.wait_until_ready()
+    
+    async def _load_rates(self, db: aiosqlite.Connection):
+        """Reload the rate table into memory if the cache is stale"""
+        if time.monotonic() - self._rate_cache_loaded_at < RATE_CACHE_TTL:
+            return
         
-        # Wait until next midnight
-        now = datetime.now(TZ)
-        next_midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        wait_seconds = (next_midnight - now).total_seconds()
-        
-        logger.info(f"[VC_EARNING] Daily reset task will start at {next_midnight} (in {wait_seconds/3600:.1f} hours)")
-        await asyncio.sleep(wait_seconds)
+        rows = await fetch_all(db, """
+            SELECT r.guild_id, r.category_id, r.asset_id, r.rate_per_minute, a.symbol, a.decimals
+            FROM vc_earning_rates r
+            JOIN assets a ON r.asset_id = a.id
+        """)
+        # Rates are stored in minor units, so each tick is plain integer addition
+        self._rate_cache = {
+            (guild_id, category_id): (asset_id, rate, symbol, decimals)
+            for guild_id, category_id, asset_id, rate, symbol, decimals in rows
+        }
+        self._rate_cache_loaded_at = time.monotonic()
     
     @tasks.loop(seconds=60)
     async def payout_task(self):
         """Award earnings every minute"""
+        # Nobody is in a VC: nothing to pay
+        if not self._active_sessions:
+            return
+        
         try:
-            now = datetime.now(TZ)
-            today = now.strftime("%Y-%m-%d")
+            today = self._today()
             
-            async with aiosqlite.connect(DB_PATH) as db:
-                # Get active sessions
+            async with self._locked_db() as db:
+                await self._load_rates(db)
+                
+                # No rates configured anywhere: nothing to pay
+                if not self._rate_cache:
+                    return
+                
+                # Get active sessions (rates come from the in-memory cache)
                 sessions = await fetch_all(db, """
-                    SELECT s.user_id, s.guild_id, s.channel_id, s.category_id, s.started_at
+                    SELECT s.user_id, u.discord_user_id, s.guild_id, s.channel_id, s.category_id
                     FROM vc_earning_sessions s
+                    JOIN users u ON u.id = s.user_id
+                    ORDER BY s.guild_id
                 """)
+            
+            # Sessions to remove, deleted with executemany after the loop
+            # (the guild checks below only touch the in-memory cache, so the DB lock is not held)
+            stale_rows: list[tuple] = []
+            
+            for guild_id, guild_sessions in groupby(sessions, key=itemgetter(2)):
+                guild_sessions = list(guild_sessions)
                 
-                for user_id, guild_id, channel_id, category_id, started_at_str in sessions:
-                    # Get rate for this category
-                    rate_info = await fetch_one(db, """
-                        SELECT r.asset_id, r.rate_per_minute, a.symbol, a.decimals
-                        FROM vc_earning_rates r
-                        JOIN assets a ON r.asset_id = a.id
-                        WHERE r.guild_id = ? AND r.category_id = ?
-                    """, (str(guild_id), str(category_id)))
-                    
+                # Verify the guild once for all of its sessions
+                guild = self.bot.get_guild(guild_id)
+                if not guild:
+                    logger.warning(f"[VC_EARNING] Guild {guild_id} not found")
+                    stale_rows.extend((uid, guild_id, channel_id) for uid, _, _, channel_id, _ in guild_sessions)
+                    continue
+                
+                # Discord user ID -> voice channel ID for everyone connected in this guild
+                voice_channel_of = {
+                    member_id: channel.id
+                    for channel in (*guild.voice_channels, *guild.stage_channels)
+                    for member_id in channel.voice_states
+                }
+                
+                for uid, user_id, _, channel_id, category_id in guild_sessions:
+                    rate_info = self._rate_cache.get((guild_id, category_id))
                     if not rate_info:
-                        logger.debug(f"[VC_EARNING] No rate configured for category {category_id} in guild {guild_id}")
                         continue
                     
-                    asset_id, rate_str, symbol, decimals = rate_info
-                    rate = Decimal(rate_str)
+                    asset_id, rate, symbol, decimals = rate_info
                     
                     # Verify user is still in VC
-                    guild = self.bot.get_guild(int(guild_id))
-                    if not guild:
-                        logger.warning(f"[VC_EARNING] Guild {guild_id} not found")
-                        await db.execute("DELETE FROM vc_earning_sessions WHERE user_id = ? AND guild_id = ?", (user_id, guild_id))
-                        continue
-                    
-                    member = guild.get_member(int(user_id))
-                    if not member or not member.voice or not member.voice.channel:
+                    current_channel_id = voice_channel_of.get(int(user_id))
+                    if current_channel_id is None:
                         logger.warning(f"[VC_EARNING] User {user_id} not in VC, removing session")
-                        await db.execute("DELETE FROM vc_earning_sessions WHERE user_id = ? AND guild_id = ?", (user_id, guild_id))
+                        stale_rows.append((uid, guild_id, channel_id))
                         continue
                     
                     # Verify correct channel
-                    if str(member.voice.channel.id) != str(channel_id):
+                    if current_channel_id != channel_id:
                         logger.warning(f"[VC_EARNING] User {user_id} in different channel")
-                        await db.execute("DELETE FROM vc_earning_sessions WHERE user_id = ? AND guild_id = ?", (user_id, guild_id))
+                        stale_rows.append((uid, guild_id, channel_id))
                         continue
                     
-                    # Calculate earnings (1 minute worth)
-                    earnings = rate.quantize(Decimal(10) ** -int(decimals))
-                    
-                    if earnings <= 0:
+                    # One minute worth of earnings is the rate itself (minor units)
+                    if rate <= 0:
                         continue
                     
-                    # Get user account
-                    uid = await upsert_user(db, user_id)
-                    user_account_id = await ensure_user_account(db, user_id, guild_id)
+                    # Accumulate in memory; written to the ledger by flush_task
+                    pending = self._pending[(guild_id, uid, int(user_id), asset_id, symbol, decimals, today)]
+                    pending[0] += rate
+                    pending[1] += 1
+                
+                # Let voice state events run between guilds on large deployments
+                await asyncio.sleep(0)
+            
+            if stale_rows:
+                async with self._locked_db() as db:
+                    # Match the snapshot's channel so a session restarted meanwhile is kept
+                    await db.executemany(
+                        "DELETE FROM vc_earning_sessions WHERE user_id = ? AND guild_id = ? AND channel_id = ?",
+                        stale_rows
+                    )
+                    await db.commit()
+                    
+                    rows = await fetch_all(db, "SELECT guild_id, user_id FROM vc_earning_sessions")
+                    self._active_sessions = {(guild_id, uid) for guild_id, uid in rows}
+        
+        except Exception as e:
+            logger.error(f"[VC_EARNING] Payout task error: {e}")
+    
+    @payout_task.before_loop
+    async def before_payout_task(self):
+        """Wait for bot ready before starting payout task"""
+        await self.bot.wait_until_ready()
+    
+    @tasks.loop(minutes=FLUSH_INTERVAL_MINUTES)
+    async def flush_task(self):
+        """Write accumulated earnings to the ledger"""
+        await self._flush_pending()
+    
+    @flush_task.before_loop
+    async def before_flush_task(self):
+        """Wait for bot ready before starting flush task"""
+        await self.bot.wait_until_ready()
+    
+    async def _flush_pending(self, user_id: int | None = None):
+        """Write pending earnings (optionally only for one Discord user) in one transaction"""
+        if user_id is None:
+            pending, self._pending = self._pending, defaultdict(self._pending.default_factory)
+        else:
+            pending = {key: self._pending.pop(key) for key in [k for k in self._pending if k[2] == user_id]}
+        
+        if not pending:
+            return
+        
+        try:
+            async with self._locked_db() as db:
+                await db.execute("BEGIN IMMEDIATE")
+                
+                ledger_rows: list[tuple] = []
+                daily_rows: list[tuple] = []
+                
+                for (guild_id, uid, discord_user_id, asset_id, symbol, decimals, date), (amount, minutes) in pending.items():
+                    user_account_id = await ensure_user_account(db, discord_user_id, guild_id)
                     
-                    # Create transaction
                     tx_id = await new_transaction(
                         db,
                         kind='vc_earning',
                         created_by_user_id=None,
                         unique_hash=None,
-                        reference=f'VC Earning: 1 min @ {rate} {symbol}/min'
+                        reference=f'VC Earning: {minutes} min ({symbol})'
                     )
                     
-                    # Add to balance
-                    await post_ledger(db, tx_id, user_account_id, asset_id, earnings)
-                    
-                    # Update daily earnings
-                    await db.execute("""
-                        INSERT INTO vc_earning_daily(guild_id, user_id, asset_id, total_earned, date)
-                        VALUES (?, ?, ?, ?, ?)
-                        ON CONFLICT(guild_id, user_id, asset_id, date) DO UPDATE SET
-                            total_earned = total_earned + excluded.total_earned
-                    """, (str(guild_id), uid, asset_id, str(earnings), today))
+                    # The ledger keeps both the decimal string and minor units; the daily table keeps minor units
+                    amount_str = format_minor_units(amount, decimals)
+                    ledger_rows.append((tx_id, user_account_id, asset_id, amount_str, amount))
+                    daily_rows.append((guild_id, uid, asset_id, amount, date))
                     
-                    logger.info(f"[VC_EARNING] Paid {earnings} {symbol} to user {user_id} in guild {guild_id}")
+                    logger.info(f"[VC_EARNING] Paid {amount_str} {symbol} to user {discord_user_id} in guild {guild_id}")
+                
+                await db.executemany(
+                    "INSERT INTO ledger_entries(tx_id, account_id, asset_id, amount, amount_int) VALUES (?,?,?,?,?)",
+                    ledger_rows
+                )
+                await db.executemany("""
+                    INSERT INTO vc_earning_daily(guild_id, user_id, asset_id, total_earned, date)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(guild_id, user_id, asset_id, date) DO UPDATE SET
+                        total_earned = total_earned + excluded.total_earned
+                """, daily_rows)
                 
                 await db.commit()
         
         except Exception as e:
-            logger.error(f"[VC_EARNING] Payout task error: {e}")
-    
-    @payout_task.before_loop
-    async def before_payout_task(self):
-        """Wait for bot ready before starting payout task"""
-        await self.bot.wait_until_ready()
+            logger.error(f"[VC_EARNING] Flush error: {e}")
+            
+            # Put the earnings back so the next flush retries them
+            for key, (amount, minutes) in pending.items():
+                self._pending[key][0] += amount
+                self._pending[key][1] += minutes
     
     @commands.Cog.listener()
     async def on_ready(self):
         """Initialize sessions for users in VCs on bot startup"""
         logger.info("[VC_EARNING] Initializing sessions for users in VCs...")
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        # Collect every (member, channel) pair currently in a VC
+        in_vc = [
+            (member, channel)
+            for guild in self.bot.guilds
+            for channel in guild.voice_channels
+            for member in channel.members
+            if not member.bot
+        ]
+        
+        async with self._locked_db() as db:
+            # Rebuild all sessions in a single transaction
+            await db.execute("BEGIN IMMEDIATE")
+            
             # Clear existing sessions (bot restart)
             await db.execute("DELETE FROM vc_earning_sessions")
-            await db.commit()
             
-            # Check all guilds
-            for guild in self.bot.guilds:
-                # Check all voice channels
-                for channel in guild.voice_channels:
-                    # Check members in channel
-                    for member in channel.members:
-                        if member.bot:
-                            continue
-                        
-                        # Start session
-                        await self._start_session(db, member, channel)
+            # Preload the user ID map in one scan
+            rows = await fetch_all(db, "SELECT id, discord_user_id FROM users")
+            self._uid_cache = {int(discord_user_id): uid for uid, discord_user_id in rows}
+            
+            if in_vc:
+                missing = {member.id for member, _ in in_vc} - self._uid_cache.keys()
+                if missing:
+                    self._uid_cache.update(await upsert_users(db, missing))
+                uids = self._uid_cache
+                now = self._now_iso()
+                
+                await db.executemany("""
+                    INSERT INTO vc_earning_sessions
+                    (guild_id, user_id, channel_id, category_id, started_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (
+                        member.guild.id, uids[member.id], channel.id,
+                        channel.category_id if channel.category else None, now
+                    )
+                    for member, channel in in_vc
+                ])
             
             await db.commit()
         
+        self._active_sessions = {(member.guild.id, uids[member.id]) for member, _ in in_vc} if in_vc else set()
+        logger.info(f"[VC_EARNING] Started {len(in_vc)} sessions")
+        
         logger.info("[VC_EARNING] Session initialization complete")
     
     @commands.Cog.listener()
@@ -185,7 +384,7 @@ class VCEarningCog(commands.Cog):
         guild_id = member.guild.id
         user_id = member.id
         
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with self._locked_db() as db:
             # Left VC
             if before.channel and not after.channel:
                 await self._end_session(db, user_id, guild_id)
@@ -194,48 +393,44 @@ class VCEarningCog(commands.Cog):
             elif not before.channel and after.channel:
                 await self._start_session(db, member, after.channel)
             
-            # Moved between VCs
+            # Moved between VCs (the upsert keeps the original started_at)
             elif before.channel and after.channel:
-                before_category = before.channel.category_id if before.channel.category else None
-                after_category = after.channel.category_id if after.channel.category else None
-                
-                # Category changed
-                if before_category != after_category:
-                    await self._end_session(db, user_id, guild_id)
-                    await self._start_session(db, member, after.channel)
-                else:
-                    # Same category, just update channel ID
-                    await db.execute("""
-                        UPDATE vc_earning_sessions
-                        SET channel_id = ?
-                        WHERE user_id = ? AND guild_id = ?
-                    """, (str(after.channel.id), user_id, str(guild_id)))
+                await self._start_session(db, member, after.channel)
             
             await db.commit()
+        
+        # Left VC: write out what they earned so far (after releasing the connection above)
+        if before.channel and not after.channel:
+            await self._flush_pending(user_id)
     
     async def _start_session(self, db: aiosqlite.Connection, member: discord.Member, channel: discord.VoiceChannel):
-        """Start a VC earning session"""
-        now = datetime.now(TZ)
-        category_id = str(channel.category_id) if channel.category else None
+        """Start a VC earning session (or move an existing one to another channel)"""
+        now_iso = self._now_iso()
+        category_id = channel.category_id if channel.category else None
         
         # Get user internal ID
-        uid = await upsert_user(db, member.id)
+        uid = await self._get_uid(db, member.id)
         
         await db.execute("""
-            INSERT OR REPLACE INTO vc_earning_sessions
+            INSERT INTO vc_earning_sessions
             (guild_id, user_id, channel_id, category_id, started_at)
             VALUES (?, ?, ?, ?, ?)
-        """, (str(member.guild.id), uid, str(channel.id), category_id, now.isoformat()))
+            ON CONFLICT(guild_id, user_id) DO UPDATE SET
+                channel_id = excluded.channel_id,
+                category_id = excluded.category_id
+        """, (member.guild.id, uid, channel.id, category_id, now_iso))
+        self._active_sessions.add((member.guild.id, uid))
         
         logger.info(f"[VC_EARNING] Started session for user {member.id} in channel {channel.id}")
     
     async def _end_session(self, db: aiosqlite.Connection, user_id: int, guild_id: int):
         """End a VC earning session"""
         # Get user internal ID
-        uid = await upsert_user(db, user_id)
+        uid = await self._get_uid(db, user_id)
         
         # Delete session
-        await db.execute("DELETE FROM vc_earning_sessions WHERE user_id = ? AND guild_id = ?", (uid, str(guild_id)))
+        await db.execute("DELETE FROM vc_earning_sessions WHERE user_id = ? AND guild_id = ?", (uid, guild_id))
+        self._active_sessions.discard((guild_id, uid))
         logger.info(f"[VC_EARNING] Ended session for user {user_id}")
     
     # Command group
@@ -267,7 +462,7 @@ class VCEarningCog(commands.Cog):
             return
         
         # Check if currency exists
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with self._locked_db() as db:
             asset = await get_asset(db, currency_symbol.upper(), interaction.guild_id)
             if not asset:
                 await interaction.response.send_message(
@@ -276,7 +471,9 @@ class VCEarningCog(commands.Cog):
                 )
                 return
             
-            asset_id = asset[0]
+            asset_id, decimals = asset[0], asset[3]
+            # Round to the currency's decimals the same way the ledger does
+            rate_int = to_minor_units(Decimal(str(rate_per_minute)), decimals)
             
             # Save rate
             await db.execute("""
@@ -285,17 +482,20 @@ class VCEarningCog(commands.Cog):
                 ON CONFLICT(guild_id, category_id) DO UPDATE SET
                     asset_id = excluded.asset_id,
                     rate_per_minute = excluded.rate_per_minute
-            """, (str(interaction.guild_id), str(category.id), asset_id, str(rate_per_minute)))
+            """, (interaction.guild_id, category.id, asset_id, rate_int))
             
             await db.commit()
         
+        # Reload rates on the next payout tick
+        self._rate_cache_loaded_at = 0.0
+        
         embed = discord.Embed(
             title="✅ VC報酬設定完了",
             color=0x2ecc71
         )
         embed.add_field(name="カテゴリ", value=category.name, inline=False)
         embed.add_field(name="通貨", value=currency_symbol.upper(), inline=True)
-        embed.add_field(name="レート", value=f"{rate_per_minute} {currency_symbol.upper()}/分", inline=True)
+        embed.add_field(name="レート", value=f"{format_minor_units(rate_int, decimals)} {currency_symbol.upper()}/分", inline=True)
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
     
@@ -311,96 +511,103 @@ class VCEarningCog(commands.Cog):
         
         channel = interaction.user.voice.channel
         category = channel.category
-        category_id = str(category.id) if category else None
+        category_id = category.id if category else None
+        
+        today = self._today()
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # Get rate info
+        async with self._locked_db() as db:
+            uid = await self._get_uid(db, interaction.user.id)
+            
+            # Get rate info, today's earnings and the minutes they represent in one query
             rate_info = await fetch_one(db, """
-                SELECT r.rate_per_minute, a.symbol
+                SELECT r.rate_per_minute, a.symbol, a.decimals,
+                       COALESCE(d.total_earned, 0),
+                       CASE WHEN r.rate_per_minute > 0
+                            THEN COALESCE(d.total_earned, 0) / r.rate_per_minute
+                            ELSE 0 END
                 FROM vc_earning_rates r
                 JOIN assets a ON r.asset_id = a.id
+                LEFT JOIN vc_earning_daily d
+                    ON d.guild_id = r.guild_id AND d.user_id = ? AND d.asset_id = r.asset_id AND d.date = ?
                 WHERE r.guild_id = ? AND r.category_id = ?
-            """, (str(interaction.guild_id), category_id))
-            
-            if rate_info:
-                rate, currency_symbol = rate_info
-                
-                # Get today's earnings
-                today = datetime.now(TZ).strftime("%Y-%m-%d")
-                uid = await upsert_user(db, interaction.user.id)
-                
-                daily_earnings = await fetch_one(db, """
-                    SELECT total_earned FROM vc_earning_daily
-                    WHERE guild_id = ? AND user_id = ? AND date = ?
-                """, (str(interaction.guild_id), uid, today))
-                
-                total_earned = Decimal(daily_earnings[0]) if daily_earnings else Decimal("0")
-                
-                # Calculate connection time
-                if Decimal(rate) > 0:
-                    connection_minutes = int(total_earned / Decimal(rate))
-                else:
-                    connection_minutes = 0
-            else:
-                # No rate configured
-                currency_symbol = "UNKNOWN"
-                rate = 0
-                connection_minutes = 0
-                total_earned = 0
-            
-            # Display
-            embed = discord.Embed(
-                title="VC報酬状況",
-                color=0x3498db
-            )
-            embed.add_field(
-                name="---------------",
-                value=(
-                    f"**接続中**: {channel.name}\n"
-                    f"**レート**: {int(float(rate))} {currency_symbol}/分\n"
-                    "---------------"
-                ),
-                inline=False
-            )
-            embed.add_field(name="接続時間", value=f"{connection_minutes} 分", inline=True)
-            embed.add_field(name="今日の獲得量", value=f"{int(float(total_earned))} {currency_symbol}", inline=True)
+            """, (uid, today, interaction.guild_id, category_id))
+        
+        if rate_info:
+            rate, currency_symbol, decimals, total_earned, connection_minutes = rate_info
             
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            # Include earnings not yet flushed to the DB
+            for (g, u, _, _, symbol, _, date), (amount, minutes) in self._pending.items():
+                if g == interaction.guild_id and u == uid and symbol == currency_symbol and date == today:
+                    total_earned += amount
+                    connection_minutes += minutes
+        else:
+            # No rate configured
+            currency_symbol = "UNKNOWN"
+            rate = 0
+            decimals = 0
+            connection_minutes = 0
+            total_earned = 0
+        
+        # Display
+        embed = discord.Embed(
+            title="VC報酬状況",
+            color=0x3498db
+        )
+        embed.add_field(
+            name="---------------",
+            value=(
+                f"**接続中**: {channel.name}\n"
+                f"**レート**: {format_minor_units(rate, decimals)} {currency_symbol}/分\n"
+                "---------------"
+            ),
+            inline=False
+        )
+        embed.add_field(name="接続時間", value=f"{connection_minutes} 分", inline=True)
+        embed.add_field(name="今日の獲得量", value=f"{format_minor_units(total_earned, decimals)} {currency_symbol}", inline=True)
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
     
     @vc_earning_group.command(name="debug_sessions", description="アクティブなセッションを表示（管理者のみ）")
     @app_commands.default_permissions(administrator=True)
     async def debug_sessions(self, interaction: discord.Interaction):
         """Debug: Show all active sessions"""
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with self._locked_db() as db:
             sessions = await fetch_all(db, """
                 SELECT s.user_id, s.channel_id, s.category_id, s.started_at, u.discord_user_id
                 FROM vc_earning_sessions s
                 JOIN users u ON s.user_id = u.id
                 WHERE s.guild_id = ?
-            """, (str(interaction.guild_id),))
-            
-            if not sessions:
-                await interaction.response.send_message("⚠️ No active sessions", ephemeral=True)
-                return
-            
-            embed = discord.Embed(title="🔍 Active Sessions", color=0xe74c3c)
-            
-            for user_id, channel_id, category_id, started_at, discord_user_id in sessions:
-                user = interaction.guild.get_member(int(discord_user_id))
-                channel = interaction.guild.get_channel(int(channel_id))
-                
-                embed.add_field(
-                    name=f"👤 {user.display_name if user else f'User {discord_user_id}'}",
-                    value=(
-                        f"**Channel**: {channel.name if channel else f'ID: {channel_id}'}\n"
-                        f"**Category ID**: {category_id}\n"
-                        f"**Started**: {started_at}"
-                    ),
-                    inline=False
-                )
+            """, (interaction.guild_id,))
+        
+        if not sessions:
+            await interaction.response.send_message("⚠️ No active sessions", ephemeral=True)
+            return
+        
+        # Reuse the embed built for the same set of sessions within the TTL
+        fingerprint = hash(tuple(sessions))
+        cached = self._debug_cache.get(interaction.guild_id)
+        if cached and cached[1] == fingerprint and time.monotonic() - cached[0] < DEBUG_CACHE_TTL:
+            await interaction.response.send_message(embed=cached[2], ephemeral=True)
+            return
+        
+        embed = discord.Embed(title="🔍 Active Sessions", color=0xe74c3c)
+        
+        for user_id, channel_id, category_id, started_at, discord_user_id in sessions:
+            user = interaction.guild.get_member(int(discord_user_id))
+            channel = interaction.guild.get_channel(channel_id)
             
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-
+            embed.add_field(
+                name=f"👤 {user.display_name if user else f'User {discord_user_id}'}",
+                value=(
+                    f"**Channel**: {channel.name if channel else f'ID: {channel_id}'}\n"
+                    f"**Category ID**: {category_id}\n"
+                    f"**Started**: {started_at}"
+                ),
+                inline=False
+            )
+        
+        self._debug_cache[interaction.guild_id] = (time.monotonic(), fingerprint, embed)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 async def setup(bot: commands.Bot):
     """Setup the cog"""
@@ -8,18 +8,78 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import aiosqlite
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 
-from config import DB_PATH, TZ
-from database import fetch_one, fetch_all, upsert_user
+from config import TZ, EXCLUDED_CHANNELS, CHECK_ROLES, VC_ACTIVE_USERS
+from database import fetch_one, fetch_all, get_db, close_db, shared_transaction
 from embeds import create_success_embed, create_error_embed, create_info_embed
 
+# 頻繁に実行するSQL（共有接続の文キャッシュで再利用されるよう同じ文字列を使い回す）
+SQL_CHECK_TOTALS = """
+    SELECT COALESCE(SUM(total_minutes), 0), COUNT(*)
+    FROM vc_sessions_daily
+    WHERE user_id = ? AND guild_id = ? AND day >= ?
+"""
+SQL_CHECK_DAILY = """
+    SELECT day, total_minutes
+    FROM vc_sessions_daily
+    WHERE user_id = ? AND guild_id = ? AND day >= ?
+    ORDER BY day DESC
+    LIMIT 10
+"""
+SQL_ACTIVE_USERS = """
+    SELECT DISTINCT d.guild_id, u.discord_user_id
+    FROM vc_sessions_daily d
+    JOIN users u ON u.id = d.user_id
+"""
+SQL_USER_ID = "SELECT id FROM users WHERE discord_user_id = ?"
+SQL_EXCLUDE_INSERT = """
+    INSERT OR IGNORE INTO vc_excluded_channels(guild_id, channel_id, channel_type)
+    VALUES (?, ?, ?)
+"""
+SQL_EXCLUDE_DELETE = """
+    DELETE FROM vc_excluded_channels
+    WHERE guild_id = ? AND channel_id = ?
+"""
+SQL_ROLE_INSERT = """
+    INSERT OR IGNORE INTO vc_check_roles(guild_id, role_id)
+    VALUES (?, ?)
+"""
+SQL_ROLE_DELETE = """
+    DELETE FROM vc_check_roles
+    WHERE guild_id = ? AND role_id = ?
+"""
+
 
 class VCManagementCog(commands.Cog):
     """VC管理コマンド群"""
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.db: aiosqlite.Connection | None = None
+    
+    async def cog_load(self):
+        """Cogロード時に共有接続を取得し、除外チャンネルと確認権限ロールをキャッシュ"""
+        self.db = await get_db()
+        
+        EXCLUDED_CHANNELS.clear()
+        for guild_id, channel_id, channel_type in await fetch_all(
+            self.db, "SELECT guild_id, channel_id, channel_type FROM vc_excluded_channels"
+        ):
+            EXCLUDED_CHANNELS.setdefault(guild_id, {})[channel_id] = channel_type
+        
+        CHECK_ROLES.clear()
+        for guild_id, role_id in await fetch_all(self.db, "SELECT guild_id, role_id FROM vc_check_roles"):
+            CHECK_ROLES.setdefault(guild_id, set()).add(role_id)
+        
+        VC_ACTIVE_USERS.clear()
+        for guild_id, discord_user_id in await fetch_all(self.db, SQL_ACTIVE_USERS):
+            VC_ACTIVE_USERS.setdefault(guild_id, set()).add(int(discord_user_id))
+    
+    async def cog_unload(self):
+        """Cogアンロード時に共有接続を閉じる"""
+        await close_db()
     
     @app_commands.command(name="check", description="ユーザーのVC時間を確認する（管理者のみ）")
     @app_commands.describe(
@@ -43,63 +103,62 @@ class VCManagementCog(commands.Cog):
             embed = create_error_embed("入力エラー", "日数は1〜90の範囲で指定してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            uid = await upsert_user(db, user.id)
-            
-            # 指定期間のVC時間を取得（joined_atではなくstart_timeを使用）
-            start_date = (datetime.now(TZ) - timedelta(days=days)).isoformat()
-            
-            rows = await fetch_all(db, """
-                SELECT 
-                    DATE(start_time) as date,
-                    SUM(duration_minutes) as total_minutes
-                FROM vc_sessions
-                WHERE user_id = ? AND guild_id = ? AND start_time >= ?
-                GROUP BY DATE(start_time)
-                ORDER BY date DESC
-            """, (uid, str(interaction.guild.id), start_date))
-            
-            if not rows:
-                embed = create_info_embed(
-                    "VC時間確認",
-                    f"**{user.display_name}** の過去{days}日間のVC接続記録はありません。",
-                    interaction.user
-                )
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            # 合計時間を計算
-            total_minutes = sum(row[1] or 0 for row in rows)
-            total_hours = total_minutes / 60
-            
+        # VC接続記録が一度もないユーザーはDBを参照せずに応答
+        if user.id not in VC_ACTIVE_USERS.get(interaction.guild.id, ()):
             embed = create_info_embed(
                 "VC時間確認",
-                f"**{user.display_name}** の過去{days}日間のVC接続時間",
+                f"**{user.display_name}** の過去{days}日間のVC接続記録はありません。",
                 interaction.user
             )
-            
-            # 日別の詳細を追加（最新10日分）
-            for date, minutes in rows[:10]:
-                hours = minutes / 60
-                embed.add_field(
-                    name=f"📅 {date}",
-                    value=f"⏱️ {hours:.2f}時間 ({minutes}分)",
-                    inline=True
-                )
-            
-            if len(rows) > 10:
-                embed.add_field(
-                    name="...",
-                    value=f"他{len(rows) - 10}日分",
-                    inline=False
-                )
-            
-            embed.add_field(
-                name="📊 合計",
-                value=f"**{total_hours:.2f}時間** ({total_minutes}分)",
-                inline=False
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        # 共有接続が混雑していても3秒の応答期限を超えないよう先に応答を保留
+        await interaction.response.defer(ephemeral=True)
+        
+        # 記録があるユーザーは登録済みなので読み取りのみ
+        db = self.db
+        uid, = await fetch_one(db, SQL_USER_ID, (str(user.id),))
+        
+        # 指定期間のVC時間を取得（日別集計の日付はJST）
+        start_day = datetime.fromtimestamp(time.time() - days * 86400, TZ).date().isoformat()
+        
+        params = (uid, interaction.guild.id, start_day)
+        
+        # 合計時間と日数はSQLで集計
+        total_minutes, day_count = await fetch_one(db, SQL_CHECK_TOTALS, params)
+        
+        if not day_count:
+            embed = create_info_embed(
+                "VC時間確認",
+                f"**{user.display_name}** の過去{days}日間のVC接続記録はありません。",
+                interaction.user
             )
-            
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return await interaction.followup.send(embed=embed, ephemeral=True)
+        
+        # 表示する最新10日分のみ取得
+        rows = await fetch_all(db, SQL_CHECK_DAILY, params)
+        
+        total_hours = total_minutes / 60
+        
+        embed = create_info_embed(
+            "VC時間確認",
+            f"**{user.display_name}** の過去{days}日間のVC接続時間",
+            interaction.user
+        )
+        
+        # 日別の詳細を1フィールドにまとめて追加（最新10日分）
+        lines = [f"📅 {date}  ⏱️ {minutes / 60:.2f}時間 ({minutes}分)" for date, minutes in rows]
+        if day_count > 10:
+            lines.append(f"...他{day_count - 10}日分")
+        embed.add_field(name="日別内訳", value="\n".join(lines), inline=False)
+        
+        embed.add_field(
+            name="📊 合計",
+            value=f"**{total_hours:.2f}時間** ({total_minutes}分)",
+            inline=False
+        )
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
     
     @app_commands.command(name="exclude_add", description="VC時間計測から除外するチャンネルを追加する（管理者のみ）")
     @app_commands.describe(channel="除外するチャンネル")
@@ -116,27 +175,19 @@ class VCManagementCog(commands.Cog):
         
         channel_type = "category" if isinstance(channel, discord.CategoryChannel) else "voice"
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # 既に除外設定されているかチェック
-            existing = await fetch_one(db, """
-                SELECT id FROM vc_excluded_channels
-                WHERE guild_id = ? AND channel_id = ?
-            """, (str(interaction.guild.id), str(channel.id)))
-            
-            if existing:
-                embed = create_error_embed(
-                    "設定エラー",
-                    f"**{channel.name}** は既に除外設定されています。",
-                    interaction.user
-                )
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            # 除外設定を追加
-            await db.execute("""
-                INSERT INTO vc_excluded_channels(guild_id, channel_id, channel_type)
-                VALUES (?, ?, ?)
-            """, (str(interaction.guild.id), str(channel.id), channel_type))
-            await db.commit()
+        # 除外設定を追加（UNIQUE制約により既存なら何もしない）
+        async with shared_transaction() as db:
+            cursor = await db.execute(SQL_EXCLUDE_INSERT, (interaction.guild.id, channel.id, channel_type))
+        
+        if cursor.rowcount == 0:
+            embed = create_error_embed(
+                "設定エラー",
+                f"**{channel.name}** は既に除外設定されています。",
+                interaction.user
+            )
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        EXCLUDED_CHANNELS.setdefault(interaction.guild.id, {})[channel.id] = channel_type
         
         embed = create_success_embed(
             "除外設定追加",
@@ -156,13 +207,13 @@ class VCManagementCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            rows = await fetch_all(db, """
-                SELECT channel_id, channel_type
-                FROM vc_excluded_channels
-                WHERE guild_id = ?
-                ORDER BY channel_type, channel_id
-            """, (str(interaction.guild.id),))
+        guild = interaction.guild
+        
+        # キャッシュから取得（種類、チャンネルIDの順に並べる）
+        rows = sorted(
+            EXCLUDED_CHANNELS.get(guild.id, {}).items(),
+            key=lambda item: (item[1], item[0])
+        )
         
         if not rows:
             embed = create_info_embed(
@@ -181,18 +232,14 @@ class VCManagementCog(commands.Cog):
         categories = []
         voices = []
         
+        get_channel = guild.get_channel
         for channel_id, channel_type in rows:
-            channel = interaction.guild.get_channel(int(channel_id))
-            if channel:
-                if channel_type == "category":
-                    categories.append(f"📁 {channel.name}")
-                else:
-                    voices.append(f"🔊 {channel.name}")
+            channel = get_channel(channel_id)
+            name = channel.name if channel else f"(削除済み: {channel_id})"
+            if channel_type == "category":
+                categories.append(f"📁 {name}")
             else:
-                if channel_type == "category":
-                    categories.append(f"📁 (削除済み: {channel_id})")
-                else:
-                    voices.append(f"🔊 (削除済み: {channel_id})")
+                voices.append(f"🔊 {name}")
         
         if categories:
             embed.add_field(
@@ -223,21 +270,19 @@ class VCManagementCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # 除外設定を削除
-            cursor = await db.execute("""
-                DELETE FROM vc_excluded_channels
-                WHERE guild_id = ? AND channel_id = ?
-            """, (str(interaction.guild.id), str(channel.id)))
-            await db.commit()
-            
-            if cursor.rowcount == 0:
-                embed = create_error_embed(
-                    "設定エラー",
-                    f"**{channel.name}** は除外設定されていません。",
-                    interaction.user
-                )
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
+        # 除外設定を削除
+        async with shared_transaction() as db:
+            cursor = await db.execute(SQL_EXCLUDE_DELETE, (interaction.guild.id, channel.id))
+        
+        if cursor.rowcount == 0:
+            embed = create_error_embed(
+                "設定エラー",
+                f"**{channel.name}** は除外設定されていません。",
+                interaction.user
+            )
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        EXCLUDED_CHANNELS.get(interaction.guild.id, {}).pop(channel.id, None)
         
         embed = create_success_embed(
             "除外設定削除",
@@ -256,27 +301,19 @@ class VCManagementCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # 既に設定されているかチェック
-            existing = await fetch_one(db, """
-                SELECT id FROM vc_check_roles
-                WHERE guild_id = ? AND role_id = ?
-            """, (str(interaction.guild.id), str(role.id)))
-            
-            if existing:
-                embed = create_error_embed(
-                    "設定エラー",
-                    f"**{role.name}** は既にVC時間確認権限を持っています。",
-                    interaction.user
-                )
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            # 権限を追加
-            await db.execute("""
-                INSERT INTO vc_check_roles(guild_id, role_id)
-                VALUES (?, ?)
-            """, (str(interaction.guild.id), str(role.id)))
-            await db.commit()
+        # 権限を追加（UNIQUE制約により既存なら何もしない）
+        async with shared_transaction() as db:
+            cursor = await db.execute(SQL_ROLE_INSERT, (interaction.guild.id, role.id))
+        
+        if cursor.rowcount == 0:
+            embed = create_error_embed(
+                "設定エラー",
+                f"**{role.name}** は既にVC時間確認権限を持っています。",
+                interaction.user
+            )
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        CHECK_ROLES.setdefault(interaction.guild.id, set()).add(role.id)
         
         embed = create_success_embed(
             "権限追加",
@@ -295,13 +332,10 @@ class VCManagementCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            rows = await fetch_all(db, """
-                SELECT role_id
-                FROM vc_check_roles
-                WHERE guild_id = ?
-                ORDER BY role_id
-            """, (str(interaction.guild.id),))
+        guild = interaction.guild
+        
+        # キャッシュから取得
+        rows = sorted(CHECK_ROLES.get(guild.id, ()))
         
         if not rows:
             embed = create_info_embed(
@@ -317,13 +351,11 @@ class VCManagementCog(commands.Cog):
             interaction.user
         )
         
-        roles_list = []
-        for (role_id,) in rows:
-            role = interaction.guild.get_role(int(role_id))
-            if role:
-                roles_list.append(f"• {role.mention}")
-            else:
-                roles_list.append(f"• (削除済み: {role_id})")
+        get_role = guild.get_role
+        roles_list = [
+            f"• {role.mention}" if (role := get_role(role_id)) else f"• (削除済み: {role_id})"
+            for role_id in rows
+        ]
         
         embed.add_field(
             name="ロール",
@@ -342,21 +374,19 @@ class VCManagementCog(commands.Cog):
             embed = create_error_embed("実行エラー", "このコマンドはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            # 権限を削除
-            cursor = await db.execute("""
-                DELETE FROM vc_check_roles
-                WHERE guild_id = ? AND role_id = ?
-            """, (str(interaction.guild.id), str(role.id)))
-            await db.commit()
-            
-            if cursor.rowcount == 0:
-                embed = create_error_embed(
-                    "設定エラー",
-                    f"**{role.name}** はVC時間確認権限を持っていません。",
-                    interaction.user
-                )
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
+        # 権限を削除
+        async with shared_transaction() as db:
+            cursor = await db.execute(SQL_ROLE_DELETE, (interaction.guild.id, role.id))
+        
+        if cursor.rowcount == 0:
+            embed = create_error_embed(
+                "設定エラー",
+                f"**{role.name}** はVC時間確認権限を持っていません。",
+                interaction.user
+            )
+            return await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        CHECK_ROLES.get(interaction.guild.id, set()).discard(role.id)
         
         embed = create_success_embed(
             "権限削除",
@@ -8,7 +8,8 @@ import os
 from datetime import timezone, timedelta
 
 # タイムゾーン設定
-TZ = timezone(timedelta(hours=9))  # 日本標準時(JST)
+TZ_OFFSET_SECS = 9 * 3600  # UTCからのオフセット（秒）
+TZ = timezone(timedelta(seconds=TZ_OFFSET_SECS))  # 日本標準時(JST)
 
 # データベース設定
 DB_PATH = os.getenv("VC_DB", os.path.join(os.path.dirname(__file__), "template.sqlite3"))
@@ -30,6 +31,15 @@ SALARY_HOUR_TO_MINUTES = 60  # 1時間の分数
 # Format: {(guild_id, user_id): {'start_time': datetime, 'channel_id': str, 'session_id': int}}
 active_vc_sessions = {}
 
+# VC管理設定のメモリキャッシュ（VCManagementCogのロード時に読み込み、変更時に更新）
+# Format: {guild_id: {channel_id: channel_type}}
+EXCLUDED_CHANNELS: dict[int, dict[int, str]] = {}
+# Format: {guild_id: {role_id, ...}}
+CHECK_ROLES: dict[int, set[int]] = {}
+# VC接続記録があるユーザー（vc_sessionsに記録を追加する処理はここにも追加すること）
+# Format: {guild_id: {discord_user_id, ...}}
+VC_ACTIVE_USERS: dict[int, set[int]] = {}
+
 # 開発者ID（必要に応じて変更）
 DEVELOPER_ID = 608195085716422656
 
@@ -4,9 +4,220 @@
 SQLiteデータベースの初期化、クエリ実行、データ操作などを提供します。
 """
 
+import asyncio
+import logging
 import aiosqlite
-from decimal import Decimal
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from decimal import Decimal, InvalidOperation
 from config import DB_PATH, DEFAULT_DECIMALS
+from utils import round_amount, to_minor_units
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== 接続 ====================
+
+# 接続ごとに適用するPRAGMA（journal_modeはDBファイルに保存されるが、既にWALなら何もしない）
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+_DB_PRAGMA_SCRIPT = ";\n".join(DB_PRAGMAS) + ";"
+
+# connect() で使い回す接続の最大数
+DB_POOL_SIZE = 4
+
+# 接続ごとにコンパイル済みのまま保持するSQL文の数（sqlite3の既定値は128）
+DB_CACHED_STATEMENTS = 256
+
+# optimize_loop() が PRAGMA optimize を実行する間隔（秒）
+DB_OPTIMIZE_INTERVAL = 3600
+
+
+async def _configure(db: aiosqlite.Connection):
+    """接続にPRAGMAを適用（1回の往復でまとめて実行）"""
+    await db.executescript(_DB_PRAGMA_SCRIPT)
+
+
+async def open_db() -> aiosqlite.Connection:
+    """
+    PRAGMAを適用した長期間使う接続を開く（呼び出し側で close() すること）
+    
+    Returns:
+        aiosqlite接続
+    """
+    db = await aiosqlite.connect(DB_PATH, cached_statements=DB_CACHED_STATEMENTS)
+    # 行はタプルと同じくインデックス・アンパックでき、列名でも参照できる
+    db.row_factory = aiosqlite.Row
+    await _configure(db)
+    return db
+
+
+async def close_connection(db: aiosqlite.Connection):
+    """
+    統計情報を更新してから接続を閉じる（PRAGMA optimize は必要なテーブルだけを解析する）
+    
+    Args:
+        db: aiosqlite接続
+    """
+    try:
+        await db.execute("PRAGMA optimize")
+    finally:
+        await db.close()
+
+
+async def optimize_loop():
+    """
+    定期的に PRAGMA optimize を実行し、データの増加に合わせてクエリプランナーの統計情報を更新するループ
+    """
+    while True:
+        await asyncio.sleep(DB_OPTIMIZE_INTERVAL)
+        try:
+            async with connect() as db:
+                await db.execute("PRAGMA optimize")
+        except Exception:
+            logger.exception("[DATABASE] PRAGMA optimize に失敗しました")
+
+
+class DBPool:
+    """
+    開いたままの接続を使い回すプール
+    
+    接続は必要になった時点で最大 size 本まで開き、返却後も閉じずに再利用します。
+    ページキャッシュが接続ごとに保持されるため、毎回開き直すより速くなります。
+    """
+    
+    def __init__(self, size: int):
+        self._size = size
+        self._opened = 0
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._connections: list[aiosqlite.Connection] = []
+    
+    async def _get(self) -> aiosqlite.Connection:
+        """空いている接続を取得（上限に達していなければ新しく開く）"""
+        if self._idle.empty() and self._opened < self._size:
+            self._opened += 1
+            try:
+                db = await open_db()
+            except BaseException:
+                self._opened -= 1
+                raise
+            self._connections.append(db)
+            return db
+        return await self._idle.get()
+    
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        接続を借りる（返却時、コミットされていない変更はロールバック）
+        
+        Yields:
+            aiosqlite接続
+        """
+        db = await self._get()
+        try:
+            yield db
+        finally:
+            # 接続を閉じていた頃と同じく、未コミットの変更は破棄して返却
+            if db.in_transaction:
+                await db.rollback()
+            self._idle.put_nowait(db)
+    
+    async def close(self):
+        """プールの接続をすべて閉じる"""
+        for db in self._connections:
+            await close_connection(db)
+        self._connections.clear()
+        self._idle = asyncio.Queue()
+        self._opened = 0
+
+
+_pool: DBPool | None = None
+
+
+def get_pool() -> DBPool:
+    """connect() が使うプールを取得（初回呼び出し時に作成）"""
+    global _pool
+    if _pool is None:
+        _pool = DBPool(DB_POOL_SIZE)
+    return _pool
+
+
+async def close_pool():
+    """プールの接続をすべて閉じる（Bot終了時に呼び出す）"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def connect():
+    """
+    プールから接続を借りる（`aiosqlite.connect(DB_PATH)` の代わりに使用）
+    
+    Yields:
+        aiosqlite接続
+    """
+    async with get_pool().acquire() as db:
+        yield db
+
+
+_shared_db: aiosqlite.Connection | None = None
+_shared_db_lock = asyncio.Lock()
+# 共有接続での書き込みトランザクションを直列化するロック
+_shared_write_lock = asyncio.Lock()
+
+
+async def get_db() -> aiosqlite.Connection:
+    """
+    Bot全体で使い回す共有接続を取得（初回呼び出し時に接続してPRAGMAを適用）
+    
+    Returns:
+        共有のaiosqlite接続
+    """
+    global _shared_db
+    if _shared_db is None:
+        async with _shared_db_lock:
+            if _shared_db is None:
+                _shared_db = await open_db()
+    return _shared_db
+
+
+@asynccontextmanager
+async def shared_transaction():
+    """
+    共有接続で書き込みトランザクションを実行（BEGIN IMMEDIATE〜COMMIT）
+    
+    ロック内で実行するため、他の処理の書き込みが同じトランザクションに混ざらない。
+    例外発生時はロールバックします。
+    
+    Yields:
+        共有のaiosqlite接続
+    """
+    db = await get_db()
+    async with _shared_write_lock:
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            await db.rollback()
+            raise
+        await db.commit()
+
+
+async def close_db():
+    """共有接続を閉じる（次回のget_db()で再接続される）"""
+    global _shared_db
+    async with _shared_db_lock:
+        if _shared_db is not None:
+            await close_connection(_shared_db)
+            _shared_db = None
 
 
 # ==================== クエリヘルパー ====================
@@ -21,12 +232,10 @@ async def fetch_one(db, q, params=None):
         params: パラメータ
         
     Returns:
-        取得した行（タプル）またはNone
+        取得した行（aiosqlite.Row）またはNone
     """
-    cur = await db.execute(q, params or {})
-    row = await cur.fetchone()
-    await cur.close()
-    return row
+    async with db.execute(q, params or ()) as cur:
+        return await cur.fetchone()
 
 
 async def fetch_all(db, q, params=None):
@@ -39,16 +248,21 @@ async def fetch_all(db, q, params=None):
         params: パラメータ
         
     Returns:
-        取得した行のリスト
+        取得した行（aiosqlite.Row）のリスト
     """
-    cur = await db.execute(q, params or {})
-    rows = await cur.fetchall()
-    await cur.close()
-    return rows
+    return await db.execute_fetchall(q, params or ())
 
 
 # ==================== ユーザー管理 ====================
 
+# 既存ユーザーでもRETURNINGでIDが返るようDO UPDATEにする
+_UPSERT_USER_SQL = """
+    INSERT INTO users(discord_user_id) VALUES (?)
+    ON CONFLICT(discord_user_id) DO UPDATE SET discord_user_id = excluded.discord_user_id
+    RETURNING id
+"""
+
+
 async def upsert_user(db, discord_user_id: int) -> int:
     """
     ユーザーをDBに追加（既存の場合は何もしない）
@@ -60,19 +274,108 @@ async def upsert_user(db, discord_user_id: int) -> int:
     Returns:
         ユーザーの内部ID
     """
-    await db.execute(
+    # 既存ユーザー（大半の呼び出し）は書き込みなしの1回で済ませる
+    row = await fetch_one(db, "SELECT id FROM users WHERE discord_user_id=?", (int(discord_user_id),))
+    if row is None:
+        # 同時に追加された場合もIDが返る
+        row = await fetch_one(db, _UPSERT_USER_SQL, (int(discord_user_id),))
+    return int(row[0])
+
+
+async def upsert_users(db, discord_user_ids) -> dict[int, int]:
+    """
+    複数のユーザーをまとめてDBに追加（既存の場合は何もしない）
+    
+    Args:
+        db: データベース接続
+        discord_user_ids: DiscordユーザーIDの一覧
+    
+    Returns:
+        DiscordユーザーID -> ユーザーの内部ID の辞書
+    """
+    ids = [int(discord_user_id) for discord_user_id in set(discord_user_ids)]
+    await db.executemany(
         "INSERT OR IGNORE INTO users(discord_user_id) VALUES (?)",
-        (str(discord_user_id),),
+        [(discord_user_id,) for discord_user_id in ids],
     )
-    row = await fetch_one(db, "SELECT id FROM users WHERE discord_user_id=?", (str(discord_user_id),))
-    return int(row[0])
+    
+    # SQLiteのパラメータ数上限を超えないよう分割して取得
+    result = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        rows = await fetch_all(
+            db,
+            f"SELECT discord_user_id, id FROM users WHERE discord_user_id IN ({placeholders})",
+            chunk,
+        )
+        result.update({discord_user_id: uid for discord_user_id, uid in rows})
+    return result
+
+
+# ==================== キャッシュ ====================
+
+# 通貨・口座IDのキャッシュの最大件数（複数ギルドで使われても際限なく増えないようにする）
+LOOKUP_CACHE_SIZE = 4096
+
+
+class LRUCache:
+    """
+    件数上限付きのキャッシュ（上限を超えたら最も古く使われたものから捨てる）
+    
+    値は変更されない行だけを入れる（見つからなかった結果は入れない）。
+    """
+    
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+    
+    def get(self, key):
+        """値を取得（無ければNone）"""
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+    
+    def put(self, key, value):
+        """値を保存"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+    
+    def pop(self, key):
+        """値を削除"""
+        self._data.pop(key, None)
+
+
+# (シンボル, ギルドID) -> (id, symbol, name, decimals)
+_asset_cache = LRUCache(LOOKUP_CACHE_SIZE)
+# asset_id -> (symbol, decimals)
+_asset_info_cache = LRUCache(LOOKUP_CACHE_SIZE)
+# 口座名 -> アカウントID（口座は削除されず、IDも変わらない）
+_account_id_cache = LRUCache(LOOKUP_CACHE_SIZE)
+
+
+def forget_asset(symbol: str, guild_id: int, asset_id: int):
+    """
+    通貨のキャッシュを破棄（通貨を削除したときに呼び出す）
+    
+    Args:
+        symbol: 通貨シンボル
+        guild_id: ギルドID
+        asset_id: 通貨ID
+    """
+    _asset_cache.pop((symbol.upper(), int(guild_id)))
+    _asset_info_cache.pop(asset_id)
+    _asset_decimals.pop(asset_id, None)
 
 
 # ==================== 通貨管理 ====================
 
 async def get_asset(db, symbol: str, guild_id: int):
     """
-    通貨情報を取得
+    通貨情報を取得（キャッシュ付き）
     
     Args:
         db: データベース接続
@@ -82,16 +385,22 @@ async def get_asset(db, symbol: str, guild_id: int):
     Returns:
         (id, symbol, name, decimals) のタプル、または None
     """
-    return await fetch_one(
-        db,
-        "SELECT id, symbol, name, decimals FROM assets WHERE symbol=? AND guild_id=?",
-        (symbol.upper(), str(guild_id))
-    )
+    key = (symbol.upper(), int(guild_id))
+    asset = _asset_cache.get(key)
+    if asset is None:
+        asset = await fetch_one(
+            db,
+            "SELECT id, symbol, name, decimals FROM assets WHERE symbol=? AND guild_id=?",
+            key
+        )
+        if asset is not None:
+            _asset_cache.put(key, asset)
+    return asset
 
 
 async def get_asset_info_by_id(db, asset_id: int):
     """
-    asset_idから通貨のsymbolとdecimalsを取得
+    asset_idから通貨のsymbolとdecimalsを取得（キャッシュ付き）
     
     Args:
         db: データベース接続
@@ -100,7 +409,36 @@ async def get_asset_info_by_id(db, asset_id: int):
     Returns:
         (symbol, decimals) のタプル、または None
     """
-    return await fetch_one(db, "SELECT symbol, decimals FROM assets WHERE id = ?", (asset_id,))
+    info = _asset_info_cache.get(asset_id)
+    if info is None:
+        info = await fetch_one(db, "SELECT symbol, decimals FROM assets WHERE id = ?", (asset_id,))
+        if info is not None:
+            _asset_info_cache.put(asset_id, info)
+    return info
+
+
+# asset_id -> decimals（通貨の桁数は作成後に変わらず、IDも再利用されないためキャッシュしてよい）
+_asset_decimals: dict[int, int] = {}
+
+
+async def asset_decimals(db, asset_id: int) -> int:
+    """
+    通貨の小数点以下の桁数を取得（キャッシュ付き）
+    
+    Args:
+        db: データベース接続
+        asset_id: 通貨ID
+    
+    Returns:
+        小数点以下の桁数（通貨が存在しない場合はDEFAULT_DECIMALS）
+    """
+    decimals = _asset_decimals.get(asset_id)
+    if decimals is None:
+        row = await fetch_one(db, "SELECT decimals FROM assets WHERE id = ?", (asset_id,))
+        if row is None:
+            return DEFAULT_DECIMALS
+        decimals = _asset_decimals[asset_id] = int(row[0])
+    return decimals
 
 
 async def create_asset(db, symbol: str, name: str, guild_id: int, decimals: int = DEFAULT_DECIMALS):
@@ -116,8 +454,10 @@ async def create_asset(db, symbol: str, name: str, guild_id: int, decimals: int
     """
     await db.execute(
         "INSERT INTO assets(guild_id, symbol, name, decimals) VALUES (?,?,?,?)",
-        (str(guild_id), symbol.upper(), name, int(decimals)),
+        (int(guild_id), symbol.upper(), name, int(decimals)),
     )
+    # 同じシンボルで作り直された場合に古いIDが返らないようにする
+    _asset_cache.pop((symbol.upper(), int(guild_id)))
 
 
 # ==================== アカウント管理 ====================
@@ -130,13 +470,12 @@ async def ensure_system_accounts(db, guild_id: int):
         db: データベース接続
         guild_id: ギルドID
     """
-    await db.execute(
-        "INSERT OR IGNORE INTO accounts(user_id, guild_id, name, type) VALUES (NULL, ?, ?, 'treasury')",
-        (str(guild_id), f"treasury:{guild_id}")
-    )
-    await db.execute(
-        "INSERT OR IGNORE INTO accounts(user_id, guild_id, name, type) VALUES (NULL, ?, ?, 'burn')",
-        (str(guild_id), f"burn:{guild_id}")
+    await db.executemany(
+        "INSERT OR IGNORE INTO accounts(user_id, guild_id, name, type) VALUES (NULL, ?, ?, ?)",
+        [
+            (int(guild_id), f"treasury:{guild_id}", "treasury"),
+            (int(guild_id), f"burn:{guild_id}", "burn"),
+        ],
     )
 
 
@@ -152,14 +491,26 @@ async def ensure_user_account(db, discord_user_id: int, guild_id: int) -> int:
     Returns:
         アカウントID
     """
-    uid = await upsert_user(db, discord_user_id)
     name = f"user:{discord_user_id}:{guild_id}"
-    await db.execute(
-        "INSERT OR IGNORE INTO accounts(user_id, guild_id, name, type) VALUES (?,?,?, 'user')",
-        (uid, str(guild_id), name),
-    )
+    account_id = _account_id_cache.get(name)
+    if account_id is not None:
+        return account_id
+    
     row = await fetch_one(db, "SELECT id FROM accounts WHERE name=?", (name,))
-    return int(row[0])
+    if row is None:
+        # 作成した口座はロールバックされる可能性があるため、キャッシュは次回の検索時に行う
+        # どのみち書き込むので、ユーザーもSELECTを挟まずUPSERT 1回でIDを得る
+        user_row = await fetch_one(db, _UPSERT_USER_SQL, (int(discord_user_id),))
+        row = await fetch_one(db, """
+            INSERT INTO accounts(user_id, guild_id, name, type) VALUES (?,?,?, 'user')
+            ON CONFLICT(name) DO UPDATE SET name = excluded.name
+            RETURNING id
+        """, (user_row[0], int(guild_id), name))
+        return int(row[0])
+    
+    account_id = int(row[0])
+    _account_id_cache.put(name, account_id)
+    return account_id
 
 
 async def account_id_by_name(db, name: str, guild_id: int) -> int:
@@ -178,10 +529,14 @@ async def account_id_by_name(db, name: str, guild_id: int) -> int:
         RuntimeError: アカウントが見つからない場合
     """
     full_name = f"{name}:{guild_id}"
-    row = await fetch_one(db, "SELECT id FROM accounts WHERE name=?", (full_name,))
-    if not row:
-        raise RuntimeError(f"口座が見つかりません: {full_name}")
-    return int(row[0])
+    account_id = _account_id_cache.get(full_name)
+    if account_id is None:
+        row = await fetch_one(db, "SELECT id FROM accounts WHERE name=?", (full_name,))
+        if not row:
+            raise RuntimeError(f"口座が見つかりません: {full_name}")
+        account_id = int(row[0])
+        _account_id_cache.put(full_name, account_id)
+    return account_id
 
 
 # ==================== 残高管理 ====================
@@ -198,12 +553,43 @@ async def balance_of(db, account_id: int, asset_id: int) -> Decimal:
     Returns:
         残高（Decimal）
     """
+    # 残高は account_balances にトリガーで集計済み（仕訳の合計は取らない）
     row = await fetch_one(
         db,
-        "SELECT COALESCE(SUM(CAST(amount AS TEXT)), '0') FROM ledger_entries WHERE account_id=? AND asset_id=?",
+        "SELECT balance_int FROM account_balances WHERE account_id=? AND asset_id=?",
         (account_id, asset_id),
     )
-    return Decimal(row[0]) if row and row[0] is not None else Decimal("0")
+    balance_int = row[0] if row else 0
+    return Decimal(balance_int).scaleb(-await asset_decimals(db, asset_id))
+
+
+async def balances_for_guild(db, guild_id: int, account_id: int | None = None) -> dict[tuple[int, int], Decimal]:
+    """
+    ギルドの口座残高をまとめて取得（balance_of を口座・通貨ごとに呼ぶ代わりに1回のクエリで済ませる）
+    
+    Args:
+        db: データベース接続
+        guild_id: ギルドID
+        account_id: 指定した場合はこの口座の残高だけを取得
+    
+    Returns:
+        (アカウントID, 通貨ID) -> 残高（Decimal）の辞書（記帳のない組み合わせは含まない）
+    """
+    q = """
+        SELECT ab.account_id, ab.asset_id, ab.balance_int, a.decimals
+        FROM account_balances ab
+        JOIN assets a ON a.id = ab.asset_id
+        WHERE a.guild_id = ?
+    """
+    params = [int(guild_id)]
+    if account_id is not None:
+        q += " AND ab.account_id = ?"
+        params.append(account_id)
+    rows = await fetch_all(db, q, params)
+    return {
+        (acc_id, asset_id): Decimal(balance_int).scaleb(-int(decimals))
+        for acc_id, asset_id, balance_int, decimals in rows
+    }
 
 
 async def auto_refill_treasury_if_needed(
@@ -211,7 +597,8 @@ async def auto_refill_treasury_if_needed(
     treasury_acc_id: int,
     asset_id: int,
     guild_id: int,
-    required_amount: Decimal = None
+    required_amount: Decimal = None,
+    commit: bool = True
 ) -> bool:
     """
     Treasury残高が不足している場合、自動で10億枚発行する
@@ -222,11 +609,26 @@ async def auto_refill_treasury_if_needed(
         asset_id: 通貨ID
         guild_id: ギルドID
         required_amount: 必要な金額（オプション）
+        commit: 補充後にコミットするか（呼び出し側のトランザクションに含める場合はFalse）
         
     Returns:
         補充が行われた場合True、それ以外False
     """
-    current_balance = await balance_of(db, treasury_acc_id, asset_id)
+    # 残高・シンボル・桁数を1回のクエリでまとめて取得
+    row = await fetch_one(db, """
+        SELECT COALESCE(ab.balance_int, 0), a.symbol, a.decimals
+        FROM assets a
+        LEFT JOIN account_balances ab ON ab.account_id = ? AND ab.asset_id = a.id
+        WHERE a.id = ?
+    """, (treasury_acc_id, asset_id))
+    if row is None:
+        # 通貨が存在しない場合（従来どおり残高ゼロ・シンボル不明として扱う）
+        balance_int, symbol, decimals = 0, "UNKNOWN", DEFAULT_DECIMALS
+    else:
+        balance_int, symbol, decimals = row[0], row[1], int(row[2])
+        # post_ledger が桁数を取得し直さないようにする
+        _asset_decimals[asset_id] = decimals
+    current_balance = Decimal(balance_int).scaleb(-decimals)
     
     # 必要な金額が指定されていて、それが現在の残高を上回る場合、または残高がゼロの場合
     should_refill = False
@@ -238,10 +640,6 @@ async def auto_refill_treasury_if_needed(
     if should_refill:
         refill_amount = Decimal("1000000000")  # 10億枚
         
-        # 通貨情報を取得
-        asset_info = await fetch_one(db, "SELECT symbol FROM assets WHERE id = ?", (asset_id,))
-        symbol = asset_info[0] if asset_info else "UNKNOWN"
-        
         # システムによる自動発行取引を作成
         tx_id = await new_transaction(
             db,
@@ -255,10 +653,11 @@ async def auto_refill_treasury_if_needed(
         await post_ledger(db, tx_id, treasury_acc_id, asset_id, refill_amount)
         
         # ここでコミットが必要（refill_amountを確定させるため）
-        await db.commit()
+        if commit:
+            await db.commit()
         
-        print(f"[TREASURY] Auto-refilled {refill_amount} {symbol} to Treasury in guild {guild_id}")
-        print(f"[TREASURY] New balance: {current_balance + refill_amount} {symbol}")
+        logger.info("[TREASURY] Auto-refilled %s %s to Treasury in guild %s", refill_amount, symbol, guild_id)
+        logger.info("[TREASURY] New balance: %s %s", current_balance + refill_amount, symbol)
         
         return True
     
@@ -267,13 +666,17 @@ async def auto_refill_treasury_if_needed(
 
 # ==================== 取引管理 ====================
 
+# 記帳のたびに実行するSQL（post_ledger と post_ledger_many で同じ文字列を使い、ステートメントキャッシュを共有する）
+_INSERT_LEDGER_SQL = "INSERT INTO ledger_entries(tx_id, account_id, asset_id, amount, amount_int) VALUES (?,?,?,?,?)"
+
+
 async def new_transaction(
     db,
     kind: str,
     created_by_user_id: int | None,
     unique_hash: str | None,
     reference: str | None
-) -> int:
+) -> int | None:
     """
     新しい取引を作成
     
@@ -281,18 +684,18 @@ async def new_transaction(
         db: データベース接続
         kind: 取引種別
         created_by_user_id: 作成者のユーザーID
-        unique_hash: ユニークハッシュ
+        unique_hash: ユニークハッシュ（同じ値の取引が既にあれば作成しない）
         reference: 参照情報
         
     Returns:
-        取引ID
+        取引ID（unique_hash が既存の取引と重複した場合は None）
     """
-    await db.execute(
-        "INSERT INTO transactions(kind, reference, created_by, unique_hash) VALUES (?,?,?,?)",
+    row = await fetch_one(
+        db,
+        "INSERT OR IGNORE INTO transactions(kind, reference, created_by, unique_hash) VALUES (?,?,?,?) RETURNING id",
         (kind, reference, created_by_user_id, unique_hash),
     )
-    row = await fetch_one(db, "SELECT last_insert_rowid()")
-    return int(row[0])
+    return int(row[0]) if row else None
 
 
 async def post_ledger(db, tx_id: int, account_id: int, asset_id: int, amount: Decimal):
@@ -304,11 +707,55 @@ async def post_ledger(db, tx_id: int, account_id: int, asset_id: int, amount: De
         tx_id: 取引ID
         account_id: アカウントID
         asset_id: 通貨ID
-        amount: 金額（Decimal）
+        amount: 金額（Decimal、通貨の桁数に丸めて記帳）
+    """
+    decimals = await asset_decimals(db, asset_id)
+    amount = round_amount(amount, decimals)
+    await db.execute(
+        _INSERT_LEDGER_SQL,
+        (tx_id, account_id, asset_id, str(amount), to_minor_units(amount, decimals)),
+    )
+
+
+async def post_ledger_pair(db, tx_id: int, from_account_id: int, to_account_id: int, asset_id: int, amount: Decimal):
+    """
+    振替の借方・貸方を1回のINSERTで記帳
+    
+    Args:
+        db: データベース接続
+        tx_id: 取引ID
+        from_account_id: 出金元アカウントID
+        to_account_id: 入金先アカウントID
+        asset_id: 通貨ID
+        amount: 金額（Decimal、通貨の桁数に丸めて記帳）
     """
+    decimals = await asset_decimals(db, asset_id)
+    amount = round_amount(amount, decimals)
+    amount_int = to_minor_units(amount, decimals)
     await db.execute(
-        "INSERT INTO ledger_entries(tx_id, account_id, asset_id, amount) VALUES (?,?,?,?)",
-        (tx_id, account_id, asset_id, str(amount)),
+        "INSERT INTO ledger_entries(tx_id, account_id, asset_id, amount, amount_int) VALUES (?,?,?,?,?),(?,?,?,?,?)",
+        (tx_id, from_account_id, asset_id, str(-amount), -amount_int,
+         tx_id, to_account_id, asset_id, str(amount), amount_int),
+    )
+
+
+async def post_ledger_many(db, tx_id: int, entries: list[tuple[int, int, Decimal]]):
+    """
+    複数の仕訳をまとめて記帳
+    
+    Args:
+        db: データベース接続
+        tx_id: 取引ID
+        entries: (アカウントID, 通貨ID, 金額) のリスト（金額は通貨の桁数に丸めて記帳）
+    """
+    rows = []
+    for account_id, asset_id, amount in entries:
+        decimals = await asset_decimals(db, asset_id)
+        amount = round_amount(amount, decimals)
+        rows.append((tx_id, account_id, asset_id, str(amount), to_minor_units(amount, decimals)))
+    await db.executemany(
+        _INSERT_LEDGER_SQL,
+        rows,
     )
 
 
@@ -321,429 +768,794 @@ async def ensure_guild_setup(guild_id: int):
     Args:
         guild_id: ギルドID
     """
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with connect() as db:
         await ensure_system_accounts(db, guild_id)
         await db.commit()
 
 
+# ==================== マイグレーション ====================
+
+# 既存のテーブルと数が異なれば作り直す定義上の指定（ALTER TABLEでは変更できないもの）
+_REBUILD_MARKERS = ("WITHOUT ROWID", "ON DELETE CASCADE")
+
+
+async def migrate_integer_columns(db, table: str, create_sql: str, casts: dict[str, str]) -> bool:
+    """
+    TEXTで宣言された既存カラムをINTEGERに移行（テーブルを再作成）
+    
+    SQLiteはカラムの型を変更できないため、新しい定義で `{table}__new` を作成し、
+    データをコピーしてから元のテーブルと置き換えます。
+    新しい定義と既存のテーブルで WITHOUT ROWID・ON DELETE CASCADE の有無が異なる場合も再作成します。
+    
+    Args:
+        db: データベース接続
+        table: テーブル名
+        create_sql: `CREATE TABLE IF NOT EXISTS {name} (...)` 形式のテンプレート
+        casts: INTEGERに移行するカラム名と変換式（例: {"guild_id": "CAST(guild_id AS INTEGER)"}）
+    
+    Returns:
+        移行が行われた場合True、それ以外False
+    """
+    columns = await fetch_all(db, f"PRAGMA table_info({table})")
+    if not columns:
+        return False
+    
+    declared = {name: (col_type or "").upper() for _, name, col_type, *_ in columns}
+    existing_sql = (await fetch_one(db, "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)))[0]
+    definition_changed = any(
+        create_sql.upper().count(marker) != existing_sql.upper().count(marker)
+        for marker in _REBUILD_MARKERS
+    )
+    if not definition_changed and all(declared.get(col) == "INTEGER" for col in casts if col in declared):
+        return False
+    
+    new_table = f"{table}__new"
+    await db.execute(f"DROP TABLE IF EXISTS {new_table}")
+    await db.execute(create_sql.format(name=new_table))
+    
+    new_columns = {row[1] for row in await fetch_all(db, f"PRAGMA table_info({new_table})")}
+    copy_columns = [name for name in declared if name in new_columns]
+    select_exprs = [casts.get(name, name) for name in copy_columns]
+    
+    await db.execute(
+        f"INSERT INTO {new_table}({', '.join(copy_columns)}) "
+        f"SELECT {', '.join(select_exprs)} FROM {table}"
+    )
+    await db.execute(f"DROP TABLE {table}")
+    await db.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    if casts:
+        logger.info("[DATABASE] %s のカラムをINTEGERに移行しました: %s", table, ", ".join(casts))
+    else:
+        logger.info("[DATABASE] %s を再作成しました", table)
+    return True
+
+
 # ==================== データベース初期化 ====================
 
+# 固定のテーブル・インデックス（ensure_db で1回の executescript にまとめて実行）
+_SCHEMA_DDL = """
+    -- transactionsテーブル
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        reference TEXT,
+        created_by INTEGER,
+        unique_hash TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (created_by) REFERENCES users(id)
+    );
+    
+    -- 同じ操作の二重実行防止用（unique_hash を指定した取引のみ）
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_unique_hash
+    ON transactions(unique_hash) WHERE unique_hash IS NOT NULL;
+    
+    -- auto_reward_claimsテーブル
+    CREATE TABLE IF NOT EXISTS auto_reward_claims (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        config_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        guild_id TEXT NOT NULL,
+        claimed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (config_id) REFERENCES auto_reward_configs(id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        UNIQUE(config_id, user_id)
+    );
+    
+    -- autoreward_claimsテーブル（autorewardsの受取記録。UNIQUE制約で二重受取を防ぐ）
+    CREATE TABLE IF NOT EXISTS autoreward_claims (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        reward_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        claimed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (reward_id) REFERENCES autorewards(id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        UNIQUE(reward_id, user_id)
+    );
+    
+    -- role_panelsテーブル（ロール購入パネル）
+    CREATE TABLE IF NOT EXISTS role_panels (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        panel_id INTEGER NOT NULL,
+        panel_name TEXT NOT NULL,
+        role_id TEXT NOT NULL,
+        currency_symbol TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(guild_id, panel_id),
+        UNIQUE(guild_id, panel_name)
+    );
+    
+    -- role_plansテーブル（ロールプラン）
+    CREATE TABLE IF NOT EXISTS role_plans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        panel_id INTEGER NOT NULL,
+        plan_name TEXT NOT NULL,
+        role_id TEXT NOT NULL,
+        price TEXT NOT NULL,
+        currency_symbol TEXT NOT NULL,
+        duration_hours INTEGER NOT NULL,
+        description TEXT,
+        guild_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (panel_id) REFERENCES role_panels(id) ON DELETE CASCADE
+    );
+    
+    -- パネルごとのプラン一覧用（価格順の並べ替えもインデックスで済ませる）
+    CREATE INDEX IF NOT EXISTS idx_role_plans_panel
+    ON role_plans(panel_id, price);
+    
+    -- temporary_rolesテーブル（一時的なロール管理）
+    CREATE TABLE IF NOT EXISTS temporary_roles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        role_id INTEGER NOT NULL,
+        expires_at TIMESTAMP NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    
+    -- deployed_panelsテーブル（デプロイ済みパネル管理）
+    CREATE TABLE IF NOT EXISTS deployed_panels (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        message_id TEXT NOT NULL,
+        panel_db_id INTEGER NOT NULL,
+        deployed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (panel_db_id) REFERENCES role_panels(id) ON DELETE CASCADE
+    );
+    
+    -- forum_settingsテーブル
+    CREATE TABLE IF NOT EXISTS forum_settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        forum_channel_id TEXT NOT NULL,
+        role_id TEXT NOT NULL,
+        delete_old_posts INTEGER DEFAULT 0,
+        UNIQUE(guild_id, forum_channel_id, role_id)
+    );
+    
+    -- boost_logsテーブル（ブースト履歴）
+    CREATE TABLE IF NOT EXISTS boost_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        boosted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    );
+    
+    
+    -- sleep_move_preferencesテーブル（ユーザーのスリープVC設定）
+    CREATE TABLE IF NOT EXISTS sleep_move_preferences (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        vc_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(guild_id, user_id)
+    );
+    
+    -- sleep_move_penaltiesテーブル（ペナルティ設定）
+    CREATE TABLE IF NOT EXISTS sleep_move_penalties (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL UNIQUE,
+        enabled INTEGER DEFAULT 0,
+        penalty_type TEXT NOT NULL,
+        base_amount TEXT NOT NULL,
+        currency_symbol TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    
+    -- sleep_move_logsテーブル（移動ログ）
+    CREATE TABLE IF NOT EXISTS sleep_move_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        move_count INTEGER DEFAULT 0,
+        total_penalty TEXT DEFAULT '0',
+        last_moved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(guild_id, user_id)
+    );
+"""
+
+# ユーザー・口座・通貨テーブルの定義（Discord IDはINTEGERで保持）
+USERS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        discord_user_id INTEGER UNIQUE NOT NULL
+    )
+"""
+
+ACCOUNTS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        guild_id INTEGER NOT NULL,
+        name TEXT UNIQUE NOT NULL,
+        type TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+"""
+
+ASSETS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        symbol TEXT NOT NULL,
+        name TEXT NOT NULL,
+        decimals INTEGER NOT NULL DEFAULT 2,
+        UNIQUE(guild_id, symbol)
+    )
+"""
+
+# 通貨を参照するテーブルの定義（通貨の削除時に ON DELETE CASCADE で一緒に削除される）
+# ledger_entriesテーブル
+LEDGER_ENTRIES_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tx_id INTEGER NOT NULL,
+        account_id INTEGER NOT NULL,
+        asset_id INTEGER NOT NULL,
+        amount TEXT NOT NULL,
+        amount_int INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (tx_id) REFERENCES transactions(id),
+        FOREIGN KEY (account_id) REFERENCES accounts(id),
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE
+    )
+"""
+
+# claimsテーブル
+CLAIMS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        from_user_id INTEGER NOT NULL,
+        to_user_id INTEGER NOT NULL,
+        asset_id INTEGER NOT NULL,
+        amount TEXT NOT NULL,
+        memo TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (from_user_id) REFERENCES users(id),
+        FOREIGN KEY (to_user_id) REFERENCES users(id),
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE
+    )
+"""
+
+# daily_role_rewardsテーブル
+DAILY_ROLE_REWARDS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        role_id TEXT NOT NULL,
+        asset_id INTEGER NOT NULL,
+        reward_amount TEXT NOT NULL,
+        day_of_week TEXT NOT NULL DEFAULT 'all',
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE,
+        UNIQUE(guild_id, role_id, asset_id, day_of_week)
+    )
+"""
+
+# daily_logテーブル
+DAILY_LOG_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        asset_id INTEGER NOT NULL,
+        last_claimed_date TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE,
+        UNIQUE(user_id, asset_id)
+    )
+"""
+
+# autorewardsテーブル（メッセージIDベース）
+AUTOREWARDS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        message_id TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        asset_id INTEGER NOT NULL,
+        reward_amount TEXT NOT NULL,
+        max_claims INTEGER DEFAULT -1,
+        current_claims INTEGER DEFAULT 0,
+        enabled INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE,
+        UNIQUE(guild_id, message_id)
+    )
+"""
+
+# auto_reward_configsテーブル（メッセージトリガーベース）
+AUTO_REWARD_CONFIGS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id TEXT NOT NULL,
+        channel_id TEXT NOT NULL,
+        trigger_message TEXT NOT NULL,
+        reward_amount TEXT NOT NULL,
+        asset_id INTEGER NOT NULL,
+        enabled INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE,
+        UNIQUE(guild_id, channel_id)
+    )
+"""
+
+# bank_accountsテーブル（銀行口座）
+BANK_ACCOUNTS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        asset_id INTEGER NOT NULL,
+        balance TEXT NOT NULL DEFAULT '0',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE,
+        UNIQUE(user_id, asset_id)
+    )
+"""
+
+# bank_transactionsテーブル（銀行取引履歴）
+BANK_TRANSACTIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        asset_id INTEGER NOT NULL,
+        transaction_type TEXT NOT NULL,
+        amount TEXT NOT NULL,
+        balance_after TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE
+    )
+"""
+
+ASSET_CHILD_TABLES = (
+    ("ledger_entries", LEDGER_ENTRIES_SQL),
+    ("claims", CLAIMS_SQL),
+    ("daily_role_rewards", DAILY_ROLE_REWARDS_SQL),
+    ("daily_log", DAILY_LOG_SQL),
+    ("autorewards", AUTOREWARDS_SQL),
+    ("auto_reward_configs", AUTO_REWARD_CONFIGS_SQL),
+    ("bank_accounts", BANK_ACCOUNTS_SQL),
+    ("bank_transactions", BANK_TRANSACTIONS_SQL),
+)
+
+_ASSET_CHILD_DDL = "".join(f"{sql.format(name=table)};\n" for table, sql in ASSET_CHILD_TABLES)
+
+# VC報酬テーブルの定義（Discord IDと金額はINTEGERで保持。金額は通貨の最小単位）
+VC_EARNING_SESSIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        category_id INTEGER,
+        started_at TIMESTAMP NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        UNIQUE(guild_id, user_id)
+    )
+"""
+
+VC_EARNING_RATES_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        asset_id INTEGER NOT NULL,
+        rate_per_minute INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE,
+        UNIQUE(guild_id, category_id)
+    )
+"""
+
+VC_EARNING_DAILY_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        asset_id INTEGER NOT NULL,
+        total_earned INTEGER NOT NULL DEFAULT 0,
+        date TEXT NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (asset_id) REFERENCES assets(id) ON DELETE CASCADE,
+        UNIQUE(guild_id, user_id, asset_id, date)
+    )
+"""
+
+# VC管理テーブルの定義（Discord IDと日時はINTEGERで保持。日時はUNIX秒）
+VC_SESSIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        start_time INTEGER NOT NULL,
+        end_time INTEGER,
+        duration_minutes INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+"""
+
+# 主キーだけで検索する小さなテーブルは WITHOUT ROWID にして、主キーのB木に行を直接格納する
+VC_EXCLUDED_CHANNELS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        guild_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        channel_type TEXT NOT NULL,
+        PRIMARY KEY (guild_id, channel_id)
+    ) WITHOUT ROWID
+"""
+
+VC_CHECK_ROLES_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        guild_id INTEGER NOT NULL,
+        role_id INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, role_id)
+    ) WITHOUT ROWID
+"""
+
+BANK_MANAGER_ROLES_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        guild_id TEXT NOT NULL,
+        role_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (guild_id, role_id)
+    ) WITHOUT ROWID
+"""
+
+SLEEP_MOVE_DEFAULTS_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        guild_id TEXT NOT NULL PRIMARY KEY,
+        vc_id TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) WITHOUT ROWID
+"""
+
+# role_purchasesテーブル（ロール購入履歴。有効期限はUNIX時間の整数で保持）
+ROLE_PURCHASES_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        plan_id INTEGER NOT NULL,
+        guild_id TEXT NOT NULL,
+        purchased_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at INTEGER NOT NULL,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (plan_id) REFERENCES role_plans(id)
+    )
+"""
+
+
+def _sql_round_amount(amount, decimals: int):
+    """SQL関数 round_amount(amount, decimals): 金額を通貨の桁数に丸めたTEXT（数値でなければそのまま）"""
+    try:
+        return str(round_amount(Decimal(str(amount)), int(decimals)))
+    except (InvalidOperation, ValueError):
+        return amount
+
+
+def _sql_minor_units(amount, decimals: int) -> int:
+    """SQL関数 minor_units(amount, decimals): 金額を最小単位の整数に変換（数値でなければ0）"""
+    try:
+        return to_minor_units(Decimal(str(amount)), int(decimals))
+    except (InvalidOperation, ValueError):
+        return 0
+
+
+async def _register_amount_functions(db):
+    """
+    マイグレーションで使う金額変換のSQL関数を登録
+    
+    SQLの ROUND() はREAL経由で四捨五入するため、記帳時と同じ Decimal の丸めをPythonで行う
+    """
+    await db.create_function("round_amount", 2, _sql_round_amount, deterministic=True)
+    await db.create_function("minor_units", 2, _sql_minor_units, deterministic=True)
+
+
+def _asset_decimals_expr(table: str) -> str:
+    """行の通貨の小数点以下の桁数を返すSQL式（通貨が無ければ0）"""
+    return f"COALESCE((SELECT decimals FROM assets WHERE assets.id = {table}.asset_id), 0)"
+
+
+def _minor_units_expr(table: str, column: str) -> str:
+    """
+    TEXTの金額を通貨の最小単位の整数に変換するSQL式（マイグレーション用）
+    
+    _register_amount_functions() で登録した minor_units() を使い、記帳時の to_minor_units と同じ丸めにする
+    """
+    return f"minor_units({column}, {_asset_decimals_expr(table)})"
+
+
 async def ensure_db():
     """
     データベースを初期化（テーブル作成）
     """
-    async with aiosqlite.connect(DB_PATH) as db:
-        # usersテーブル
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                discord_user_id TEXT UNIQUE NOT NULL
-            )
-        """)
+    async with connect() as db:
+        await _register_amount_functions(db)
         
-        # accountsテーブル
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS accounts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                guild_id TEXT NOT NULL,
-                name TEXT UNIQUE NOT NULL,
-                type TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
+        # すべてのDDL・マイグレーションを1つのトランザクションにまとめ、コミットを1回にする
+        # 固定のテーブルはBEGINと合わせて1回の executescript で作成（トランザクションは開いたまま続ける）
+        await db.executescript("BEGIN;\n" + _SCHEMA_DDL + _ASSET_CHILD_DDL)
         
-        # assetsテーブル
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS assets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                symbol TEXT NOT NULL,
-                name TEXT NOT NULL,
-                decimals INTEGER NOT NULL DEFAULT 2,
-                UNIQUE(guild_id, symbol)
-            )
-        """)
+        # ユーザー・口座・通貨テーブル（TEXTで保存されていたDiscord IDはINTEGERに移行）
+        await migrate_integer_columns(db, "users", USERS_SQL, {
+            "discord_user_id": "CAST(discord_user_id AS INTEGER)",
+        })
+        await migrate_integer_columns(db, "accounts", ACCOUNTS_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+        })
+        await migrate_integer_columns(db, "assets", ASSETS_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+        })
+        await db.execute(USERS_SQL.format(name="users"))
+        await db.execute(ACCOUNTS_SQL.format(name="accounts"))
+        await db.execute(ASSETS_SQL.format(name="assets"))
         
-        # transactionsテーブル
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                kind TEXT NOT NULL,
-                reference TEXT,
-                created_by INTEGER,
-                unique_hash TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (created_by) REFERENCES users(id)
+        # 金額を最小単位の整数でも保持する（amount_int が無い既存DBは列を追加して埋める）
+        ledger_columns = {row[1] for row in await fetch_all(db, "PRAGMA table_info(ledger_entries)")}
+        ledger_migrated = "amount_int" not in ledger_columns
+        if ledger_migrated:
+            await db.execute("ALTER TABLE ledger_entries ADD COLUMN amount_int INTEGER NOT NULL DEFAULT 0")
+            # TEXTの amount も同じ桁数に丸め、amount_int と食い違わないようにする
+            await db.execute(
+                f"UPDATE ledger_entries SET amount = round_amount(amount, {_asset_decimals_expr('ledger_entries')}), "
+                f"amount_int = {_minor_units_expr('ledger_entries', 'amount')}"
             )
-        """)
+            # 旧インデックスは TEXT の amount を含んでいるため作り直す
+            await db.execute("DROP INDEX IF EXISTS idx_ledger_acc_asset")
         
-        # ledger_entriesテーブル
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS ledger_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tx_id INTEGER NOT NULL,
-                account_id INTEGER NOT NULL,
-                asset_id INTEGER NOT NULL,
-                amount TEXT NOT NULL,
-                FOREIGN KEY (tx_id) REFERENCES transactions(id),
-                FOREIGN KEY (account_id) REFERENCES accounts(id),
-                FOREIGN KEY (asset_id) REFERENCES assets(id)
-            )
-        """)
+        # 通貨を参照するテーブル（ON DELETE CASCADE の無い既存テーブルは作り直す）
+        # ※ 作り直したテーブルのインデックス・トリガーは消えるため、以降で作成する
+        for table, create_sql in ASSET_CHILD_TABLES:
+            await migrate_integer_columns(db, table, create_sql, {})
         
-        # claimsテーブル
+        # 取引履歴（ユーザー・通貨ごとの新しい順）用
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS claims (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                from_user_id INTEGER NOT NULL,
-                to_user_id INTEGER NOT NULL,
-                asset_id INTEGER NOT NULL,
-                amount TEXT NOT NULL,
-                memo TEXT,
-                status TEXT NOT NULL DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (from_user_id) REFERENCES users(id),
-                FOREIGN KEY (to_user_id) REFERENCES users(id),
-                FOREIGN KEY (asset_id) REFERENCES assets(id)
-            )
+            CREATE INDEX IF NOT EXISTS idx_bank_tx_user_asset
+            ON bank_transactions(user_id, asset_id, created_at DESC)
         """)
         
-        # daily_role_rewardsテーブル
+        # 残高集計用（amount_intまで含めてインデックスだけで SUM を計算できるようにする）
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS daily_role_rewards (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                role_id TEXT NOT NULL,
-                asset_id INTEGER NOT NULL,
-                reward_amount TEXT NOT NULL,
-                day_of_week TEXT NOT NULL DEFAULT 'all',
-                FOREIGN KEY (asset_id) REFERENCES assets(id),
-                UNIQUE(guild_id, role_id, asset_id, day_of_week)
-            )
+            CREATE INDEX IF NOT EXISTS idx_ledger_acc_asset
+            ON ledger_entries(account_id, asset_id, amount_int)
         """)
-        
-        # daily_logテーブル
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS daily_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                asset_id INTEGER NOT NULL,
-                last_claimed_date TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (asset_id) REFERENCES assets(id),
-                UNIQUE(user_id, asset_id)
-            )
+            CREATE INDEX IF NOT EXISTS idx_ledger_tx
+            ON ledger_entries(tx_id)
         """)
         
-        # autorewardsテーブル（メッセージIDベース）
+        # account_balancesテーブル（口座・通貨ごとの残高。ledger_entriesのトリガーで更新）
+        balances_exists = await fetch_one(
+            db, "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'account_balances'"
+        )
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS autorewards (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                message_id TEXT NOT NULL,
-                channel_id TEXT NOT NULL,
+            CREATE TABLE IF NOT EXISTS account_balances (
+                account_id INTEGER NOT NULL,
                 asset_id INTEGER NOT NULL,
-                reward_amount TEXT NOT NULL,
-                max_claims INTEGER DEFAULT -1,
-                current_claims INTEGER DEFAULT 0,
-                enabled INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (asset_id) REFERENCES assets(id),
-                UNIQUE(guild_id, message_id)
-            )
+                balance_int INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (account_id, asset_id)
+            ) WITHOUT ROWID
         """)
+        if not balances_exists or ledger_migrated:
+            # 既存の仕訳から残高を作成
+            await db.execute("DELETE FROM account_balances")
+            await db.execute("""
+                INSERT INTO account_balances(account_id, asset_id, balance_int)
+                SELECT account_id, asset_id, SUM(amount_int)
+                FROM ledger_entries
+                GROUP BY account_id, asset_id
+            """)
         
-        # auto_reward_configsテーブル（メッセージトリガーベース）
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS auto_reward_configs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                channel_id TEXT NOT NULL,
-                trigger_message TEXT NOT NULL,
-                reward_amount TEXT NOT NULL,
-                asset_id INTEGER NOT NULL,
-                enabled INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (asset_id) REFERENCES assets(id),
-                UNIQUE(guild_id, channel_id)
-            )
+            CREATE TRIGGER IF NOT EXISTS trg_account_balances_insert
+            AFTER INSERT ON ledger_entries
+            BEGIN
+                INSERT INTO account_balances(account_id, asset_id, balance_int)
+                VALUES (NEW.account_id, NEW.asset_id, NEW.amount_int)
+                ON CONFLICT(account_id, asset_id) DO UPDATE SET
+                    balance_int = balance_int + excluded.balance_int;
+            END
         """)
-        
-        # auto_reward_claimsテーブル
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS auto_reward_claims (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                config_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                guild_id TEXT NOT NULL,
-                claimed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (config_id) REFERENCES auto_reward_configs(id) ON DELETE CASCADE,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                UNIQUE(config_id, user_id)
-            )
+            CREATE TRIGGER IF NOT EXISTS trg_account_balances_delete
+            AFTER DELETE ON ledger_entries
+            BEGIN
+                UPDATE account_balances
+                SET balance_int = balance_int - OLD.amount_int
+                WHERE account_id = OLD.account_id AND asset_id = OLD.asset_id;
+            END
         """)
         
-        # role_panelsテーブル（ロール購入パネル）
+        # autoreward_claims への追加時に受取可否の確認と受取回数の更新をSQLite内で行う
+        # （無効・上限到達・削除済みの報酬への追加は中断する）
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS role_panels (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                panel_id INTEGER NOT NULL,
-                panel_name TEXT NOT NULL,
-                role_id TEXT NOT NULL,
-                currency_symbol TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(guild_id, panel_id),
-                UNIQUE(guild_id, panel_name)
-            )
+            CREATE TRIGGER IF NOT EXISTS trg_autoreward_claims_check
+            BEFORE INSERT ON autoreward_claims
+            BEGIN
+                SELECT RAISE(ABORT, 'autoreward unavailable')
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM autorewards
+                    WHERE id = NEW.reward_id AND enabled = 1
+                      AND (max_claims = -1 OR current_claims < max_claims)
+                );
+            END
         """)
-        
-        # role_plansテーブル（ロールプラン）
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS role_plans (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                panel_id INTEGER NOT NULL,
-                plan_name TEXT NOT NULL,
-                role_id TEXT NOT NULL,
-                price TEXT NOT NULL,
-                currency_symbol TEXT NOT NULL,
-                duration_hours INTEGER NOT NULL,
-                description TEXT,
-                guild_id TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (panel_id) REFERENCES role_panels(id) ON DELETE CASCADE
-            )
+            CREATE TRIGGER IF NOT EXISTS trg_autoreward_claims_count
+            AFTER INSERT ON autoreward_claims
+            BEGIN
+                UPDATE autorewards SET current_claims = current_claims + 1 WHERE id = NEW.reward_id;
+            END
         """)
+        # VC管理テーブル（TEXTで保存されていたID・ISO形式の日時はINTEGERに移行）
+        sessions_migrated = await migrate_integer_columns(db, "vc_sessions", VC_SESSIONS_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+            "channel_id": "CAST(channel_id AS INTEGER)",
+            "start_time": "CAST(strftime('%s', start_time) AS INTEGER)",
+            "end_time": "CAST(strftime('%s', end_time) AS INTEGER)",
+        })
+        await migrate_integer_columns(db, "vc_excluded_channels", VC_EXCLUDED_CHANNELS_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+            "channel_id": "CAST(channel_id AS INTEGER)",
+        })
+        await migrate_integer_columns(db, "vc_check_roles", VC_CHECK_ROLES_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+            "role_id": "CAST(role_id AS INTEGER)",
+        })
+        
+        # vc_sessionsテーブル
+        await db.execute(VC_SESSIONS_SQL.format(name="vc_sessions"))
         
-        # role_purchasesテーブル（ロール購入履歴）
+        # vc_sessions_dailyテーブル（/check 用の日別集計。vc_sessionsのトリガーで更新）
+        # ※ vc_excluded_channels / vc_check_roles の検索は主キーがそのまま使われる
+        daily_exists = await fetch_one(
+            db, "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vc_sessions_daily'"
+        )
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS role_purchases (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS vc_sessions_daily (
                 user_id INTEGER NOT NULL,
-                plan_id INTEGER NOT NULL,
-                guild_id TEXT NOT NULL,
-                purchased_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (plan_id) REFERENCES role_plans(id)
-            )
+                guild_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                total_minutes INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, guild_id, day)
+            ) WITHOUT ROWID
         """)
+        if not daily_exists or sessions_migrated:
+            # 既存のセッションから集計を作成（日付はJSTで区切る）
+            await db.execute("DELETE FROM vc_sessions_daily")
+            await db.execute("""
+                INSERT INTO vc_sessions_daily(user_id, guild_id, day, total_minutes)
+                SELECT user_id, guild_id, DATE(start_time, 'unixepoch', '+9 hours'), SUM(duration_minutes)
+                FROM vc_sessions
+                WHERE duration_minutes IS NOT NULL
+                GROUP BY 1, 2, 3
+            """)
+        
+        # 日別集計が使われるようになったため、生データの集計用インデックスは不要
+        await db.execute("DROP INDEX IF EXISTS idx_vc_sessions_user_guild_start")
         
-        # temporary_rolesテーブル（一時的なロール管理）
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS temporary_roles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                role_id INTEGER NOT NULL,
-                expires_at TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+            CREATE TRIGGER IF NOT EXISTS trg_vc_sessions_daily_insert
+            AFTER INSERT ON vc_sessions
+            WHEN NEW.duration_minutes IS NOT NULL
+            BEGIN
+                INSERT INTO vc_sessions_daily(user_id, guild_id, day, total_minutes)
+                VALUES (NEW.user_id, NEW.guild_id, DATE(NEW.start_time, 'unixepoch', '+9 hours'), NEW.duration_minutes)
+                ON CONFLICT(user_id, guild_id, day) DO UPDATE SET
+                    total_minutes = total_minutes + excluded.total_minutes;
+            END
         """)
-        
-        # deployed_panelsテーブル（デプロイ済みパネル管理）
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS deployed_panels (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                channel_id TEXT NOT NULL,
-                message_id TEXT NOT NULL,
-                panel_db_id INTEGER NOT NULL,
-                deployed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (panel_db_id) REFERENCES role_panels(id) ON DELETE CASCADE
-            )
+            CREATE TRIGGER IF NOT EXISTS trg_vc_sessions_daily_update
+            AFTER UPDATE OF duration_minutes, start_time ON vc_sessions
+            BEGIN
+                UPDATE vc_sessions_daily
+                SET total_minutes = total_minutes - COALESCE(OLD.duration_minutes, 0)
+                WHERE user_id = OLD.user_id AND guild_id = OLD.guild_id AND day = DATE(OLD.start_time, 'unixepoch', '+9 hours');
+                INSERT INTO vc_sessions_daily(user_id, guild_id, day, total_minutes)
+                SELECT NEW.user_id, NEW.guild_id, DATE(NEW.start_time, 'unixepoch', '+9 hours'), NEW.duration_minutes
+                WHERE NEW.duration_minutes IS NOT NULL
+                ON CONFLICT(user_id, guild_id, day) DO UPDATE SET
+                    total_minutes = total_minutes + excluded.total_minutes;
+            END
         """)
-        
-        # vc_sessionsテーブル
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS vc_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                channel_id TEXT NOT NULL,
-                start_time TIMESTAMP NOT NULL,
-                end_time TIMESTAMP,
-                duration_minutes INTEGER,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
+            CREATE TRIGGER IF NOT EXISTS trg_vc_sessions_daily_delete
+            AFTER DELETE ON vc_sessions
+            WHEN OLD.duration_minutes IS NOT NULL
+            BEGIN
+                UPDATE vc_sessions_daily
+                SET total_minutes = total_minutes - OLD.duration_minutes
+                WHERE user_id = OLD.user_id AND guild_id = OLD.guild_id AND day = DATE(OLD.start_time, 'unixepoch', '+9 hours');
+            END
         """)
         
         # vc_excluded_channelsテーブル
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS vc_excluded_channels (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                channel_id TEXT NOT NULL,
-                channel_type TEXT NOT NULL,
-                UNIQUE(guild_id, channel_id)
-            )
-        """)
+        await db.execute(VC_EXCLUDED_CHANNELS_SQL.format(name="vc_excluded_channels"))
         
         # vc_check_rolesテーブル
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS vc_check_roles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                role_id TEXT NOT NULL,
-                UNIQUE(guild_id, role_id)
-            )
-        """)
+        await db.execute(VC_CHECK_ROLES_SQL.format(name="vc_check_roles"))
         
-        # forum_settingsテーブル
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS forum_settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                forum_channel_id TEXT NOT NULL,
-                role_id TEXT NOT NULL,
-                delete_old_posts INTEGER DEFAULT 0,
-                UNIQUE(guild_id, forum_channel_id, role_id)
-            )
-        """)
-        
-        # boost_logsテーブル（ブースト履歴）
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS boost_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                boosted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
+        # bank_manager_roles（銀行管理ロール）・sleep_move_defaults（デフォルトスリープVC）テーブル
+        # （rowidありで作成されていた既存のテーブルは WITHOUT ROWID で作り直す）
+        await migrate_integer_columns(db, "bank_manager_roles", BANK_MANAGER_ROLES_SQL, {})
+        await migrate_integer_columns(db, "sleep_move_defaults", SLEEP_MOVE_DEFAULTS_SQL, {})
+        await db.execute(BANK_MANAGER_ROLES_SQL.format(name="bank_manager_roles"))
+        await db.execute(SLEEP_MOVE_DEFAULTS_SQL.format(name="sleep_move_defaults"))
         
-        # bank_accountsテーブル（銀行口座）
+        # role_purchasesテーブル（ISO形式で保存されていた有効期限はUNIX時間に移行）
+        await migrate_integer_columns(db, "role_purchases", ROLE_PURCHASES_SQL, {
+            "expires_at": "CAST(strftime('%s', expires_at) AS INTEGER)",
+        })
+        await db.execute(ROLE_PURCHASES_SQL.format(name="role_purchases"))
+        # 期限切れチェック用
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS bank_accounts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                asset_id INTEGER NOT NULL,
-                balance TEXT NOT NULL DEFAULT '0',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (asset_id) REFERENCES assets(id),
-                UNIQUE(user_id, asset_id)
-            )
+            CREATE INDEX IF NOT EXISTS idx_role_purchases_expiry
+            ON role_purchases(expires_at)
         """)
         
-        # bank_transactionsテーブル（銀行取引履歴）
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS bank_transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                asset_id INTEGER NOT NULL,
-                transaction_type TEXT NOT NULL,
-                amount TEXT NOT NULL,
-                balance_after TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (asset_id) REFERENCES assets(id)
-            )
-        """)
+        # VC報酬テーブル（TEXTで保存されていたID・金額はINTEGERに移行）
+        await migrate_integer_columns(db, "vc_earning_sessions", VC_EARNING_SESSIONS_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+            "channel_id": "CAST(channel_id AS INTEGER)",
+            "category_id": "CAST(category_id AS INTEGER)",
+        })
+        await migrate_integer_columns(db, "vc_earning_rates", VC_EARNING_RATES_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+            "category_id": "CAST(category_id AS INTEGER)",
+            "rate_per_minute": _minor_units_expr("vc_earning_rates", "rate_per_minute"),
+        })
+        await migrate_integer_columns(db, "vc_earning_daily", VC_EARNING_DAILY_SQL, {
+            "guild_id": "CAST(guild_id AS INTEGER)",
+            "total_earned": _minor_units_expr("vc_earning_daily", "total_earned"),
+        })
         
         # vc_earning_sessionsテーブル（VCセッション管理）
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS vc_earning_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                channel_id TEXT NOT NULL,
-                category_id TEXT,
-                started_at TIMESTAMP NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                UNIQUE(guild_id, user_id)
-            )
-        """)
+        await db.execute(VC_EARNING_SESSIONS_SQL.format(name="vc_earning_sessions"))
         
         # vc_earning_ratesテーブル（VC報酬レート設定）
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS vc_earning_rates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                category_id TEXT NOT NULL,
-                asset_id INTEGER NOT NULL,
-                rate_per_minute TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (asset_id) REFERENCES assets(id),
-                UNIQUE(guild_id, category_id)
-            )
-        """)
+        await db.execute(VC_EARNING_RATES_SQL.format(name="vc_earning_rates"))
         
         # vc_earning_dailyテーブル（日次獲得記録）
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS vc_earning_daily (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                user_id INTEGER NOT NULL,
-                asset_id INTEGER NOT NULL,
-                total_earned TEXT NOT NULL DEFAULT '0',
-                date TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (asset_id) REFERENCES assets(id),
-                UNIQUE(guild_id, user_id, asset_id, date)
-            )
-        """)
-        
-        # bank_manager_rolesテーブル（銀行管理ロール）
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS bank_manager_roles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                role_id TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(guild_id, role_id)
-            )
-        """)
+        await db.execute(VC_EARNING_DAILY_SQL.format(name="vc_earning_daily"))
         
-        # sleep_move_preferencesテーブル（ユーザーのスリープVC設定）
+        # 日次リセット（古い記録の削除）用
+        # ※ (guild_id, category_id) / (guild_id, user_id, asset_id, date) / (guild_id, user_id) は
+        #   各テーブルのUNIQUE制約のインデックスがそのまま使われる
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS sleep_move_preferences (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                user_id TEXT NOT NULL,
-                vc_id TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(guild_id, user_id)
-            )
-        """)
-        
-        # sleep_move_defaultsテーブル（デフォルトスリープVC）
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS sleep_move_defaults (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL UNIQUE,
-                vc_id TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # sleep_move_penaltiesテーブル（ペナルティ設定）
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS sleep_move_penalties (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL UNIQUE,
-                enabled INTEGER DEFAULT 0,
-                penalty_type TEXT NOT NULL,
-                base_amount TEXT NOT NULL,
-                currency_symbol TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # sleep_move_logsテーブル（移動ログ）
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS sleep_move_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id TEXT NOT NULL,
-                user_id TEXT NOT NULL,
-                move_count INTEGER DEFAULT 0,
-                total_penalty TEXT DEFAULT '0',
-                last_moved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(guild_id, user_id)
-            )
+            CREATE INDEX IF NOT EXISTS idx_vc_earning_daily_date
+            ON vc_earning_daily(date)
         """)
         
         await db.commit()
-        print("[DATABASE] データベース初期化完了")
+        
+        # 統計情報がまだなければ全体を解析し、以降は古いテーブルだけ再解析する
+        if not await fetch_one(db, "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"):
+            await db.execute("ANALYZE")
+        await db.execute("PRAGMA optimize")
+        logger.info("[DATABASE] データベース初期化完了")
@@ -4,16 +4,42 @@ Embed作成ヘルパーモジュール
 Discord Embedの作成を簡単にするヘルパー関数を提供します。
 """
 
+import time
 import discord
 from datetime import datetime
 from config import TZ
 
 
-def create_success_embed(title: str, description: str, user: discord.User = None) -> discord.Embed:
+# _now() 用の（値の有効期限のmonotonic時刻, 値）
+_now_cache: tuple[float, datetime | None] = (0.0, None)
+
+
+def _now() -> datetime:
+    """Embedのタイムスタンプ用の現在時刻（JST、1秒間は同じ値を使い回す）"""
+    global _now_cache
+    mono = time.monotonic()
+    expires_at, now = _now_cache
+    if mono >= expires_at:
+        now = datetime.now(TZ)
+        _now_cache = (mono + 1.0, now)
+    return now
+
+
+# 種類ごとのタイトル絵文字と色
+_STYLES = {
+    "success": ("✅", 0x2ecc71),
+    "error": ("❌", 0xe74c3c),
+    "info": ("ℹ️", 0x3498db),
+    "warning": ("⚠️", 0xf39c12),
+}
+
+
+def _make_embed(style: str, title: str, description: str, user: discord.User = None) -> discord.Embed:
     """
-    成功メッセージ用のEmbedを作成
+    種類に応じた絵文字・色でEmbedを作成（実行者のフッターと現在時刻を付ける）
     
     Args:
+        style: _STYLES のキー
         title: Embedのタイトル
         description: Embedの説明
         user: フッターに表示するユーザー（オプション）
@@ -21,13 +47,29 @@ def create_success_embed(title: str, description: str, user: discord.User = None
     Returns:
         作成されたEmbed
     """
-    embed = discord.Embed(title=f"✅ {title}", description=description, color=0x2ecc71)
+    emoji, color = _STYLES[style]
+    embed = discord.Embed(title=f"{emoji} {title}", description=description, color=color)
     if user:
         embed.set_footer(text=f"実行者: {user.display_name}", icon_url=user.display_avatar.url)
-    embed.timestamp = datetime.now(TZ)
+    embed.timestamp = _now()
     return embed
 
 
+def create_success_embed(title: str, description: str, user: discord.User = None) -> discord.Embed:
+    """
+    成功メッセージ用のEmbedを作成
+    
+    Args:
+        title: Embedのタイトル
+        description: Embedの説明
+        user: フッターに表示するユーザー（オプション）
+        
+    Returns:
+        作成されたEmbed
+    """
+    return _make_embed("success", title, description, user)
+
+
 def create_error_embed(title: str, description: str, user: discord.User = None) -> discord.Embed:
     """
     エラーメッセージ用のEmbedを作成
@@ -40,11 +82,7 @@ def create_error_embed(title: str, description: str, user: discord.User = None)
     Returns:
         作成されたEmbed
     """
-    embed = discord.Embed(title=f"❌ {title}", description=description, color=0xe74c3c)
-    if user:
-        embed.set_footer(text=f"実行者: {user.display_name}", icon_url=user.display_avatar.url)
-    embed.timestamp = datetime.now(TZ)
-    return embed
+    return _make_embed("error", title, description, user)
 
 
 def create_info_embed(title: str, description: str, user: discord.User = None) -> discord.Embed:
@@ -59,11 +97,7 @@ def create_info_embed(title: str, description: str, user: discord.User = None) -
     Returns:
         作成されたEmbed
     """
-    embed = discord.Embed(title=f"ℹ️ {title}", description=description, color=0x3498db)
-    if user:
-        embed.set_footer(text=f"実行者: {user.display_name}", icon_url=user.display_avatar.url)
-    embed.timestamp = datetime.now(TZ)
-    return embed
+    return _make_embed("info", title, description, user)
 
 
 def create_warning_embed(title: str, description: str, user: discord.User = None) -> discord.Embed:
@@ -78,11 +112,7 @@ def create_warning_embed(title: str, description: str, user: discord.User = None
     Returns:
         作成されたEmbed
     """
-    embed = discord.Embed(title=f"⚠️ {title}", description=description, color=0xf39c12)
-    if user:
-        embed.set_footer(text=f"実行者: {user.display_name}", icon_url=user.display_avatar.url)
-    embed.timestamp = datetime.now(TZ)
-    return embed
+    return _make_embed("warning", title, description, user)
 
 
 def create_transaction_embed(
@@ -124,7 +154,7 @@ def create_transaction_embed(
     if executor:
         embed.set_footer(text=f"実行者: {executor.display_name}", icon_url=executor.display_avatar.url)
     
-    embed.timestamp = datetime.now(TZ)
+    embed.timestamp = _now()
     return embed
 
 
@@ -165,9 +195,9 @@ def create_shop_embed(
         embed.add_field(name="📦 商品", value="現在商品がありません", inline=False)
         return embed
     
-    for item in items:
-        item_id, item_name, price, item_desc, stock, item_status, symbol = item[:7]
-        
+    # 1件ごとの属性参照を減らすため add_field をローカルに束縛しておく
+    add_field = embed.add_field
+    for item_id, item_name, price, item_desc, stock, item_status, symbol, *_ in items:
         # 在庫状況の表示
         if stock == -1:
             stock_text = "♾️ 無制限"
@@ -180,10 +210,9 @@ def create_shop_embed(
         
         # 説明がある場合のみ表示
         description_line = f"{item_desc}\n" if item_desc else ""
-        field_value = f"{description_line}💰 **{price} {symbol}**\n{stock_text}"
-        embed.add_field(
+        add_field(
             name=f"{status_emoji} {item_name} (ID: {item_id})",
-            value=field_value,
+            value=f"{description_line}💰 **{price} {symbol}**\n{stock_text}",
             inline=False
         )
     
@@ -4,34 +4,64 @@
 Discord UIコンポーネント（View、Button、Modal等）を定義します。
 """
 
+import hashlib
+import sqlite3
 import discord
-import aiosqlite
 from datetime import datetime, timedelta
 from decimal import Decimal, ROUND_DOWN
 
-from config import TZ, DB_PATH
+from config import TZ
 from database import (
     fetch_one, fetch_all, upsert_user, ensure_user_account,
-    balance_of, account_id_by_name, auto_refill_treasury_if_needed,
-    new_transaction, post_ledger, get_asset_info_by_id
+    account_id_by_name, auto_refill_treasury_if_needed,
+    new_transaction, post_ledger_pair, get_asset_info_by_id,
+    forget_asset, connect
 )
 from embeds import create_error_embed, create_success_embed, create_info_embed
+from utils import format_duration_hours, quantizer
+
+
+# 購入・受取のたびに実行するSQL（同じ文字列を使い回し、接続ごとのステートメントキャッシュに載せる）
+_INSERT_ROLE_PURCHASE_SQL = "INSERT INTO role_purchases(user_id, plan_id, guild_id, expires_at) VALUES (?, ?, ?, ?)"
+# 受取記録の追加（受取回数の更新・受取可否の確認はトリガーで行う）
+# 受取済みなら何も返さず、受け取れない報酬ならトリガーが IntegrityError で中断する
+_INSERT_AUTOREWARD_CLAIM_SQL = """
+    INSERT OR IGNORE INTO autoreward_claims(reward_id, user_id) VALUES (?, ?)
+    RETURNING
+        (SELECT asset_id FROM autorewards WHERE id = autoreward_claims.reward_id),
+        (SELECT reward_amount FROM autorewards WHERE id = autoreward_claims.reward_id)
+"""
 
 
 # ==================== 通貨削除確認View ====================
 
+# 通貨と関連データの削除（BEGIN〜COMMITを含め、executescript 1回で実行する）
+# 通貨を参照するテーブルは ON DELETE CASCADE で削除されるため、外部キーをこの削除の間だけ有効にする
+# （残高の集計テーブルは外部キーを持たないため明示的に削除する）
+_DELETE_ASSET_SCRIPT = """
+    PRAGMA foreign_keys = ON;
+    BEGIN IMMEDIATE;
+    DELETE FROM account_balances WHERE asset_id = {asset_id};
+    DELETE FROM assets WHERE id = {asset_id};
+    COMMIT;
+    PRAGMA foreign_keys = OFF;
+"""
+
+
 class CurrencyDeleteConfirmView(discord.ui.View):
     """
     通貨削除の確認View
     """
     
-    def __init__(self, symbol: str, guild_id: int, user: discord.User, asset_info: tuple, balance_info: list, claim_count: int):
+    def __init__(self, symbol: str, guild_id: int, user: discord.User, asset_id: int, asset_name: str, balance_count: int, claim_count: int):
         super().__init__(timeout=300)  # 5分でタイムアウト
+        # 確認待ちの間に保持するのは削除・表示に使う値と件数のみ
         self.symbol = symbol
         self.guild_id = guild_id
         self.user = user
-        self.asset_info = asset_info
-        self.balance_info = balance_info
+        self.asset_id = asset_id
+        self.asset_name = asset_name
+        self.balance_count = balance_count
         self.claim_count = claim_count
     
     @discord.ui.button(label="🗑️ 削除を実行", style=discord.ButtonStyle.danger)
@@ -53,50 +83,34 @@ class CurrencyDeleteConfirmView(discord.ui.View):
     
     async def _execute_deletion(self, interaction: discord.Interaction):
         """実際の削除処理を実行"""
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute("BEGIN"):
-                asset_id, sym, asset_name, decimals = self.asset_info
+        # 削除に時間がかかっても応答期限（3秒）を過ぎないよう先に応答しておく
+        await interaction.response.defer()
+        
+        async with connect() as db:
+            try:
+                # 関連データを全て削除（1回の executescript で、トランザクションごと実行する）
+                await db.executescript(_DELETE_ASSET_SCRIPT.format(asset_id=int(self.asset_id)))
+                forget_asset(self.symbol, self.guild_id, self.asset_id)
                 
-                try:
-                    # 関連データを全て削除
-                    # 1. 仕訳帳エントリ
-                    await db.execute("DELETE FROM ledger_entries WHERE asset_id = ?", (asset_id,))
-                    
-                    # 2. 請求
-                    await db.execute("DELETE FROM claims WHERE asset_id = ?",(asset_id,))
-                    
-                    # 3. デイリー報酬
-                    await db.execute("DELETE FROM daily_role_rewards WHERE asset_id = ?", (asset_id,))
-                    await db.execute("DELETE FROM daily_log WHERE asset_id = ?", (asset_id,))
-                    
-                    # 4. 自動報酬（メッセージIDベース）
-                    await db.execute("DELETE FROM autorewards WHERE asset_id = ?", (asset_id,))
-                    
-                    # 5. 自動報酬（メッセージトリガーベース）
-                    await db.execute("DELETE FROM auto_reward_configs WHERE asset_id = ?", (asset_id,))
-                    
-                    # 6. ロールプラン（スキーマが変更されたため削除不要）
-                    # role_plansテーブルにはasset_idカラムがないため、スキップ
-                    
-                    # 7. 最後に通貨自体を削除
-                    await db.execute("DELETE FROM assets WHERE id = ?", (asset_id,))
-                    
-                    await db.commit()
-                    
-                    # 削除完了メッセージ
-                    description = f"**{self.symbol}** ({asset_name}) を完全に削除しました。\n"
-                    if self.balance_info:
-                        description += f"\n**削除されたデータ:**\n"
-                        description += f"• 残高レコード: {len(self.balance_info)}件\n"
-                    if self.claim_count > 0:
-                        description += f"• 請求レコード: {self.claim_count}件\n"
-                    
-                    embed = create_success_embed("通貨削除完了", description, interaction.user)
-                    await interaction.response.edit_message(embed=embed, view=None)
-                    
-                except Exception as e:
-                    embed = create_error_embed("削除エラー", f"削除中にエラーが発生しました: {str(e)}", interaction.user)
-                    await interaction.response.edit_message(embed=embed, view=None)
+                # 削除完了メッセージ
+                description = f"**{self.symbol}** ({self.asset_name}) を完全に削除しました。\n"
+                if self.balance_count > 0:
+                    description += f"\n**削除されたデータ:**\n"
+                    description += f"• 残高レコード: {self.balance_count}件\n"
+                if self.claim_count > 0:
+                    description += f"• 請求レコード: {self.claim_count}件\n"
+                
+                embed = create_success_embed("通貨削除完了", description, interaction.user)
+                await interaction.edit_original_response(embed=embed, view=None)
+                
+            except Exception as e:
+                if db.in_transaction:
+                    await db.rollback()
+                embed = create_error_embed("削除エラー", f"削除中にエラーが発生しました: {str(e)}", interaction.user)
+                await interaction.edit_original_response(embed=embed, view=None)
+            finally:
+                # プールに返す接続は外部キー無効の状態に戻す
+                await db.execute("PRAGMA foreign_keys = OFF")
 
 
 # ==================== ロール購入パネルView ====================
@@ -122,7 +136,7 @@ class RolePurchaseView(discord.ui.View):
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
         # プラン一覧を取得
-        async with aiosqlite.connect(DB_PATH) as db:
+        async with connect() as db:
             plans = await fetch_all(db, """
                 SELECT id, plan_name, price, currency_symbol, duration_hours
                 FROM role_plans
@@ -155,6 +169,87 @@ class RolePlanSelectView(discord.ui.View):
         self.add_item(RolePlanSelectDropdown(panel_id, plans))
 
 
+async def _purchase_plan(interaction: discord.Interaction, panel_id: int, plan_id: int, request_key: int) -> discord.Embed:
+    """
+    ロールプランの購入処理（ドロップダウン・モーダル共通）
+    
+    支払いと購入記録のコミット後に接続をプールへ返してから、ロールを付与します。
+    同じ request_key・プランでの購入は1回だけ処理します（連打による二重購入の防止）。
+    
+    Args:
+        interaction: Discord Interaction
+        panel_id: パネルID
+        plan_id: プランID
+        request_key: 購入操作を識別するID（ドロップダウンのメッセージIDなど）
+    
+    Returns:
+        結果を表示するEmbed
+    """
+    async with connect() as db:
+        # ユーザー・口座を用意（口座IDはキャッシュされる）
+        uid = await upsert_user(db, interaction.user.id)
+        user_acc = await ensure_user_account(db, interaction.user.id, interaction.guild.id)
+        
+        # プラン・通貨・現在の残高を1回のクエリで取得
+        plan = await fetch_one(db, """
+            SELECT rp.plan_name, rp.role_id, rp.price, rp.currency_symbol, rp.duration_hours,
+                   a.id, a.symbol, a.decimals, COALESCE(ab.balance_int, 0)
+            FROM role_plans rp
+            LEFT JOIN assets a ON a.symbol = UPPER(rp.currency_symbol) AND a.guild_id = ?
+            LEFT JOIN account_balances ab ON ab.account_id = ? AND ab.asset_id = a.id
+            WHERE rp.id = ? AND rp.panel_id = ?
+        """, (interaction.guild.id, user_acc, plan_id, panel_id))
+        
+        if not plan:
+            return create_error_embed("プランエラー", "指定されたプランが見つかりません。", interaction.user)
+        
+        plan_name, role_id, price, currency_symbol, duration_hours, asset_id, symbol, decimals, balance_int = plan
+        if asset_id is None:
+            return create_error_embed("通貨エラー", f"通貨 **{currency_symbol}** が見つかりません。", interaction.user)
+        
+        # ユーザーの残高を確認
+        price_decimal = Decimal(price)
+        user_balance = Decimal(balance_int).scaleb(-decimals)
+        
+        if user_balance < price_decimal:
+            return create_error_embed(
+                "残高不足",
+                f"残高が不足しています。\n必要: {price_decimal} {symbol}\n現在: {user_balance} {symbol}",
+                interaction.user
+            )
+        
+        # Treasuryアカウントを取得
+        treasury_acc = await account_id_by_name(db, "treasury", interaction.guild.id)
+        
+        # 支払い処理
+        unique_hash = hashlib.sha1(f"role_purchase:{request_key}:{plan_id}".encode()).hexdigest()
+        tx_id = await new_transaction(db, kind="role_purchase", created_by_user_id=uid, unique_hash=unique_hash, reference=f"Role purchase: {role_id}")
+        if tx_id is None:
+            return create_info_embed("購入処理済み", "この購入は既に処理されています。", interaction.user)
+        await post_ledger_pair(db, tx_id, user_acc, treasury_acc, asset_id, price_decimal)
+        
+        # 購入記録を保存
+        expires_at = datetime.now(TZ) + timedelta(hours=duration_hours)
+        await db.execute(_INSERT_ROLE_PURCHASE_SQL, (uid, plan_id, str(interaction.guild.id), int(expires_at.timestamp())))
+        
+        await db.commit()
+    
+    # ロールを付与（Discord APIの応答を待つ間、接続を占有しないようプールへ返した後に行う）
+    role = interaction.guild.get_role(int(role_id))
+    if not role:
+        return create_error_embed("ロールエラー", "ロールが見つかりませんでした。管理者に連絡してください。", interaction.user)
+    
+    await interaction.user.add_roles(role)
+    return create_success_embed(
+        "ロール購入完了",
+        f"**{plan_name}**（{role.name}）を購入しました！\n\n"
+        f"💰 支払額: {price_decimal} {symbol}\n"
+        f"⏰ 有効期限: {expires_at.year}年{expires_at.month:02d}月{expires_at.day:02d}日 {expires_at.hour:02d}:{expires_at.minute:02d}\n"
+        f"📅 期間: {format_duration_hours(duration_hours)}",
+        interaction.user
+    )
+
+
 class RolePlanSelectDropdown(discord.ui.Select):
     """プラン選択用のドロップダウン"""
     
@@ -164,16 +259,9 @@ class RolePlanSelectDropdown(discord.ui.Select):
         # プランの選択肢を作成
         options = []
         for plan_id, plan_name, price, currency_symbol, duration_hours in plans:
-            # 期限表示を整形
-            hours_text = f"{duration_hours}時間"
-            if duration_hours >= 24:
-                days = duration_hours // 24
-                remaining_hours = duration_hours % 24
-                hours_text = f"{days}日" + (f"{remaining_hours}時間" if remaining_hours > 0 else "")
-            
             options.append(discord.SelectOption(
                 label=f"{plan_name}",
-                description=f"{price} {currency_symbol} - {hours_text}",
+                description=f"{price} {currency_symbol} - {format_duration_hours(duration_hours)}",
                 value=str(plan_id)
             ))
         
@@ -188,84 +276,11 @@ class RolePlanSelectDropdown(discord.ui.Select):
         """ドロップダウン選択時のコールバック"""
         plan_id = int(self.values[0])
         
-        # プラン情報を取得して購入処理を実行
-        async with aiosqlite.connect(DB_PATH) as db:
-            # プラン情報を取得
-            plan = await fetch_one(db, """
-                SELECT rp.id, rp.plan_name, rp.role_id, rp.price, rp.currency_symbol, rp.duration_hours, rp.guild_id
-                FROM role_plans rp
-                WHERE rp.id = ? AND rp.panel_id = ?
-            """, (plan_id, self.panel_id))
-            
-            if not plan:
-                embed = create_error_embed("プランエラー", "指定されたプランが見つかりません。", interaction.user)
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            plan_id, plan_name, role_id, price, currency_symbol, duration_hours, guild_id = plan
-            price_decimal = Decimal(price)
-            
-            # 通貨情報を取得
-            from database import get_asset
-            asset = await get_asset(db, currency_symbol, interaction.guild.id)
-            if not asset:
-                embed = create_error_embed("通貨エラー", f"通貨 **{currency_symbol}** が見つかりません。", interaction.user)
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            asset_id, symbol, asset_name, decimals = asset
-            
-            # ユーザーの残高を確認
-            uid = await upsert_user(db, interaction.user.id)
-            user_acc = await ensure_user_account(db, interaction.user.id, interaction.guild.id)
-            user_balance = await balance_of(db, user_acc, asset_id)
-            
-            if user_balance < price_decimal:
-                embed = create_error_embed(
-                    "残高不足",
-                    f"残高が不足しています。\n必要: {price_decimal} {symbol}\n現在: {user_balance} {symbol}",
-                    interaction.user
-                )
-                return await interaction.response.send_message(embed=embed, ephemeral=True)
-            
-            # Treasuryアカウントを取得
-            treasury_acc = await account_id_by_name(db, "treasury", interaction.guild.id)
-            
-            # 支払い処理
-            tx_id = await new_transaction(db, kind="role_purchase", created_by_user_id=uid, unique_hash=None, reference=f"Role purchase: {role_id}")
-            await post_ledger(db, tx_id, user_acc, asset_id, -price_decimal)
-            await post_ledger(db, tx_id, treasury_acc, asset_id, price_decimal)
-            
-            # 購入記録を保存
-            expires_at = datetime.now(TZ) + timedelta(hours=duration_hours)
-            await db.execute("""
-                INSERT INTO role_purchases(user_id, plan_id, guild_id, expires_at)
-                VALUES (?, ?, ?, ?)
-            """, (uid, plan_id, str(interaction.guild.id), expires_at.isoformat()))
-            
-            await db.commit()
-            
-            # ロールを付与
-            role = interaction.guild.get_role(int(role_id))
-            if role:
-                await interaction.user.add_roles(role)
-                
-                # 期限表示を整形
-                hours_text = f"{duration_hours}時間"
-                if duration_hours >= 24:
-                    days = duration_hours // 24
-                    remaining_hours = duration_hours % 24
-                    hours_text = f"{days}日" + (f"{remaining_hours}時間" if remaining_hours > 0 else "")
-                
-                embed = create_success_embed(
-                    "購入完了",
-                    f"**{plan_name}** を購入しました！\n\n"
-                    f"**{hours_text}** 支払額: {price_decimal} {symbol}\n"
-                    f"有効期限: {expires_at.strftime('%Y年%m月%d日 %H:%M')}",
-                    interaction.user
-                )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-            else:
-                embed = create_error_embed("ロールエラー", "ロールが見つかりませんでした。管理者に連絡してください。", interaction.user)
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+        # 購入処理の前に応答しておく（DBの処理待ちで応答期限を過ぎないように）
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        # 同じドロップダウンで同じプランを続けて選択しても、購入は1回だけ処理する
+        embed = await _purchase_plan(interaction, self.panel_id, plan_id, interaction.message.id)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
 
 class RolePlanSelectModal(discord.ui.Modal, title="ロールプラン選択"):
@@ -290,84 +305,9 @@ class RolePlanSelectModal(discord.ui.Modal, title="ロールプラン選択"):
             embed = create_error_embed("入力エラー", "プランIDは数値で入力してください。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        # プラン情報を取得して購入処理を実行
-        async with aiosqlite.connect(DB_PATH) as db:
-            # プラン情報を取得
-                plan = await fetch_one(db, """
-                    SELECT rp.id, rp.role_id, rp.price, rp.currency_symbol, rp.duration_hours, rp.guild_id
-                    FROM role_plans rp
-                    WHERE rp.id = ? AND rp.panel_id = ?
-                """, (plan_id, self.panel_id))
-                
-                if not plan:
-                    embed = create_error_embed("プランエラー", "指定されたプランが見つかりません。", interaction.user)
-                    return await interaction.response.send_message(embed=embed, ephemeral=True)
-                
-                plan_id, role_id, price, currency_symbol, duration_hours, guild_id = plan
-                price_decimal = Decimal(price)
-                
-                # 通貨情報を取得
-                from database import get_asset
-                asset = await get_asset(db, currency_symbol, interaction.guild.id)
-                if not asset:
-                    embed = create_error_embed("通貨エラー", f"通貨 **{currency_symbol}** が見つかりません。", interaction.user)
-                    return await interaction.response.send_message(embed=embed, ephemeral=True)
-                
-                asset_id, symbol, asset_name, decimals = asset
-                
-                # ユーザーの残高を確認
-                uid = await upsert_user(db, interaction.user.id)
-                user_acc = await ensure_user_account(db, interaction.user.id, interaction.guild.id)
-                user_balance = await balance_of(db, user_acc, asset_id)
-                
-                if user_balance < price_decimal:
-                    embed = create_error_embed(
-                        "残高不足",
-                        f"残高が不足しています。\n必要: {price_decimal} {symbol}\n現在: {user_balance} {symbol}",
-                        interaction.user
-                    )
-                    return await interaction.response.send_message(embed=embed, ephemeral=True)
-                
-                # Treasuryアカウントを取得
-                treasury_acc = await account_id_by_name(db, "treasury", interaction.guild.id)
-                
-                # 支払い処理
-                tx_id = await new_transaction(db, kind="role_purchase", created_by_user_id=uid, unique_hash=None, reference=f"Role purchase: {role_id}")
-                await post_ledger(db, tx_id, user_acc, asset_id, -price_decimal)
-                await post_ledger(db, tx_id, treasury_acc, asset_id, price_decimal)
-                
-                # 購入記録を保存
-                expires_at = datetime.now(TZ) + timedelta(hours=duration_hours)
-                await db.execute("""
-                    INSERT INTO role_purchases(user_id, plan_id, guild_id, expires_at)
-                    VALUES (?, ?, ?, ?)
-                """, (uid, plan_id, str(interaction.guild.id), expires_at.isoformat()))
-                
-                await db.commit()
-                
-                # ロールを付与
-                role = interaction.guild.get_role(int(role_id))
-                if role:
-                    await interaction.user.add_roles(role)
-                    # 期限表示を整形
-                    hours_text = f"{duration_hours}時間"
-                    if duration_hours >= 24:
-                        days = duration_hours // 24
-                        remaining_hours = duration_hours % 24
-                        hours_text = f"{days}日" + (f"{remaining_hours}時間" if remaining_hours > 0 else "")
-                    
-                    embed = create_success_embed(
-                        "ロール購入完了",
-                        f"**{role.name}** を購入しました！\n\n"
-                        f"💰 支払額: {price_decimal} {symbol}\n"
-                        f"⏰ 有効期限: {expires_at.strftime('%Y年%m月%d日 %H:%M')}\n"
-                        f"📅 期間: {hours_text}",
-                        interaction.user
-                    )
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
-                else:
-                    embed = create_error_embed("ロールエラー", "ロールが見つかりませんでした。管理者に連絡してください。", interaction.user)
-                    await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        embed = await _purchase_plan(interaction, self.panel_id, plan_id, interaction.id)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
 
 # ==================== 自動報酬View ====================
@@ -392,66 +332,64 @@ class AutoRewardView(discord.ui.View):
             embed = create_error_embed("実行エラー", "このボタンはサーバー内でのみ使用できます。", interaction.user)
             return await interaction.response.send_message(embed=embed, ephemeral=True)
         
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute("BEGIN"):
-                # 報酬設定を取得
-                reward = await fetch_one(db, """
-                    SELECT ar.id, ar.asset_id, ar.reward_amount, ar.max_claims, ar.current_claims, ar.enabled, a.symbol, a.decimals
-                    FROM autorewards ar
-                    JOIN assets a ON ar.asset_id = a.id
-                    WHERE ar.id = ?
-                """, (self.reward_id,))
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        embed = await self._claim(interaction)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    
+    async def _claim(self, interaction: discord.Interaction) -> discord.Embed:
+        """
+        報酬の受取処理
+        
+        Treasuryの補充も含め、書き込みロックを最初に取得する BEGIN IMMEDIATE の1つのトランザクションで実行し、
+        途中で失敗した場合はすべてロールバックします（このトランザクション内ではコミットするヘルパーを呼ばないこと）。
+        """
+        async with connect() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                # 受取記録を追加し、報酬設定を取得（受取回数はトリガーで更新される）
+                uid = await upsert_user(db, interaction.user.id)
+                try:
+                    reward = await fetch_one(db, _INSERT_AUTOREWARD_CLAIM_SQL, (self.reward_id, uid))
+                except sqlite3.IntegrityError:
+                    # 受け取れない理由を判定
+                    await db.rollback()
+                    status = await fetch_one(db, """
+                        SELECT enabled, EXISTS(SELECT 1 FROM autoreward_claims WHERE reward_id = ? AND user_id = ?)
+                        FROM autorewards WHERE id = ?
+                    """, (self.reward_id, uid, self.reward_id))
+                    if not status:
+                        return create_error_embed("報酬エラー", "この報酬は削除されました。", interaction.user)
+                    if status[1]:
+                        return create_error_embed("受取済み", "この報酬は既に受け取っています。", interaction.user)
+                    if not status[0]:
+                        return create_error_embed("報酬無効", "この報酬は現在無効化されています。", interaction.user)
+                    return create_error_embed("受取上限", "この報酬の受取上限に達しました。", interaction.user)
                 
                 if not reward:
-                    embed = create_error_embed("報酬エラー", "この報酬は削除されました。", interaction.user)
-                    return await interaction.response.send_message(embed=embed, ephemeral=True)
-                
-                reward_id, asset_id, reward_amount, max_claims, current_claims, enabled, symbol, decimals = reward
-                
-                if not enabled:
-                    embed = create_error_embed("報酬無効", "この報酬は現在無効化されています。", interaction.user)
-                    return await interaction.response.send_message(embed=embed, ephemeral=True)
+                    await db.rollback()
+                    return create_error_embed("受取済み", "この報酬は既に受け取っています。", interaction.user)
                 
-                if max_claims != -1 and current_claims >= max_claims:
-                    embed = create_error_embed("受取上限", "この報酬の受取上限に達しました。", interaction.user)
-                    return await interaction.response.send_message(embed=embed, ephemeral=True)
-                
-                # ユーザーが既に受け取っているかチェック
-                uid = await upsert_user(db, interaction.user.id)
-                already_claimed = await fetch_one(db, """
-                    SELECT id FROM autoreward_claims WHERE reward_id = ? AND user_id = ?
-                """, (reward_id, uid))
-                
-                if already_claimed:
-                    embed = create_error_embed("受取済み", "この報酬は既に受け取っています。", interaction.user)
-                    return await interaction.response.send_message(embed=embed, ephemeral=True)
+                asset_id, reward_amount = reward
+                symbol, decimals = await get_asset_info_by_id(db, asset_id)
                 
                 # 報酬を付与
-                reward_decimal = Decimal(reward_amount).quantize(Decimal(10) ** -decimals, rounding=ROUND_DOWN)
+                reward_decimal = Decimal(reward_amount).quantize(quantizer(decimals), rounding=ROUND_DOWN)
                 
                 treasury_acc = await account_id_by_name(db, "treasury", interaction.guild.id)
-                await auto_refill_treasury_if_needed(db, treasury_acc, asset_id, interaction.guild.id, reward_decimal)
+                # 補充も受取記録・仕訳と同じトランザクションでコミットする（途中で失敗しても受取記録が残らないように）
+                await auto_refill_treasury_if_needed(db, treasury_acc, asset_id, interaction.guild.id, reward_decimal, commit=False)
                 
                 user_acc = await ensure_user_account(db, interaction.user.id, interaction.guild.id)
-                tx_id = await new_transaction(db, kind="autoreward", created_by_user_id=uid, unique_hash=None, reference=f"Auto reward {reward_id}")
-                await post_ledger(db, tx_id, treasury_acc, asset_id, -reward_decimal)
-                await post_ledger(db, tx_id, user_acc, asset_id, reward_decimal)
-                
-                # 受取記録を保存
-                await db.execute("""
-                    INSERT INTO autoreward_claims(reward_id, user_id) VALUES (?, ?)
-                """, (reward_id, uid))
-                
-                # 受取回数を更新
-                await db.execute("""
-                    UPDATE autorewards SET current_claims = current_claims + 1 WHERE id = ?
-                """, (reward_id,))
+                tx_id = await new_transaction(db, kind="autoreward", created_by_user_id=uid, unique_hash=None, reference=f"Auto reward {self.reward_id}")
+                await post_ledger_pair(db, tx_id, treasury_acc, user_acc, asset_id, reward_decimal)
                 
                 await db.commit()
-                
-                embed = create_success_embed(
-                    "報酬獲得！",
-                    f"**{reward_decimal} {symbol}** を受け取りました！",
-                    interaction.user
-                )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+            except Exception:
+                await db.rollback()
+                raise
+        
+        return create_success_embed(
+            "報酬獲得！",
+            f"**{reward_decimal} {symbol}** を受け取りました！",
+            interaction.user
+        )
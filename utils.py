@@ -4,10 +4,20 @@
 汎用的な計算や変換などのヘルパー関数を提供します。
 """
 
-import math
-from decimal import Decimal, InvalidOperation, ROUND_DOWN
+import time
+from decimal import Decimal, InvalidOperation, ROUND_DOWN, ROUND_HALF_EVEN
+from functools import lru_cache
 from config import SALARY_MIN_MINUTES, SALARY_UNIT_MINUTES, SALARY_HOUR_TO_MINUTES
 
+# 給料計算の切り上げ用の定数（単位時間あたりの時間数は事前に計算しておく）
+_SALARY_UNIT_MINUS_1 = SALARY_UNIT_MINUTES - 1
+_SALARY_UNIT_TO_HOURS = SALARY_UNIT_MINUTES / SALARY_HOUR_TO_MINUTES
+
+# 銀行管理ロールのキャッシュ保持秒数
+BANK_MANAGER_ROLES_TTL = 60
+# Format: {guild_id: (取得時刻(monotonic), {role_id, ...})}
+_bank_manager_roles_cache: dict[int, tuple[float, frozenset[int]]] = {}
+
 
 def to_decimal(s: str | float | int) -> Decimal:
     """
@@ -22,6 +32,13 @@ def to_decimal(s: str | float | int) -> Decimal:
     Raises:
         ValueError: 変換できない値の場合
     """
+    # Decimal・intはそのまま使える（str() を経由して解析し直さない）
+    if isinstance(s, Decimal):
+        if not s.is_finite():
+            raise ValueError("金額が不正です。")
+        return s
+    if type(s) is int:
+        return Decimal(s)
     try:
         d = Decimal(str(s))
         if not d.is_finite():
@@ -47,7 +64,7 @@ def calculate_hours_15min_ceil(minutes: int) -> float:
         >>> calculate_hours_15min_ceil(15)
         0.25
         >>> calculate_hours_15min_ceil(29)
-        0.25
+        0.5
         >>> calculate_hours_15min_ceil(30)
         0.5
         >>> calculate_hours_15min_ceil(59)
@@ -55,7 +72,26 @@ def calculate_hours_15min_ceil(minutes: int) -> float:
     """
     if minutes < SALARY_MIN_MINUTES:
         return 0.0
-    return math.ceil(minutes / SALARY_UNIT_MINUTES) * SALARY_UNIT_MINUTES / SALARY_HOUR_TO_MINUTES
+    return (minutes + _SALARY_UNIT_MINUS_1) // SALARY_UNIT_MINUTES * _SALARY_UNIT_TO_HOURS
+
+
+# 小数点以下の桁数ごとの quantize 用の値（Decimal(10) ** -decimals を毎回計算しないよう事前に作成）
+_QUANTIZERS = tuple(Decimal(1).scaleb(-i) for i in range(19))
+
+
+def quantizer(decimals: int) -> Decimal:
+    """
+    指定された小数点桁数に丸めるための quantize 用の値を返します。
+    
+    Args:
+        decimals: 小数点以下の桁数
+        
+    Returns:
+        Decimal: 10 ** -decimals
+    """
+    if 0 <= decimals < len(_QUANTIZERS):
+        return _QUANTIZERS[decimals]
+    return Decimal(10) ** -decimals
 
 
 def format_amount(amount: Decimal, decimals: int) -> str:
@@ -69,7 +105,57 @@ def format_amount(amount: Decimal, decimals: int) -> str:
     Returns:
         フォーマットされた金額文字列
     """
-    return str(amount.quantize(Decimal(10) ** -decimals))
+    return str(amount.quantize(quantizer(decimals)))
+
+
+def format_minor_units(amount: int, decimals: int) -> str:
+    """
+    最小単位の整数金額を小数表記の文字列にします。
+    
+    Args:
+        amount: 最小単位での金額（例: decimals=2 なら 150 は 1.50）
+        decimals: 小数点以下の桁数
+    
+    Returns:
+        フォーマットされた金額文字列
+    """
+    if decimals <= 0:
+        return str(amount)
+    sign = "-" if amount < 0 else ""
+    whole, frac = divmod(abs(amount), 10 ** decimals)
+    return f"{sign}{whole}.{frac:0{decimals}d}"
+
+
+def round_amount(amount: Decimal, decimals: int) -> Decimal:
+    """
+    金額を通貨の小数点以下の桁数に丸めます（偶数丸め）。
+    
+    記帳・プラン価格・マイグレーションはすべてこの丸めを使い、同じ入力から同じ金額になるようにします。
+    
+    Args:
+        amount: 金額
+        decimals: 小数点以下の桁数
+    
+    Returns:
+        丸めた金額（例: decimals=2 なら 0.125 は 0.12）
+    """
+    return amount.quantize(quantizer(decimals), rounding=ROUND_HALF_EVEN)
+
+
+def to_minor_units(amount: Decimal, decimals: int) -> int:
+    """
+    小数の金額を最小単位の整数にします（format_minor_units の逆変換）。
+    
+    桁数を超える端数は round_amount と同じく偶数丸めします。
+    
+    Args:
+        amount: 金額
+        decimals: 小数点以下の桁数
+    
+    Returns:
+        最小単位での金額（例: decimals=2 なら 1.50 は 150）
+    """
+    return int(round_amount(amount, decimals).scaleb(decimals))
 
 
 def get_duration_display(days: int) -> str:
@@ -92,6 +178,23 @@ def get_duration_display(days: int) -> str:
         return f"{days}日"
 
 
+@lru_cache(maxsize=256)
+def format_duration_hours(hours: int) -> str:
+    """
+    時間数から期限表示を生成（プランの期間は種類が少ないため結果をキャッシュ）
+    
+    Args:
+        hours: 時間数
+        
+    Returns:
+        期限表示文字列（例: "12時間", "1日", "1日6時間"）
+    """
+    if hours < 24:
+        return f"{hours}時間"
+    days, remaining_hours = divmod(hours, 24)
+    return f"{days}日" + (f"{remaining_hours}時間" if remaining_hours > 0 else "")
+
+
 def format_number_with_commas(number: int | float | Decimal) -> str:
     """
     数値をカンマ区切りでフォーマット
@@ -115,25 +218,25 @@ async def has_bank_permission(interaction) -> bool:
     Returns:
         管理者権限または銀行管理ロールを持っている場合True
     """
-    import discord
-    import aiosqlite
-    from config import DB_PATH
-    from database import fetch_all
+    from database import fetch_all, connect
     
     # 管理者権限を持っている場合はTrue
     if interaction.user.guild_permissions.administrator:
         return True
     
-    # 銀行管理ロールをチェック
-    async with aiosqlite.connect(DB_PATH) as db:
-        rows = await fetch_all(db, """
-            SELECT role_id FROM bank_manager_roles
-            WHERE guild_id = ?
-        """, (str(interaction.guild_id),))
-        
-        manager_role_ids = {int(row[0]) for row in rows}
-        user_role_ids = {role.id for role in interaction.user.roles}
-        
-        # ユーザーが銀行管理ロールを持っている場合はTrue
-        return bool(manager_role_ids & user_role_ids)
-
+    # 銀行管理ロールをチェック（ギルドごとに BANK_MANAGER_ROLES_TTL 秒キャッシュ）
+    now = time.monotonic()
+    cached = _bank_manager_roles_cache.get(interaction.guild_id)
+    if cached is not None and now - cached[0] < BANK_MANAGER_ROLES_TTL:
+        manager_role_ids = cached[1]
+    else:
+        async with connect() as db:
+            rows = await fetch_all(db, """
+                SELECT role_id FROM bank_manager_roles
+                WHERE guild_id = ?
+            """, (str(interaction.guild_id),))
+        manager_role_ids = frozenset(int(row[0]) for row in rows)
+        _bank_manager_roles_cache[interaction.guild_id] = (now, manager_role_ids)
+    
+    # ユーザーが銀行管理ロールを持っている場合はTrue（管理ロール未設定のギルドではロールを走査しない）
+    return bool(manager_role_ids) and not manager_role_ids.isdisjoint(role.id for role in interaction.user.roles)